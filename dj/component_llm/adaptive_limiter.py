@@ -0,0 +1,143 @@
+"""AIMD 방식 동시 요청 수 자동 조절기 (asyncio.Semaphore 대체).
+
+고정 MAX_CONCURRENT 대신 응답 상태를 보고 동시 요청 한도를 계속 조정한다.
+- 성공 + 지연 시간이 기준(관측된 최소 지연)의 latency_tolerance배 이하: 한도를 1/한도씩 증가
+  (한도만큼 성공할 때마다 +1, TCP 혼잡 회피와 같은 가산 증가)
+- 429 / 5xx / 타임아웃: 한도 × backoff (곱셈 감소). 같은 혼잡 구간에서 이미 줄였으면
+  그 이전에 시작된 요청의 실패로는 다시 줄이지 않음
+- 그 밖의 실패(400, 파싱 오류 등)와 지연 증가: 한도 유지
+
+component_llm, keywords_llm 추출 스크립트가 같이 쓴다 (이 파일은 패키지 내부 import 없음).
+
+    limiter = AdaptiveLimiter(initial=5, max_limit=64)
+    async with limiter.slot():          # 예외가 나면 종류를 보고 자동으로 한도 조정
+        response = await client.aio.models.generate_content(...)
+"""
+
+import asyncio
+import time
+
+from loguru import logger
+
+BASELINE_DRIFT = 0.01     # 기준 지연이 샘플마다 올라갈 수 있는 비율 (서비스 전체가 느려지는 경우 반영)
+
+
+def is_overload_error(e: BaseException | None) -> bool:
+    """제공자 과부하 신호 여부 (429, 5xx, 타임아웃). 감싼 예외(__cause__)도 확인한다."""
+    while e is not None:
+        code = getattr(e, "code", None)
+        if code == 429 or (isinstance(code, int) and code >= 500):
+            return True
+        if isinstance(e, (TimeoutError, asyncio.TimeoutError)) or "timeout" in type(e).__name__.lower():
+            return True
+        if "RESOURCE_EXHAUSTED" in str(e):
+            return True
+        e = e.__cause__
+    return False
+
+
+class _Slot:
+    """limiter.slot()이 돌려주는 요청 1건의 자리."""
+
+    def __init__(self, limiter: "AdaptiveLimiter") -> None:
+        self._limiter = limiter
+        self._started = 0.0
+
+    async def __aenter__(self) -> "_Slot":
+        self._started = await self._limiter.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc is None:
+            outcome = "success"
+        elif is_overload_error(exc):
+            outcome = "overload"
+        else:
+            outcome = "error"
+        await self._limiter.release(self._started, outcome)
+
+
+class AdaptiveLimiter:
+    """AIMD로 한도를 조절하는 비동기 동시 실행 제한기."""
+
+    def __init__(
+        self,
+        initial: int = 5,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        name: str = "",
+    ) -> None:
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.name = name
+        self.inflight = 0
+        self.peak = self.limit
+        self.successes = 0
+        self.overloads = 0
+        self.decreases = 0
+        self._baseline: float | None = None
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+
+    @property
+    def current(self) -> int:
+        return int(self.limit)
+
+    def slot(self) -> _Slot:
+        return _Slot(self)
+
+    async def acquire(self) -> float:
+        """자리가 날 때까지 기다린 뒤 시작 시각을 반환한다."""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.inflight < int(self.limit))
+            self.inflight += 1
+        return time.monotonic()
+
+    async def release(self, started: float, outcome: str = "success") -> None:
+        """요청 1건 종료. outcome: 'success' | 'overload' | 'error'."""
+        now = time.monotonic()
+        async with self._cond:
+            self.inflight -= 1
+            if outcome == "success":
+                self._on_success(now - started)
+            elif outcome == "overload":
+                self._on_overload(started, now)
+            self._cond.notify_all()
+
+    def _on_success(self, latency: float) -> None:
+        self.successes += 1
+        if self._baseline is None:
+            self._baseline = latency
+        else:
+            self._baseline = min(latency, self._baseline * (1 + BASELINE_DRIFT))
+
+        # 지연이 기준보다 많이 늘었으면 한도 유지 (이미 제공자 처리량 근처)
+        if latency > self._baseline * self.latency_tolerance:
+            return
+        # 한도가 꽉 찬 상태에서만 증가 (덜 쓰고 있는데 한도만 올라가는 것 방지)
+        if self.inflight + 1 < int(self.limit):
+            return
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self.peak = max(self.peak, self.limit)
+
+    def _on_overload(self, started: float, now: float) -> None:
+        self.overloads += 1
+        # 이번 혼잡 구간에서 이미 줄였으면 그 전에 시작된 요청의 실패는 무시
+        if started < self._last_decrease:
+            return
+        before = self.current
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self._last_decrease = now
+        self.decreases += 1
+        logger.info(f"{self.name}동시 요청 한도 {before} → {self.current} (과부하 응답)")
+
+    def summary(self) -> str:
+        return (
+            f"{self.name}동시 요청 한도: 현재 {self.current} / 최고 {int(self.peak)} "
+            f"(성공 {self.successes:,}, 과부하 {self.overloads:,}, 감소 {self.decreases:,}회)"
+        )
@@ -0,0 +1,125 @@
+"""이어하기용 체크포인트 (SQLite).
+
+시작할 때마다 커지는 components.csv 전체를 다시 읽고, 모든 JSON 파일을 열어 파싱해야
+이미 처리한 chunk인지 알 수 있던 문제를 없앤다.
+
+- chunks: CSV에 기록 완료된 chunk_id
+- files : 모든 독립항이 CSV에 기록된(또는 독립항이 없는) 파일 → 다음 실행에서 열지 않고 스킵
+- meta  : csv_offset = 체크포인트에 반영된 components.csv 바이트 위치
+
+CSV 버퍼가 flush될 때 같은 행들을 체크포인트에 반영하므로 CSV보다 앞서가지 않는다.
+체크포인트 이후 CSV에 추가된 행(debug/retry_failed.py append, 비정상 종료 직전 flush 등)은
+시작할 때 csv_offset 이후 부분만 읽어 반영하고, CSV가 지워지거나 줄었으면 CSV 기준으로 다시 만든다.
+"""
+
+import csv
+import io
+import sqlite3
+from pathlib import Path
+
+from loguru import logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (chunk_id TEXT PRIMARY KEY) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID;
+"""
+
+
+class Checkpoint:
+    """chunk / 파일 단위 처리 완료 기록."""
+
+    def __init__(self, path: Path, csv_path: Path) -> None:
+        self.path = path
+        self.csv_path = csv_path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        # 이번 실행에서 기록을 기다리는 chunk → 파일, 파일 → 남은 chunk 수
+        self._pending_chunk_file: dict[str, str] = {}
+        self._pending_count: dict[str, int] = {}
+        self._failed_files: set[str] = set()
+        self._sync_with_csv()
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+    # ── CSV와 맞추기 ──
+
+    def _csv_offset(self) -> int:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'csv_offset'").fetchone()
+        return int(row[0]) if row else 0
+
+    def _set_csv_offset(self, offset: int) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('csv_offset', ?)", (str(offset),)
+        )
+
+    def _sync_with_csv(self) -> None:
+        size = self.csv_path.stat().st_size if self.csv_path.exists() else 0
+        offset = self._csv_offset()
+        if size < offset:
+            # CSV가 지워졌거나 줄었음 → 체크포인트도 CSV 기준으로 다시
+            logger.warning(f"CSV가 체크포인트보다 작음 → 체크포인트 재생성: {self.csv_path.name}")
+            self.conn.execute("DELETE FROM chunks")
+            self.conn.execute("DELETE FROM files")
+            offset = 0
+        if size > offset:
+            with open(self.csv_path, "rb") as f:
+                f.seek(offset)
+                text = f.read().decode("utf-8")
+            chunk_ids = [
+                row[1] for row in csv.reader(io.StringIO(text, newline=""))
+                if len(row) > 1 and row[1] != "chunk_id"
+            ]
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO chunks (chunk_id) VALUES (?)", ((c,) for c in chunk_ids)
+            )
+            logger.info(f"체크포인트에 CSV 추가분 반영: {len(chunk_ids):,}건 ({offset:,} → {size:,} bytes)")
+        self._set_csv_offset(size)
+        self.conn.commit()
+
+    # ── 조회 ──
+
+    def done_files(self) -> set[str]:
+        return {path for (path,) in self.conn.execute("SELECT path FROM files")}
+
+    def done_chunks(self) -> set[str]:
+        return {chunk_id for (chunk_id,) in self.conn.execute("SELECT chunk_id FROM chunks")}
+
+    # ── 기록 ──
+
+    def mark_file_done(self, file_key: str) -> None:
+        """독립항이 없거나 모든 chunk가 이미 기록된 파일 (다음 flush 때 커밋)."""
+        self.conn.execute("INSERT OR IGNORE INTO files (path) VALUES (?)", (file_key,))
+
+    def expect(self, file_key: str, chunk_ids: list[str]) -> None:
+        """이번 실행에서 처리할 파일의 chunk 등록 (모두 기록되면 파일 완료)."""
+        self._pending_count[file_key] = len(chunk_ids)
+        for chunk_id in chunk_ids:
+            self._pending_chunk_file[chunk_id] = file_key
+
+    def fail(self, chunk_id: str) -> None:
+        """chunk 실패 → 이 파일은 이번 실행에서 완료 표시하지 않음 (다음 실행에서 다시 열어 재시도)."""
+        file_key = self._pending_chunk_file.pop(chunk_id, None)
+        if file_key is not None:
+            self._failed_files.add(file_key)
+            self._pending_count.pop(file_key, None)
+
+    def on_csv_flush(self, rows: list[list[str]]) -> None:
+        """CsvBuffer flush 직후 호출: 기록된 chunk와 그로써 끝난 파일을 커밋한다."""
+        chunk_ids = [row[1] for row in rows]
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO chunks (chunk_id) VALUES (?)", ((c,) for c in chunk_ids)
+        )
+        for chunk_id in chunk_ids:
+            file_key = self._pending_chunk_file.pop(chunk_id, None)
+            if file_key is None or file_key in self._failed_files:
+                continue
+            self._pending_count[file_key] -= 1
+            if self._pending_count[file_key] == 0:
+                del self._pending_count[file_key]
+                self.mark_file_done(file_key)
+        self._set_csv_offset(self.csv_path.stat().st_size)
+        self.conn.commit()
@@ -0,0 +1,192 @@
+"""여러 Gemini API 키에 요청을 나눠 보내는 클라이언트 풀.
+
+키마다 RPM(분당 요청 수)·TPM(분당 토큰 수) 토큰 버킷과 429 쿨다운 상태를 두고,
+매 요청을 남은 여유(headroom)가 가장 큰 키로 보낸다. 모든 키가 한도에 걸려 있으면
+가장 먼저 여유가 생기는 시점까지 기다린다. 키 수만큼 전체 처리량이 늘어난다.
+
+component_llm, keywords_llm 추출 스크립트가 같이 쓴다 (이 파일은 패키지 내부 import 없음).
+
+    pool = ClientPool(api_keys, rpm=2000, tpm=4_000_000)
+    response = await pool.generate_content(model=..., contents=[...], config=...)
+
+로컬 가짜 Gemini 서버로 테스트할 때는 base_url(또는 GEMINI_BASE_URL 환경변수)을 지정한다.
+"""
+
+import asyncio
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from google import genai
+from google.genai import types
+from loguru import logger
+
+DEFAULT_RPM = int(os.environ.get("GEMINI_RPM", "2000"))          # 키 1개당 분당 요청 수
+DEFAULT_TPM = int(os.environ.get("GEMINI_TPM", "4000000"))       # 키 1개당 분당 토큰 수
+COOLDOWN_BASE = 10.0      # 429 첫 쿨다운 (초, 연속 429마다 2배)
+COOLDOWN_MAX = 120.0      # 쿨다운 상한 (초)
+CHARS_PER_TOKEN = 2       # 요청 토큰 추정용 (한국어 청구항 기준 대략치)
+
+
+class RateLimitedError(Exception):
+    """키가 429를 받아 쿨다운에 들어갔음을 알린다 (호출 측에서 바로 다시 시도하면 다른 키로 간다)."""
+
+
+def estimate_tokens(contents: Any) -> int:
+    """요청 토큰 수 추정 (문자열 또는 문자열 리스트)."""
+    if isinstance(contents, str):
+        return len(contents) // CHARS_PER_TOKEN + 1
+    return sum(estimate_tokens(c) for c in contents if isinstance(c, str)) + 1
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    """429 / RESOURCE_EXHAUSTED 여부."""
+    return getattr(e, "code", None) == 429 or "RESOURCE_EXHAUSTED" in str(e)
+
+
+def _retry_delay(e: Exception) -> float | None:
+    """429 응답의 retryDelay ('17s') → 초."""
+    match = re.search(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", str(getattr(e, "details", "") or e))
+    return float(match.group(1)) if match else None
+
+
+def _usage_tokens(response: Any) -> int | None:
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None) if usage is not None else None
+
+
+# ── 키별 상태 ──────────────────────────────────────────
+
+
+@dataclass
+class KeySlot:
+    """API 키 1개의 클라이언트와 RPM/TPM 버킷, 쿨다운 상태."""
+
+    index: int
+    client: Any
+    rpm: float
+    tpm: float
+    requests: float = 0.0                 # 남은 요청 토큰 (최대 rpm)
+    tokens: float = 0.0                   # 남은 TPM 토큰 (최대 tpm)
+    updated: float = field(default_factory=time.monotonic)
+    cooldown_until: float = 0.0
+    consecutive_429: int = 0
+    sent: int = 0
+    rate_limited: int = 0
+    failed: int = 0
+
+    def __post_init__(self) -> None:
+        self.requests = self.rpm
+        self.tokens = self.tpm
+
+    def refill(self, now: float) -> None:
+        elapsed = now - self.updated
+        self.updated = now
+        self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60)
+        self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60)
+
+    def headroom(self, now: float, cost: int) -> float:
+        """지금 보낼 수 있으면 남은 여유 비율 (0~1), 보낼 수 없으면 -1."""
+        if now < self.cooldown_until or self.requests < 1 or self.tokens < cost:
+            return -1.0
+        return min(self.requests / self.rpm, self.tokens / self.tpm)
+
+    def wait_time(self, now: float, cost: int) -> float:
+        """요청 1건을 보낼 수 있을 때까지 남은 시간 (초)."""
+        need_requests = max(0.0, 1 - self.requests) * 60 / self.rpm
+        need_tokens = max(0.0, min(cost, self.tpm) - self.tokens) * 60 / self.tpm
+        return max(self.cooldown_until - now, need_requests, need_tokens)
+
+
+# ── 풀 ────────────────────────────────────────────────
+
+
+class ClientPool:
+    """여러 API 키로 generate_content를 분산 호출한다 (asyncio 전용)."""
+
+    def __init__(
+        self,
+        api_keys: list[str],
+        rpm: float = DEFAULT_RPM,
+        tpm: float = DEFAULT_TPM,
+        base_url: str | None = None,
+        client_factory: Callable[[str], Any] | None = None,
+    ) -> None:
+        if not api_keys:
+            raise ValueError("API 키가 없습니다.")
+        base_url = base_url or os.environ.get("GEMINI_BASE_URL") or None
+        if client_factory is None:
+            def client_factory(key: str) -> Any:
+                http_options = types.HttpOptions(base_url=base_url) if base_url else None
+                return genai.Client(api_key=key, http_options=http_options)
+
+        self.slots = [
+            KeySlot(index=i, client=client_factory(k), rpm=rpm, tpm=tpm)
+            for i, k in enumerate(api_keys)
+        ]
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    async def acquire(self, cost: int) -> KeySlot:
+        """여유가 가장 큰 키를 골라 요청 1건·토큰 cost만큼 차감한다 (없으면 생길 때까지 대기)."""
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                for slot in self.slots:
+                    slot.refill(now)
+                best = max(self.slots, key=lambda s: s.headroom(now, cost))
+                if best.headroom(now, cost) >= 0:
+                    best.requests -= 1
+                    best.tokens -= cost
+                    best.sent += 1
+                    return best
+                wait = min(s.wait_time(now, cost) for s in self.slots)
+            await asyncio.sleep(max(wait, 0.01))
+
+    def _on_success(self, slot: KeySlot, cost: int, response: Any) -> None:
+        slot.consecutive_429 = 0
+        used = _usage_tokens(response)
+        if used is not None:
+            # 추정치와 실제 사용량 차이만큼 보정 (음수가 되면 그만큼 다음 요청이 늦어짐)
+            slot.tokens -= used - cost
+
+    def _on_rate_limit(self, slot: KeySlot, e: Exception) -> None:
+        slot.rate_limited += 1
+        slot.consecutive_429 += 1
+        delay = _retry_delay(e) or min(COOLDOWN_MAX, COOLDOWN_BASE * 2 ** (slot.consecutive_429 - 1))
+        slot.cooldown_until = max(slot.cooldown_until, time.monotonic() + delay)
+        slot.requests = 0.0
+        logger.warning(f"API 키 {slot.index + 1} 429 → {delay:.0f}초 쿨다운")
+
+    async def generate_content(self, *, model: str, contents: Any, config: Any = None) -> Any:
+        """여유가 가장 큰 키로 generate_content를 호출한다.
+
+        429를 받으면 그 키를 쿨다운시키고 RateLimitedError를 던진다
+        (호출 측 재시도는 자동으로 다른 키 또는 쿨다운이 끝난 키로 간다).
+        그 밖의 예외는 그대로 전달한다.
+        """
+        # 한 요청이 TPM 전체보다 크면 영원히 못 보내므로 TPM으로 자름
+        cost = min(estimate_tokens(contents), min(s.tpm for s in self.slots))
+        slot = await self.acquire(cost)
+        try:
+            response = await slot.client.aio.models.generate_content(
+                model=model, contents=contents, config=config
+            )
+        except Exception as e:
+            if is_rate_limit_error(e):
+                self._on_rate_limit(slot, e)
+                raise RateLimitedError(f"키 {slot.index + 1}: {e}") from e
+            slot.failed += 1
+            raise
+        self._on_success(slot, cost, response)
+        return response
+
+    def summary(self) -> str:
+        return " | ".join(
+            f"키{s.index + 1}: 요청 {s.sent:,} (429 {s.rate_limited:,}, 실패 {s.failed:,})"
+            for s in self.slots
+        )
@@ -1,5 +1,6 @@
 """component_llm 설정 및 상수."""
 
+import importlib.util
 import os
 from pathlib import Path
 
@@ -33,9 +34,31 @@ MYSQL_URL: str = (
 )
 
 # ── 추출 설정 ─────────────────────────────────────────
-MAX_CONCURRENT = 5        # 동시 API 요청 수
+INITIAL_CONCURRENT = 5    # 시작 동시 API 요청 수 (이후 AIMD로 자동 조정)
+MIN_CONCURRENT = 1        # 동시 요청 하한
+MAX_CONCURRENT = 64       # 동시 요청 상한 (= 상주 워커 수)
 MAX_RETRIES = 3           # API 실패 시 재시도
-BATCH_SIZE = 100          # asyncio.gather 배치 크기
+QUEUE_SIZE = 100          # 작업 묶음 큐 최대 길이 (파일 읽기가 API 호출보다 너무 앞서가지 않도록)
 FLUSH_EVERY = 30          # CSV 버퍼 flush 간격 (건수)
+BATCH_MAX_CLAIMS = 8      # 요청 1건에 묶는 독립항 수 상한 (1이면 청구항마다 요청)
+BATCH_MAX_CHARS = 20000   # 요청 1건에 묶는 청구항 텍스트 합계 상한 (긴 특허는 따로 보냄)
 MODEL_NAME = "gemini-2.0-flash"
 TEMPERATURE = 0
+
+# ── LLM 응답 캐시 (nh FTO 파이프라인과 같은 파일·구현 공유) ──
+LLM_CACHE_PATH: str = os.environ.get("LLM_CACHE_PATH", str(PROJECT_ROOT / "llm_cache.sqlite"))
+LLM_CACHE_MODULE = PROJECT_ROOT / "nh" / "patent_store" / "llm_cache.py"
+
+
+def open_llm_cache():
+    """nh/patent_store/llm_cache.py의 LLMCache를 연다.
+
+    nh 패키지 의존성(langchain 등)을 끌어오지 않도록 파일만 직접 로드.
+    LLM_CACHE_PATH가 비어 있거나 모듈 파일이 없으면 None (캐시 없이 실행).
+    """
+    if not LLM_CACHE_PATH or not LLM_CACHE_MODULE.exists():
+        return None
+    spec = importlib.util.spec_from_file_location("llm_cache", LLM_CACHE_MODULE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.open_llm_cache(LLM_CACHE_PATH)
@@ -3,32 +3,56 @@
 사용법:
     python -m component_llm.extract              # 전체 실행
     python -m component_llm.extract --sample 5   # 샘플 5건
+
+구조 (생산자/소비자):
+    생산자 1개가 JSON 파일을 읽어 (특허, 독립항) 작업을 묶음으로 크기 제한 큐에 계속 채우고,
+    MAX_CONCURRENT개의 상주 워커가 큐에서 묶음을 하나씩 꺼내 Gemini를 호출한다.
+    묶음 1개(독립항 최대 BATCH_MAX_CLAIMS개, 여러 특허 가능)는 요청 1건으로 보내고
+    청구항별 JSON 응답을 받는다. 응답에서 빠지거나 파싱되지 않은 청구항만 청구항별 요청으로 다시 보낸다.
+    느린 특허나 재시도 대기가 있어도 다른 워커는 계속 다음 작업을 처리한다.
+    실제 동시 요청 수는 AdaptiveLimiter가 INITIAL_CONCURRENT부터 응답 상태를 보고
+    MIN_CONCURRENT~MAX_CONCURRENT 사이에서 자동 조정한다 (429/5xx/타임아웃이면 절반으로).
 """
 
 import asyncio
 import csv
 import json
+import os
 import sys
+from dataclasses import dataclass
 from glob import glob
 from pathlib import Path
+from typing import Callable
 
-from google import genai
 from google.genai import types
 from loguru import logger
 
+from .adaptive_limiter import AdaptiveLimiter
+from .checkpoint import Checkpoint
+from .client_pool import ClientPool, RateLimitedError
 from .config import (
-    BATCH_SIZE,
+    BATCH_MAX_CHARS,
+    BATCH_MAX_CLAIMS,
     DATA_DIR,
     FLUSH_EVERY,
     GOOGLE_API_KEYS,
     LOG_DIR,
+    INITIAL_CONCURRENT,
     MAX_CONCURRENT,
     MAX_RETRIES,
+    MIN_CONCURRENT,
     MODEL_NAME,
     OUTPUT_DIR,
+    QUEUE_SIZE,
     TEMPERATURE,
+    open_llm_cache,
+)
+from .prompts import (
+    BATCH_SYSTEM_PROMPT,
+    SYSTEM_PROMPT,
+    build_batch_user_prompt,
+    build_user_prompt,
 )
-from .prompts import SYSTEM_PROMPT, build_user_prompt
 from .utils import (
     extract_patent_id,
     find_dependent_numbers,
@@ -54,6 +78,7 @@ logger.add(
 
 CSV_PATH = OUTPUT_DIR / "components.csv"
 FAIL_CSV_PATH = OUTPUT_DIR / "failed_patents.csv"
+CHECKPOINT_PATH = OUTPUT_DIR / "components_checkpoint.sqlite"
 CSV_HEADER = ["patent_id", "chunk_id", "components", "note"]
 FAIL_HEADER = ["patent_id", "claim_number", "error"]
 
@@ -68,6 +93,11 @@ class Stats:
         self.success = 0
         self.failed = 0
         self.no_claims = 0
+        self.files = 0        # 읽기를 마친 파일 수 (스킵 포함)
+        self.skipped = 0      # 체크포인트상 완료라 열지 않은 파일 수
+        self.batches = 0      # 묶음 요청 수
+        self.fallback = 0     # 묶음 응답에서 빠져 청구항별로 다시 요청한 수
+        self.next_log = 100   # 다음 진행 로그를 남길 처리 건수
         self._lock = asyncio.Lock()
 
     async def inc(self, field: str) -> None:
@@ -83,12 +113,19 @@ class Stats:
 
 
 class CsvBuffer:
-    """버퍼에 30건 쌓이면 CSV에 flush한다."""
-
-    def __init__(self, path: Path, header: list[str], flush_every: int) -> None:
+    """버퍼에 30건 쌓이면 CSV에 flush한다 (on_flush: 기록 직후 같은 행들로 호출)."""
+
+    def __init__(
+        self,
+        path: Path,
+        header: list[str],
+        flush_every: int,
+        on_flush: Callable[[list[list[str]]], None] | None = None,
+    ) -> None:
         self._path = path
         self._header = header
         self._flush_every = flush_every
+        self._on_flush = on_flush
         self._buffer: list[list[str]] = []
         self._lock = asyncio.Lock()
         # 기존 파일이 있으면 append 모드
@@ -111,6 +148,8 @@ class CsvBuffer:
                 self._initialized = True
             writer.writerows(self._buffer)
         logger.debug(f"CSV flush: {len(self._buffer)}건 → {self._path.name}")
+        if self._on_flush is not None:
+            self._on_flush(self._buffer)
         self._buffer.clear()
 
     async def flush_remaining(self) -> None:
@@ -118,76 +157,142 @@ class CsvBuffer:
             self._flush()
 
 
-# ── 이미 처리된 chunk_id 로드 ─────────────────────────
-
-
-def get_processed_chunk_ids() -> set[str]:
-    """기존 CSV에서 처리 완료된 chunk_id 집합을 로드한다."""
-    if not CSV_PATH.exists():
-        return set()
-    ids: set[str] = set()
-    with open(CSV_PATH, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            ids.add(row["chunk_id"])
-    return ids
+# ── LLM 호출 (키 여러 개에 분산) ───────────────────
 
+BATCH_MIME_TYPE = "application/json"
 
-# ── Gemini 클라이언트 생성 ────────────────────────────
 
+async def _generate(
+    pool: ClientPool,
+    limiter: AdaptiveLimiter,
+    contents: list[str],
+    label: str,
+    response_mime_type: str | None = None,
+) -> str | None:
+    """Gemini를 호출하여 응답 텍스트를 반환한다 (모든 재시도 실패 시 None).
 
-def _build_clients() -> list[genai.Client]:
-    """API 키별 Gemini 클라이언트 리스트를 생성한다."""
-    return [genai.Client(api_key=k) for k in GOOGLE_API_KEYS]
-
+    요청마다 여유가 가장 큰 API 키로 보내고, 실패하면 키 수 × MAX_RETRIES번까지 재시도.
+    429는 풀이 해당 키를 쿨다운시키므로 기다리지 않고 바로 다른 키로 재시도한다.
+    동시 요청 수는 limiter가 응답 상태(성공 지연, 429/5xx/타임아웃)를 보고 조절한다.
+    """
+    max_attempts = MAX_RETRIES * len(pool)
+    for attempt in range(max_attempts):
+        try:
+            async with limiter.slot():
+                response = await pool.generate_content(
+                    model=MODEL_NAME,
+                    contents=contents,
+                    config=types.GenerateContentConfig(
+                        temperature=TEMPERATURE,
+                        response_mime_type=response_mime_type,
+                    ),
+                )
+            text = (response.text or "").strip()
+            if not text:
+                logger.warning(f"빈 응답 (시도{attempt+1}): {label}")
+                continue
+            return text
+
+        except RateLimitedError as e:
+            logger.debug(f"429 (시도{attempt+1}): {label} - {e}")
+
+        except Exception as e:
+            logger.warning(
+                f"API 실패 (시도{attempt+1}, {type(e).__name__}): {label} - {e}"
+            )
+            if attempt < max_attempts - 1:
+                await asyncio.sleep(2 ** min(attempt, 3))
 
-# ── LLM 호출 (키 fallback 포함) ──────────────────────
+    return None
 
 
 async def call_gemini(
-    semaphore: asyncio.Semaphore,
-    clients: list[genai.Client],
+    pool: ClientPool,
+    limiter: AdaptiveLimiter,
     user_prompt: str,
     patent_id: str,
     claim_number: int,
+    cache=None,
 ) -> str | None:
-    """Gemini를 호출하여 구성요소 텍스트를 반환한다.
+    """독립항 1건의 구성요소 텍스트를 반환한다.
 
-    첫 번째 API 키로 MAX_RETRIES 시도 후 실패하면 다음 키로 재시도.
+    같은 프롬프트의 응답이 캐시에 있으면 호출하지 않는다.
+    캐시는 SQLite 블로킹 호출이므로 이벤트 루프를 막지 않도록 스레드에서 조회/저장한다.
     """
-    async with semaphore:
-        for key_idx, client in enumerate(clients):
-            for attempt in range(MAX_RETRIES):
-                try:
-                    response = await client.aio.models.generate_content(
-                        model=MODEL_NAME,
-                        contents=[SYSTEM_PROMPT, user_prompt],
-                        config=types.GenerateContentConfig(
-                            temperature=TEMPERATURE,
-                        ),
-                    )
-                    text = response.text.strip()
-                    if not text:
-                        logger.warning(
-                            f"빈 응답 (키{key_idx+1}, 시도{attempt+1}): "
-                            f"{patent_id} claim {claim_number}"
-                        )
-                        continue
-                    return text
-
-                except Exception as e:
-                    logger.warning(
-                        f"API 실패 (키{key_idx+1}, 시도{attempt+1}, "
-                        f"{type(e).__name__}): {patent_id} claim {claim_number} - {e}"
-                    )
-                    if attempt < MAX_RETRIES - 1:
-                        await asyncio.sleep(2**attempt)
+    contents = [SYSTEM_PROMPT, user_prompt]
+    if cache is not None:
+        cached = await asyncio.to_thread(cache.get, MODEL_NAME, contents, temperature=TEMPERATURE)
+        if cached is not None:
+            return cached
+
+    text = await _generate(pool, limiter, contents, f"{patent_id} claim {claim_number}")
+    if text is not None and cache is not None:
+        await asyncio.to_thread(cache.put, MODEL_NAME, contents, text, temperature=TEMPERATURE)
+    return text
 
-            # 현재 키 전부 실패 → 다음 키 시도
-            if key_idx < len(clients) - 1:
-                logger.info(f"API 키 {key_idx+1} 실패 → 키 {key_idx+2}로 전환")
 
-    return None
+def _parse_batch_response(text: str, keys: list[str]) -> dict[str, str]:
+    """묶음 JSON 응답 → {chunk_id: '구성요소:\n1. ...'} (형식이 맞는 청구항만)."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[-1].rsplit("```", 1)[0]
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+
+    parsed: dict[str, str] = {}
+    for key in keys:
+        value = data.get(key)
+        if isinstance(value, list):
+            items = [str(v).strip() for v in value if str(v).strip()]
+            if items:
+                lines = "\n".join(f"{i}. {item}" for i, item in enumerate(items, 1))
+                parsed[key] = f"구성요소:\n{lines}"
+        elif isinstance(value, str) and "구성요소:" in value:
+            parsed[key] = value.strip()
+    return parsed
+
+
+async def call_gemini_batch(
+    pool: ClientPool,
+    limiter: AdaptiveLimiter,
+    tasks: list["ClaimTask"],
+    cache=None,
+) -> dict[str, str] | None:
+    """독립항 여러 건을 요청 1건으로 보내 {chunk_id: 구성요소 텍스트}를 반환한다.
+
+    시스템 프롬프트와 같은 특허의 참고 청구항을 한 번만 보낸다.
+    응답에 없거나 형식이 틀린 청구항은 결과에서 빠진다 (호출 측이 청구항별로 다시 요청).
+    모든 청구항이 파싱된 응답만 캐시에 저장한다. API 호출 자체가 실패하면 None.
+    """
+    keys = [t.chunk_id for t in tasks]
+    contents = [
+        BATCH_SYSTEM_PROMPT,
+        build_batch_user_prompt([t.batch_target() for t in tasks]),
+    ]
+    if cache is not None:
+        cached = await asyncio.to_thread(
+            cache.get, MODEL_NAME, contents,
+            temperature=TEMPERATURE, response_mime_type=BATCH_MIME_TYPE,
+        )
+        if cached is not None:
+            return _parse_batch_response(cached, keys)
+
+    label = f"묶음 {len(tasks)}건 ({keys[0]} 외)"
+    text = await _generate(pool, limiter, contents, label, BATCH_MIME_TYPE)
+    if text is None:
+        return None
+
+    parsed = _parse_batch_response(text, keys)
+    if cache is not None and len(parsed) == len(keys):
+        await asyncio.to_thread(
+            cache.put, MODEL_NAME, contents, text,
+            temperature=TEMPERATURE, response_mime_type=BATCH_MIME_TYPE,
+        )
+    return parsed
 
 
 # ── 후처리 ────────────────────────────────────────────
@@ -202,42 +307,48 @@ def _clean_response(text: str) -> str:
     return text
 
 
-# ── 파일 처리 ─────────────────────────────────────────
+# ── 작업 생성 (생산자) ────────────────────────────────
 
 
-async def process_file(
-    semaphore: asyncio.Semaphore,
-    clients: list[genai.Client],
-    filepath: Path,
-    processed: set[str],
-    stats: Stats,
-    csv_buf: CsvBuffer,
-    fail_buf: CsvBuffer,
-    total_files: int,
-) -> None:
-    """특허 JSON 1건의 모든 독립항을 처리한다."""
+@dataclass
+class ClaimTask:
+    """독립항 1건의 추출 작업."""
+
+    patent_id: str
+    claim_number: int
+    chunk_id: str
+    user_prompt: str      # 청구항별 요청용 (묶음이 1건이거나 묶음 응답에서 빠졌을 때)
+    note: str
+    claim: dict
+    dep_claims: list[dict]
+    ref_claims: list[dict] | None
+
+    def batch_target(self) -> dict:
+        """build_batch_user_prompt 입력 1건."""
+        return {
+            "key": self.chunk_id,
+            "patent_id": self.patent_id,
+            "claim": self.claim,
+            "dependent_claims": self.dep_claims,
+            "referenced_claims": self.ref_claims,
+        }
+
+
+def build_claim_tasks(filepath: Path) -> list[ClaimTask] | None:
+    """특허 JSON 1건의 독립항별 작업을 만든다 (읽기 실패 시 None, 독립항 없으면 [])."""
     try:
         data = json.loads(filepath.read_text(encoding="utf-8"))
     except Exception as e:
         logger.error(f"JSON 읽기 실패: {filepath.name} - {e}")
-        await stats.inc("failed")
-        return
+        return None
 
     patent_id = extract_patent_id(filepath, data)
     independent_claims = get_independent_claims(data)
-
-    if not independent_claims:
-        await stats.inc("no_claims")
-        return
-
     all_claims = get_all_claims(data)
 
+    tasks: list[ClaimTask] = []
     for claim in independent_claims:
         claim_num = claim["claim_number"]
-        chunk_id = f"{patent_id}_claim_{claim_num}"
-
-        if chunk_id in processed:
-            continue
 
         # 종속항 찾기
         dep_nums = find_dependent_numbers(all_claims, claim_num)
@@ -251,36 +362,200 @@ async def process_file(
             if ref_nums else None
         )
 
-        # 프롬프트 빌드 & Gemini 호출
-        user_prompt = build_user_prompt(
-            claim, dep_claims, patent_id, ref_claims
-        )
-        result = await call_gemini(
-            semaphore, clients, user_prompt, patent_id, claim_num
-        )
+        tasks.append(ClaimTask(
+            patent_id=patent_id,
+            claim_number=claim_num,
+            chunk_id=f"{patent_id}_claim_{claim_num}",
+            user_prompt=build_user_prompt(claim, dep_claims, patent_id, ref_claims),
+            # note: 종속항 번호
+            note=f"dep {','.join(map(str, dep_nums))}" if dep_nums else "",
+            claim=claim,
+            dep_claims=dep_claims,
+            ref_claims=ref_claims,
+        ))
+    return tasks
+
+
+async def produce_tasks(
+    json_files: list[str],
+    done_files: set[str],
+    processed: set[str],
+    checkpoint: Checkpoint,
+    queue: asyncio.Queue,
+    stats: Stats,
+    num_workers: int,
+) -> None:
+    """파일을 순서대로 읽어 미처리 독립항 작업을 묶음(list[ClaimTask])으로 큐에 넣는다.
 
-        if result is None:
-            logger.error(f"추출 실패: {patent_id} claim {claim_num}")
-            await fail_buf.append([patent_id, str(claim_num), "LLM 응답 실패"])
-            await stats.inc("failed")
-            continue
+    여러 특허의 독립항을 이어서 모으다가 BATCH_MAX_CLAIMS개가 되거나
+    프롬프트 길이 합계가 BATCH_MAX_CHARS를 넘으려 하면 묶음 1개로 넣는다.
+    체크포인트에 완료로 기록된 파일은 열지 않고 건너뛴다.
+    큐가 가득 차면 워커가 꺼내 갈 때까지 기다리므로 메모리는 QUEUE_SIZE로 제한된다.
+    마지막에 워커 수만큼 종료 신호(None)를 넣는다.
+    """
+    batch: list[ClaimTask] = []
+    batch_chars = 0
+    try:
+        for f in json_files:
+            file_key = os.path.relpath(f, DATA_DIR)
+            await stats.inc("files")
+            if file_key in done_files:
+                await stats.inc("skipped")
+                continue
+
+            # 파일 읽기/파싱은 스레드에서 (이벤트 루프가 API 응답 처리를 계속하도록)
+            tasks = await asyncio.to_thread(build_claim_tasks, Path(f))
+            if tasks is None:
+                await stats.inc("failed")
+                continue
+            if not tasks:
+                checkpoint.mark_file_done(file_key)
+                await stats.inc("no_claims")
+                continue
+
+            pending = [t for t in tasks if t.chunk_id not in processed]
+            if not pending:
+                checkpoint.mark_file_done(file_key)
+                continue
+            checkpoint.expect(file_key, [t.chunk_id for t in pending])
+            for task in pending:
+                size = len(task.user_prompt)
+                if batch and (
+                    len(batch) >= BATCH_MAX_CLAIMS or batch_chars + size > BATCH_MAX_CHARS
+                ):
+                    await queue.put(batch)
+                    batch, batch_chars = [], 0
+                batch.append(task)
+                batch_chars += size
+        if batch:
+            await queue.put(batch)
+    finally:
+        for _ in range(num_workers):
+            await queue.put(None)
+
+
+# ── 작업 처리 (소비자) ────────────────────────────────
+
+
+async def process_claim(
+    pool: ClientPool,
+    limiter: AdaptiveLimiter,
+    task: ClaimTask,
+    stats: Stats,
+    csv_buf: CsvBuffer,
+    fail_buf: CsvBuffer,
+    checkpoint: Checkpoint,
+    cache=None,
+) -> None:
+    """독립항 1건의 구성요소를 추출해 CSV 버퍼에 쓴다."""
+    result = await call_gemini(
+        pool, limiter, task.user_prompt, task.patent_id, task.claim_number, cache
+    )
+
+    if result is None:
+        logger.error(f"추출 실패: {task.patent_id} claim {task.claim_number}")
+        await fail_buf.append([task.patent_id, str(task.claim_number), "LLM 응답 실패"])
+        checkpoint.fail(task.chunk_id)
+        await stats.inc("failed")
+        return
+
+    # 후처리: "구성요소:" 이후만 추출
+    result = _clean_response(result)
 
-        # 후처리: "구성요소:" 이후만 추출
-        result = _clean_response(result)
+    await csv_buf.append([task.patent_id, task.chunk_id, result, task.note])
+    await stats.inc("success")
 
-        # note: 종속항 번호
-        note = f"dep {','.join(map(str, dep_nums))}" if dep_nums else ""
 
-        await csv_buf.append([patent_id, chunk_id, result, note])
+async def process_batch(
+    pool: ClientPool,
+    limiter: AdaptiveLimiter,
+    batch: list[ClaimTask],
+    stats: Stats,
+    csv_buf: CsvBuffer,
+    fail_buf: CsvBuffer,
+    checkpoint: Checkpoint,
+    cache=None,
+) -> None:
+    """독립항 묶음을 요청 1건으로 추출하고, 응답에서 빠진 청구항만 청구항별로 다시 요청한다."""
+    if len(batch) == 1:
+        await process_claim(
+            pool, limiter, batch[0], stats, csv_buf, fail_buf, checkpoint, cache
+        )
+        return
+
+    results = await call_gemini_batch(pool, limiter, batch, cache)
+    await stats.inc("batches")
+
+    if results is None:
+        # 묶음 요청 자체가 실패해도 청구항별 요청은 성공할 수 있으므로 전부 재요청 대상으로 처리
+        logger.warning(f"묶음 요청 실패 ({len(batch)}건) → 청구항별 재요청")
+        results = {}
+
+    missing = []
+    for task in batch:
+        result = results.get(task.chunk_id)
+        if result is None:
+            missing.append(task)
+            continue
+        await csv_buf.append([task.patent_id, task.chunk_id, result, task.note])
         await stats.inc("success")
 
-    # 진행 로그 (100건마다)
-    done = stats.total
-    if done > 0 and done % 100 == 0:
-        logger.info(
-            f"진행: {done:,}/{total_files:,} "
-            f"(성공: {stats.success:,} | 실패: {stats.failed:,})"
+    if missing:
+        logger.warning(
+            f"묶음 응답 누락/파싱 실패 {len(missing)}/{len(batch)}건 → 청구항별 재요청: "
+            f"{', '.join(t.chunk_id for t in missing)}"
         )
+        for _ in missing:
+            await stats.inc("fallback")
+        await asyncio.gather(*(
+            process_claim(pool, limiter, task, stats, csv_buf, fail_buf, checkpoint, cache)
+            for task in missing
+        ))
+
+
+async def worker(
+    queue: asyncio.Queue,
+    pool: ClientPool,
+    limiter: AdaptiveLimiter,
+    stats: Stats,
+    csv_buf: CsvBuffer,
+    fail_buf: CsvBuffer,
+    checkpoint: Checkpoint,
+    total_files: int,
+    cache=None,
+) -> None:
+    """종료 신호(None)를 받을 때까지 큐에서 작업 묶음을 꺼내 처리한다."""
+    while True:
+        batch = await queue.get()
+        try:
+            if batch is None:
+                return
+            try:
+                await process_batch(
+                    pool, limiter, batch, stats, csv_buf, fail_buf, checkpoint, cache
+                )
+            except Exception as e:
+                for task in batch:
+                    logger.error(
+                        f"작업 실패 ({type(e).__name__}): {task.patent_id} "
+                        f"claim {task.claim_number} - {e}"
+                    )
+                    await fail_buf.append([task.patent_id, str(task.claim_number), str(e)])
+                    checkpoint.fail(task.chunk_id)
+                    await stats.inc("failed")
+
+            # 진행 로그 (청구항 100건마다, 묶음 단위로 처리되므로 100건을 넘긴 시점에)
+            done = stats.success + stats.failed
+            if done >= stats.next_log:
+                stats.next_log = (done // 100 + 1) * 100
+                logger.info(
+                    f"진행: 파일 {stats.files:,}/{total_files:,} (스킵 {stats.skipped:,}) | "
+                    f"성공: {stats.success:,} | 실패: {stats.failed:,} | "
+                    f"청구항없음: {stats.no_claims:,} | 대기 작업: {queue.qsize():,} | "
+                    f"동시 요청 한도: {limiter.current}"
+                )
+        finally:
+            queue.task_done()
 
 
 # ── 메인 ──────────────────────────────────────────────
@@ -292,8 +567,16 @@ async def main(sample: int = 0, skip: int = 0) -> None:
         logger.error("GOOGLE_API_KEY 환경변수가 설정되지 않았습니다.")
         sys.exit(1)
 
-    clients = _build_clients()
-    logger.info(f"API 키 {len(clients)}개 로드 | 동시 요청: {MAX_CONCURRENT}개")
+    pool = ClientPool(GOOGLE_API_KEYS)
+    limiter = AdaptiveLimiter(INITIAL_CONCURRENT, MIN_CONCURRENT, MAX_CONCURRENT)
+    logger.info(
+        f"API 키 {len(pool)}개 로드 | 동시 요청: {INITIAL_CONCURRENT}개에서 시작 "
+        f"(자동 조정 {MIN_CONCURRENT}~{MAX_CONCURRENT}) | "
+        f"묶음: 최대 {BATCH_MAX_CLAIMS}건 / {BATCH_MAX_CHARS:,}자"
+    )
+    cache = open_llm_cache()
+    if cache is not None:
+        logger.info(f"LLM 응답 캐시: {cache.path} ({len(cache):,}건)")
 
     json_files = sorted(glob(str(DATA_DIR / "**" / "*.json"), recursive=True))
     total = len(json_files)
@@ -305,44 +588,53 @@ async def main(sample: int = 0, skip: int = 0) -> None:
         json_files = json_files[:sample]
         logger.info(f"샘플 모드: {sample}건만 처리")
 
-    processed = get_processed_chunk_ids()
+    # 이어하기: CSV를 다시 읽지 않고 체크포인트에서 완료 파일/chunk 로드
+    checkpoint = Checkpoint(CHECKPOINT_PATH, CSV_PATH)
+    done_files = checkpoint.done_files()
+    processed = checkpoint.done_chunks()
     logger.info(
-        f"전체: {total:,} | 기처리 chunk: {len(processed):,} | 대상: {len(json_files):,}"
+        f"전체: {total:,} | 완료 파일: {len(done_files):,} | 기처리 chunk: {len(processed):,} | "
+        f"대상: {len(json_files):,}"
     )
 
-    semaphore = asyncio.Semaphore(MAX_CONCURRENT)
     stats = Stats()
-    csv_buf = CsvBuffer(CSV_PATH, CSV_HEADER, FLUSH_EVERY)
+    csv_buf = CsvBuffer(CSV_PATH, CSV_HEADER, FLUSH_EVERY, on_flush=checkpoint.on_csv_flush)
     fail_buf = CsvBuffer(FAIL_CSV_PATH, FAIL_HEADER, FLUSH_EVERY)
 
-    # 배치 처리
+    # 생산자 1개 + 상주 워커 MAX_CONCURRENT개 (실제 동시 요청은 limiter 한도만큼)
     file_count = len(json_files)
-    for batch_start in range(0, file_count, BATCH_SIZE):
-        batch = json_files[batch_start : batch_start + BATCH_SIZE]
-        tasks = [
-            process_file(
-                semaphore, clients, Path(f), processed, stats,
-                csv_buf, fail_buf, file_count,
+    queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    workers = [
+        asyncio.create_task(
+            worker(
+                queue, pool, limiter, stats, csv_buf, fail_buf, checkpoint, file_count, cache
             )
-            for f in batch
-        ]
-        await asyncio.gather(*tasks)
-
-        logger.info(
-            f"배치 [{batch_start+1}~{batch_start+len(batch)}] | "
-            f"성공: {stats.success:,} | 실패: {stats.failed:,} | "
-            f"청구항없음: {stats.no_claims:,}"
         )
+        for _ in range(MAX_CONCURRENT)
+    ]
+    await produce_tasks(
+        json_files, done_files, processed, checkpoint, queue, stats, len(workers)
+    )
+    await asyncio.gather(*workers)
 
     # 잔여분 flush
     await csv_buf.flush_remaining()
     await fail_buf.flush_remaining()
+    checkpoint.close()
 
     logger.info("=" * 50)
     logger.info(
         f"완료 — 성공: {stats.success:,} | 실패: {stats.failed:,} | "
-        f"청구항없음: {stats.no_claims:,}"
+        f"청구항없음: {stats.no_claims:,} | 완료 파일 스킵: {stats.skipped:,}"
+    )
+    logger.info(
+        f"묶음 요청: {stats.batches:,}건 | 묶음 응답 누락으로 청구항별 재요청: {stats.fallback:,}건"
     )
+    logger.info(pool.summary())
+    logger.info(limiter.summary())
+    if cache is not None:
+        logger.info(cache.stats())
+        cache.close()  # 모아 둔 조회 시각(accessed) 기록
     logger.info(f"CSV: {CSV_PATH}")
     if stats.failed > 0:
         logger.info(f"실패 목록: {FAIL_CSV_PATH}")
@@ -161,3 +161,75 @@ def build_user_prompt(
         f"=== 대상 청구항 (구성요소 추출 대상) ===\n{target_text}"
         f"{dep_text}"
     )
+
+
+# ── 일괄 추출 (여러 독립항을 요청 1건으로) ──────────────
+
+BATCH_OUTPUT_INSTRUCTION = """
+==================================================
+여러 청구항 일괄 추출 (이 요청에서는 위 '출력 형식' 대신 아래 JSON 형식 사용)
+==================================================
+
+- 유저 프롬프트에 [대상 KEY] 형식으로 대상 청구항이 여러 개 주어진다.
+  각 대상 청구항마다 위 규칙(step 1, step 2)을 독립적으로 적용할 것.
+- 같은 특허의 참고 청구항은 한 번만 제공된다. 각 대상 청구항은 자신이 인용한 청구항(참조 해소)과
+  자신을 인용하는 종속항(2.9 용어 해석)만 참고할 것.
+- 출력: JSON 객체 하나
+  - 키: 대상 KEY 그대로
+  - 값: 구성요소 문자열 배열 (위 출력 형식의 번호 목록 순서대로, 번호는 빼고)
+  예) {"1020200012345_claim_1": ["글리세린 5~20중량%", "미백용", "화장료 조성물"],
+       "1020200012345_claim_7": ["1단계: A,B 성분 혼합", "2단계: ...", "제조방법"]}
+- 모든 대상 KEY를 빠짐없이 포함할 것.
+"""
+
+BATCH_SYSTEM_PROMPT = SYSTEM_PROMPT + BATCH_OUTPUT_INSTRUCTION
+
+
+def _claim_block(c: dict) -> str:
+    refers = f", refers_to: {c.get('refers_to', [])}" if c.get("claim_type") == "dependent" else ""
+    return f"[청구항 {c['claim_number']}] ({c.get('claim_type', '')}{refers})\n{c['text']}"
+
+
+def build_batch_user_prompt(targets: list[dict]) -> str:
+    """여러 대상 독립항을 요청 1건의 유저 프롬프트로 조합한다.
+
+    targets: {"key", "patent_id", "claim", "dependent_claims", "referenced_claims"} 리스트.
+    같은 특허의 참조 청구항/종속항은 합쳐서 한 번만 넣는다.
+    """
+    by_patent: dict[str, list[dict]] = {}
+    for t in targets:
+        by_patent.setdefault(t["patent_id"], []).append(t)
+
+    sections = []
+    for patent_id, items in by_patent.items():
+        target_nums = {t["claim"]["claim_number"] for t in items}
+        context: dict[int, dict] = {}
+        for t in items:
+            for c in (t.get("referenced_claims") or []) + t["dependent_claims"]:
+                if c["claim_number"] not in target_nums and c.get("text", "").strip():
+                    context.setdefault(c["claim_number"], c)
+
+        parts = [f"##### 출원번호: {patent_id} #####"]
+        if context:
+            lines = "\n\n".join(_claim_block(context[n]) for n in sorted(context))
+            parts.append(
+                "=== 참고 청구항 (step 1 참조 해소 / 2.9 용어 해석용 "
+                f"— 종속항 자체의 구성요소는 추출 금지) ===\n{lines}"
+            )
+
+        target_lines = []
+        for t in items:
+            claim = t["claim"]
+            refs = ", ".join(str(c["claim_number"]) for c in t.get("referenced_claims") or [])
+            deps = ", ".join(str(c["claim_number"]) for c in t["dependent_claims"])
+            meta = "".join([
+                f" | 참조 청구항: {refs}" if refs else "",
+                f" | 관련 종속항: {deps}" if deps else "",
+            ])
+            target_lines.append(
+                f"[대상 {t['key']}] 청구항 {claim['claim_number']} (independent){meta}\n{claim['text']}"
+            )
+        parts.append("=== 대상 청구항 (구성요소 추출 대상) ===\n" + "\n\n".join(target_lines))
+        sections.append("\n\n".join(parts))
+
+    return "\n\n\n".join(sections)
@@ -5,10 +5,13 @@
 
 환경변수:
     GOOGLE_API_KEY   - Gemini API 키 (필수)
-    GOOGLE_API_KEY_2 - 백업 API 키 (선택)
+    GOOGLE_API_KEY_2 - 추가 API 키 (선택, 있으면 요청을 두 키에 분산)
+    GEMINI_RPM / GEMINI_TPM - 키 1개당 분당 요청/토큰 한도 (기본 2000 / 4,000,000)
+    GEMINI_BASE_URL  - API 주소 변경 (로컬 가짜 서버 테스트용)
 """
 
 import asyncio
+import importlib.util
 import json
 import os
 import re
@@ -17,7 +20,6 @@ from glob import glob
 from pathlib import Path
 
 from dotenv import load_dotenv
-from google import genai
 from google.genai import types
 from loguru import logger
 
@@ -58,9 +60,47 @@ logger.add(
 
 load_dotenv(PROJECT_ROOT / ".env")
 
-MAX_CONCURRENT = 30
+INITIAL_CONCURRENT = 30   # 시작 동시 요청 수 (이후 AIMD로 자동 조정)
+MIN_CONCURRENT = 1
+MAX_CONCURRENT = 256      # 동시 요청 상한 (= 상주 워커 수, 실제 동시 요청은 limiter가 찾은 한도만큼)
 MAX_RETRIES = 3
-BATCH_SIZE = 100  # 한 번에 gather할 태스크 수
+QUEUE_SIZE = 1000         # 파일 큐 최대 길이 (파일 목록을 한꺼번에 태스크로 만들지 않음)
+MODEL_NAME = "gemini-2.0-flash"
+TEMPERATURE = 0.1
+
+
+# ── 공유 모듈 (nh/dj 다른 스크립트와 같은 구현 사용) ────
+
+
+def _find_repo_root() -> Path:
+    """nh/와 dj/가 있는 저장소 루트 (스크립트 위치가 바뀌어도 찾도록 위로 올라가며 검색)."""
+    for parent in Path(__file__).resolve().parents:
+        if (parent / "nh").is_dir() and (parent / "dj").is_dir():
+            return parent
+    return PROJECT_ROOT
+
+
+def _load_module(path: Path, name: str):
+    """패키지 import 없이 파일 경로로 모듈을 로드한다."""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+REPO_ROOT = _find_repo_root()
+
+# 여러 API 키 분산 호출 / AIMD 동시 요청 조절 (component_llm과 같은 구현)
+_client_pool = _load_module(REPO_ROOT / "dj" / "component_llm" / "client_pool.py", "client_pool")
+ClientPool = _client_pool.ClientPool
+RateLimitedError = _client_pool.RateLimitedError
+_adaptive_limiter = _load_module(REPO_ROOT / "dj" / "component_llm" / "adaptive_limiter.py", "adaptive_limiter")
+AdaptiveLimiter = _adaptive_limiter.AdaptiveLimiter
+
+# LLM 응답 캐시 (nh FTO 파이프라인·component_llm과 같은 파일·구현 공유, 빈 값이면 사용 안 함)
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", str(REPO_ROOT / "llm_cache.sqlite"))
+LLM_CACHE_MODULE = REPO_ROOT / "nh" / "patent_store" / "llm_cache.py"
 
 
 def _load_api_keys() -> list[str]:
@@ -73,6 +113,13 @@ def _load_api_keys() -> list[str]:
     return keys
 
 
+def _open_llm_cache():
+    """nh/patent_store/llm_cache.py의 LLMCache를 연다 (nh 패키지 의존성 없이 파일만 로드)."""
+    if not LLM_CACHE_PATH or not LLM_CACHE_MODULE.exists():
+        return None
+    return _load_module(LLM_CACHE_MODULE, "llm_cache").open_llm_cache(LLM_CACHE_PATH)
+
+
 # ── 통계 ────────────────────────────────────────────────
 
 
@@ -98,41 +145,65 @@ class Stats:
 
 
 async def call_gemini_async(
-    semaphore: asyncio.Semaphore,
-    client: genai.Client,
+    limiter: AdaptiveLimiter,
+    pool: ClientPool,
     claims_text: str,
     patent_id: str,
+    cache=None,
 ) -> dict | None:
-    """Gemini 2.0 Flash를 네이티브 async로 호출한다."""
-    user_prompt = f"출원번호: {patent_id}\n\n청구항:\n{claims_text}"
+    """Gemini 2.0 Flash를 네이티브 async로 호출한다.
 
-    async with semaphore:
-        for attempt in range(MAX_RETRIES):
-            try:
-                response = await client.aio.models.generate_content(
-                    model="gemini-2.0-flash",
-                    contents=[SYSTEM_PROMPT, user_prompt],
+    같은 프롬프트의 응답이 캐시에 있으면 호출하지 않는다 (파싱에 성공한 응답만 저장).
+    캐시는 SQLite 블로킹 호출이므로 이벤트 루프를 막지 않도록 스레드에서 조회/저장한다.
+    요청마다 여유가 가장 큰 API 키로 보내고, 429는 다른 키로 바로 재시도한다.
+    동시 요청 수는 limiter가 응답 상태(성공 지연, 429/5xx/타임아웃)를 보고 조절한다.
+    """
+    user_prompt = f"출원번호: {patent_id}\n\n청구항:\n{claims_text}"
+    contents = [SYSTEM_PROMPT, user_prompt]
+    cache_params = {"temperature": TEMPERATURE, "response_mime_type": "application/json"}
+    if cache is not None:
+        cached = await asyncio.to_thread(cache.get, MODEL_NAME, contents, **cache_params)
+        if cached is not None:
+            return json.loads(cached)
+
+    max_attempts = MAX_RETRIES * len(pool)
+    for attempt in range(max_attempts):
+        text = ""
+        try:
+            async with limiter.slot():
+                response = await pool.generate_content(
+                    model=MODEL_NAME,
+                    contents=contents,
                     config=types.GenerateContentConfig(
                         response_mime_type="application/json",
-                        temperature=0.1,
+                        temperature=TEMPERATURE,
                     ),
                 )
-                text = response.text.strip()
-                return json.loads(text)
-
+            text = (response.text or "").strip()
+            result = json.loads(text)
+            if cache is not None:
+                await asyncio.to_thread(cache.put, MODEL_NAME, contents, text, **cache_params)
+            return result
+
+        except json.JSONDecodeError:
+            cleaned = re.sub(r"```json\s*|\s*```", "", text)
+            try:
+                result = json.loads(cleaned)
+                if cache is not None:
+                    await asyncio.to_thread(cache.put, MODEL_NAME, contents, cleaned, **cache_params)
+                return result
             except json.JSONDecodeError:
-                cleaned = re.sub(r"```json\s*|\s*```", "", text)
-                try:
-                    return json.loads(cleaned)
-                except json.JSONDecodeError:
-                    logger.warning(f"JSON 파싱 실패 (시도 {attempt+1}): {patent_id}")
+                logger.warning(f"JSON 파싱 실패 (시도 {attempt+1}): {patent_id}")
 
-            except Exception as e:
-                logger.warning(
-                    f"API 실패 (시도 {attempt+1}, {type(e).__name__}): {patent_id} - {e}"
-                )
-                if attempt < MAX_RETRIES - 1:
-                    await asyncio.sleep(2**attempt)
+        except RateLimitedError as e:
+            logger.debug(f"429 (시도 {attempt+1}): {patent_id} - {e}")
+
+        except Exception as e:
+            logger.warning(
+                f"API 실패 (시도 {attempt+1}, {type(e).__name__}): {patent_id} - {e}"
+            )
+            if attempt < max_attempts - 1:
+                await asyncio.sleep(2 ** min(attempt, 3))
 
     return None
 
@@ -141,12 +212,13 @@ async def call_gemini_async(
 
 
 async def process_file(
-    semaphore: asyncio.Semaphore,
-    client: genai.Client,
+    limiter: AdaptiveLimiter,
+    pool: ClientPool,
     filepath: Path,
     processed: set[str],
     stats: Stats,
     total: int,
+    cache=None,
 ) -> None:
     """특허 JSON 1건을 처리한다."""
     # 빠른 스킵
@@ -179,7 +251,7 @@ async def process_file(
 
     # LLM 호출
     result = await call_gemini_async(
-        semaphore, client, format_claims_for_prompt(claims), patent_id
+        limiter, pool, format_claims_for_prompt(claims), patent_id, cache
     )
 
     if result is None:
@@ -192,7 +264,47 @@ async def process_file(
     # 진행 상황 (100건마다)
     done = stats.processed_total
     if done % 100 == 0:
-        logger.info(f"진행: {done:,}/{total:,} (성공: {stats.success:,} | 실패: {stats.failed:,})")
+        logger.info(
+            f"진행: {done:,}/{total:,} (성공: {stats.success:,} | 실패: {stats.failed:,}) | "
+            f"동시 요청 한도: {limiter.current}"
+        )
+
+
+async def worker(
+    queue: asyncio.Queue,
+    limiter: AdaptiveLimiter,
+    pool: ClientPool,
+    processed: set[str],
+    stats: Stats,
+    total: int,
+    cache=None,
+) -> None:
+    """종료 신호(None)를 받을 때까지 큐에서 파일을 꺼내 처리한다."""
+    while True:
+        filepath = await queue.get()
+        try:
+            if filepath is None:
+                return
+            try:
+                await process_file(limiter, pool, filepath, processed, stats, total, cache)
+            except Exception as e:
+                logger.error(f"작업 실패 ({type(e).__name__}): {filepath.name} - {e}")
+                await stats.inc("failed")
+        finally:
+            queue.task_done()
+
+
+async def produce_files(json_files: list[str], queue: asyncio.Queue, num_workers: int) -> None:
+    """파일 경로를 순서대로 큐에 넣고, 마지막에 워커 수만큼 종료 신호(None)를 넣는다.
+
+    큐가 가득 차면 워커가 꺼내 갈 때까지 기다리므로 대기 작업 수는 QUEUE_SIZE로 제한된다.
+    """
+    try:
+        for f in json_files:
+            await queue.put(Path(f))
+    finally:
+        for _ in range(num_workers):
+            await queue.put(None)
 
 
 # ── 메인 ────────────────────────────────────────────────
@@ -205,8 +317,15 @@ async def main() -> None:
         logger.error("GOOGLE_API_KEY 환경변수가 설정되지 않았습니다.")
         sys.exit(1)
 
-    client = genai.Client(api_key=api_keys[0])
-    logger.info(f"API 키 {len(api_keys)}개 로드 | 동시 요청: {MAX_CONCURRENT}개")
+    pool = ClientPool(api_keys)
+    limiter = AdaptiveLimiter(INITIAL_CONCURRENT, MIN_CONCURRENT, MAX_CONCURRENT)
+    logger.info(
+        f"API 키 {len(api_keys)}개 로드 | 동시 요청: {INITIAL_CONCURRENT}개에서 시작 "
+        f"(자동 조정 {MIN_CONCURRENT}~{MAX_CONCURRENT})"
+    )
+    cache = _open_llm_cache()
+    if cache is not None:
+        logger.info(f"LLM 응답 캐시: {cache.path} ({len(cache):,}건)")
 
     json_files = sorted(glob(str(DATA_DIR / "**" / "*.json"), recursive=True))
     total = len(json_files)
@@ -214,28 +333,27 @@ async def main() -> None:
     remaining = total - len(processed)
     logger.info(f"전체: {total:,} | 처리됨: {len(processed):,} | 남은: {remaining:,}")
 
-    semaphore = asyncio.Semaphore(MAX_CONCURRENT)
     stats = Stats()
 
-    # 배치 단위로 처리 (78K개를 한번에 gather하면 멈춤)
-    for batch_start in range(0, total, BATCH_SIZE):
-        batch = json_files[batch_start : batch_start + BATCH_SIZE]
-        tasks = [
-            process_file(semaphore, client, Path(f), processed, stats, total)
-            for f in batch
-        ]
-        await asyncio.gather(*tasks)
-
-        done = stats.processed_total
-        logger.info(
-            f"배치 완료 [{batch_start+1}~{batch_start+len(batch)}] | "
-            f"성공: {stats.success:,} | 실패: {stats.failed:,} | 청구항없음: {stats.no_claims:,}"
-        )
+    # 생산자 1개 + 상주 워커 MAX_CONCURRENT개: 배치 경계에서 가장 느린 특허를 기다리지 않고
+    # 끝난 워커가 바로 다음 파일을 가져감 (실제 동시 요청은 limiter 한도만큼)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    workers = [
+        asyncio.create_task(worker(queue, limiter, pool, processed, stats, total, cache))
+        for _ in range(MAX_CONCURRENT)
+    ]
+    await produce_files(json_files, queue, len(workers))
+    await asyncio.gather(*workers)
 
     logger.info("=" * 50)
     logger.info(
         f"완료 — 성공: {stats.success:,} | 실패: {stats.failed:,} | 청구항없음: {stats.no_claims:,}"
     )
+    logger.info(pool.summary())
+    logger.info(limiter.summary())
+    if cache is not None:
+        logger.info(cache.stats())
+        cache.close()  # 모아 둔 조회 시각(accessed) 기록
     logger.info(f"결과: {OUTPUT_DIR}")
 
 
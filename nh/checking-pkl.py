@@ -1,7 +1,6 @@
-import pickle
+from patent_store import load_child_documents
 
-with open('child_documents.pkl', 'rb') as f:
-    child_docs = pickle.load(f)
+child_docs = load_child_documents('child_documents.pkl')
 
 empty_docs = [d for d in child_docs if not d.page_content or not d.page_content.strip()]
 print(f'빈 문서 수: {len(empty_docs)} / 전체: {len(child_docs)}')
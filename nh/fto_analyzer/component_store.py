@@ -0,0 +1,185 @@
+"""
+사전 추출된 청구항 구성요소 저장소 (Step A 결과 재사용)
+
+dj/component_llm이 모든 독립항의 구성요소를 미리 추출해 둔 결과
+(components.csv 또는 MySQL components 테이블, chunk_id = '{patent_id}_claim_{N}')를
+로컬 SQLite로 옮겨 두고, FTO 분석 시 Step A LLM 호출 대신 조회함.
+없는 청구항만 기존처럼 Step A를 실행.
+
+    python -m fto_analyzer.component_store ../dj/component_llm/output/components.csv
+    python -m fto_analyzer.component_store --mysql        # MySQL components 테이블에서 생성
+
+    store = ComponentStore('component_store.sqlite')
+    components = store.get('1020200012345', 1)   # ['글리세린 5~20중량%', ...] 또는 None
+"""
+
+import csv
+import os
+import re
+import sqlite3
+import sys
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS components (
+    chunk_id   TEXT PRIMARY KEY,   -- '{patent_id}_claim_{N}' (patent_id는 숫자만)
+    patent_id  TEXT NOT NULL,
+    components TEXT NOT NULL       -- component_llm 원문 ('구성요소:\\n1. ...\\n2. ...')
+) WITHOUT ROWID;
+"""
+
+
+def make_component_chunk_id(patent_id: str, claim_number) -> str:
+    """
+    dj/component_llm과 같은 chunk_id 형식
+
+    출원번호 표기('10-2020-0012345' / '1020200012345')가 소스마다 달라서 숫자만 남겨 저장/조회
+    """
+    patent_id = re.sub(r'\D', '', str(patent_id)) or str(patent_id)
+    return f"{patent_id}_claim_{claim_number}"
+
+
+def _normalize_chunk_id(chunk_id: str) -> str:
+    patent_id, _, claim_number = chunk_id.rpartition('_claim_')
+    return make_component_chunk_id(patent_id, claim_number) if patent_id else chunk_id
+
+
+def parse_component_text(text: str) -> List[str]:
+    """
+    component_llm 응답 텍스트 → 구성요소 리스트 (Step A 결과와 같은 형식)
+
+    '구성요소:' 이후의 번호 목록(1. / 1) / - )을 항목으로 사용
+    """
+    marker = text.rfind("구성요소:")
+    if marker >= 0:
+        text = text[marker + len("구성요소:"):]
+
+    items = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        match = re.match(r'^(?:\d+[.)]|[-*•])\s*(.+)$', line)
+        if match:
+            items.append(match.group(1).strip())
+        elif items:
+            # 번호 없는 줄은 앞 항목이 줄바꿈된 것으로 보고 이어 붙임
+            items[-1] = f"{items[-1]} {line}"
+    return items
+
+
+class ComponentStore:
+    """chunk_id → 사전 추출 구성요소 (읽기 전용 조회는 스레드 안전)"""
+
+    def __init__(self, path: str = 'component_store.sqlite', readonly: bool = True):
+        self.path = path
+        if readonly:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"구성요소 저장소가 없습니다: {path} (python -m fto_analyzer.component_store 실행 필요)")
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM components").fetchone()[0]
+
+    def get(self, patent_id: str, claim_number) -> Optional[List[str]]:
+        """청구항 1건의 구성요소 리스트 (없거나 비어 있으면 None)"""
+        chunk_id = make_component_chunk_id(patent_id, claim_number)
+        with self._lock:
+            row = self.conn.execute("SELECT components FROM components WHERE chunk_id = ?", (chunk_id,)).fetchone()
+            components = parse_component_text(row[0]) if row else []
+            if components:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return components or None
+
+    def put_many(self, rows: Iterable[Tuple[str, str, str]]) -> int:
+        """(chunk_id, patent_id, components) 저장. 저장 건수 반환"""
+        rows = [(_normalize_chunk_id(chunk_id), patent_id, components) for chunk_id, patent_id, components in rows]
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO components (chunk_id, patent_id, components) VALUES (?, ?, ?)", rows
+            )
+            self.conn.commit()
+        return len(rows)
+
+
+def build_component_store_from_csv(csv_path: str, store_path: str = 'component_store.sqlite',
+                                   batch_size: int = 10000) -> int:
+    """components.csv → 구성요소 저장소. 저장 건수 반환"""
+    csv.field_size_limit(sys.maxsize)
+    total = 0
+    with ComponentStore(store_path, readonly=False) as store, open(csv_path, encoding='utf-8') as f:
+        batch = []
+        for row in csv.DictReader(f):
+            batch.append((row['chunk_id'], row['patent_id'], row['components']))
+            if len(batch) >= batch_size:
+                total += store.put_many(batch)
+                batch = []
+        total += store.put_many(batch)
+    return total
+
+
+def build_component_store_from_mysql(store_path: str = 'component_store.sqlite', batch_size: int = 10000) -> int:
+    """MySQL components 테이블 → 구성요소 저장소 (.env의 MYSQL_* 접속 정보 사용). 저장 건수 반환"""
+    import pymysql
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    conn = pymysql.connect(
+        host=os.environ.get('MYSQL_HOST', '127.0.0.1'),
+        port=int(os.environ.get('MYSQL_PORT', '3306')),
+        user=os.environ.get('MYSQL_USER', 'root'),
+        password=os.environ.get('MYSQL_PASSWORD', ''),
+        database=os.environ.get('MYSQL_DATABASE', 'patent_fto'),
+        charset='utf8mb4',
+    )
+    total = 0
+    try:
+        with ComponentStore(store_path, readonly=False) as store, conn.cursor(pymysql.cursors.SSCursor) as cur:
+            cur.execute("SELECT chunk_id, patent_id, components FROM components")
+            while True:
+                batch = cur.fetchmany(batch_size)
+                if not batch:
+                    break
+                total += store.put_many(batch)
+    finally:
+        conn.close()
+    return total
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("csv_path", nargs='?', help="dj/component_llm/output/components.csv")
+    parser.add_argument("--mysql", action="store_true", help="CSV 대신 MySQL components 테이블에서 생성")
+    parser.add_argument("--out", default='component_store.sqlite')
+    args = parser.parse_args()
+
+    if args.mysql:
+        count = build_component_store_from_mysql(args.out)
+    elif args.csv_path:
+        count = build_component_store_from_csv(args.csv_path, args.out)
+    else:
+        parser.error("csv_path 또는 --mysql 중 하나가 필요합니다")
+    print(f"✓ 구성요소 저장소 생성 완료: {args.out} ({count:,}건)")
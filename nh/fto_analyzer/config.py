@@ -10,7 +10,22 @@ if not GOOGLE_API_KEY:
 
 genai.configure(api_key=GOOGLE_API_KEY)
 
+# 특허별 분석(Step A → B → C) 동시 실행 설정
+FTO_MAX_WORKERS = 5          # 동시에 분석할 특허 수 (1이면 순차 실행)
+FTO_PATENT_TIMEOUT = 180.0   # 특허 1건 분석 제한 시간 (초, None이면 무제한)
+
+# 사전 추출 구성요소 저장소 (없으면 Step A를 항상 LLM으로 실행)
+COMPONENT_STORE_PATH = os.environ.get('COMPONENT_STORE_PATH', 'component_store.sqlite')
+
+# Step A/B/C 응답 캐시 (dj 추출 스크립트와 같은 파일 공유, 빈 문자열이면 캐시 사용 안 함)
+LLM_CACHE_PATH = os.environ.get(
+    'LLM_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'llm_cache.sqlite')
+)
+
+MODEL_NAME = "gemini-2.0-flash"
+
 
 def get_model():
     """Gemini 2.0 Flash 모델 인스턴스 반환"""
-    return genai.GenerativeModel("gemini-2.0-flash")
+    return genai.GenerativeModel(MODEL_NAME)
@@ -1,7 +1,7 @@
 """
 FTO 분석 3단계 파이프라인
 
-Step A: 특허 청구항에서 구성요소 추출
+Step A: 특허 청구항에서 구성요소 추출 (사전 추출 저장소에 있으면 LLM 호출 생략)
 Step B: 구성 대비 (사용자 제품 vs 특허)
 Step C: 판단 및 결론
 
@@ -9,11 +9,62 @@ Step C: 판단 및 결론
 """
 
 import json
+import os
+import threading
+from typing import Optional
 import google.generativeai as genai
-from .config import get_model
+from patent_store.llm_cache import open_llm_cache
+from .component_store import ComponentStore
+from .config import COMPONENT_STORE_PATH, LLM_CACHE_PATH, MODEL_NAME, get_model
 from .prompts import STEP_A_PROMPT, STEP_B_PROMPT, STEP_C_PROMPT
 
 
+# ============================================
+# LLM 호출 (응답 캐시)
+# ============================================
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Step A/B/C 응답 캐시 (LLM_CACHE_PATH가 비어 있거나 열 수 없으면 None, 처음 호출할 때 한 번만 열기)"""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            cache = open_llm_cache(LLM_CACHE_PATH)
+            _llm_cache = cache if cache is not None else False
+        return _llm_cache if _llm_cache is not False else None
+
+
+def generate_json(prompt: str):
+    """
+    temperature 0 JSON 응답 생성 → 파싱 결과 반환
+
+    같은 (모델, 프롬프트)의 응답이 캐시에 있으면 LLM을 호출하지 않음.
+    파싱에 성공한 응답만 캐시에 저장
+    """
+    cache = get_llm_cache()
+    if cache is not None:
+        cached = cache.get(MODEL_NAME, prompt, temperature=0, response_mime_type="application/json")
+        if cached is not None:
+            return json.loads(cached)
+
+    model = get_model()
+    response = model.generate_content(
+        contents=[{"role": "user", "parts": [{"text": prompt}]}],
+        generation_config=genai.GenerationConfig(
+            temperature=0,
+            response_mime_type="application/json"
+        )
+    )
+
+    result = json.loads(response.text)
+    if cache is not None:
+        cache.put(MODEL_NAME, prompt, response.text, temperature=0, response_mime_type="application/json")
+    return result
+
+
 # ============================================
 # 등록 여부 판정
 # ============================================
@@ -45,6 +96,32 @@ def is_patent_registered(patent: dict) -> bool:
 # 청구항 텍스트 관련 유틸리티
 # ============================================
 
+def find_independent_claim(all_claims):
+    """
+    extract_independent_claim과 같은 기준으로 고른 청구항 dict (dict 형식이 아니거나 없으면 None)
+    """
+    if not all_claims or not isinstance(all_claims[0], dict):
+        return None
+
+    registered = [c for c in all_claims if c.get('source_type') in ('registered', '등록')]
+    pool = registered if registered else all_claims
+
+    sorted_claims = sorted(pool, key=lambda c: int(c.get('claim_number', 999)))
+
+    for claim in sorted_claims:
+        if claim.get('claim_type') == 'independent':
+            text = claim.get('text', '').strip()
+            if text and '(삭제)' not in text:
+                return claim
+
+    for claim in sorted_claims:
+        text = claim.get('text', '').strip()
+        if text and '(삭제)' not in text:
+            return claim
+
+    return None
+
+
 def extract_independent_claim(all_claims):
     """
     특허의 all_claims에서 첫 번째 독립항 텍스트를 추출
@@ -58,21 +135,8 @@ def extract_independent_claim(all_claims):
 
     # dict 형식
     if isinstance(all_claims[0], dict):
-        registered = [c for c in all_claims if c.get('source_type') in ('registered', '등록')]
-        pool = registered if registered else all_claims
-
-        sorted_claims = sorted(pool, key=lambda c: int(c.get('claim_number', 999)))
-
-        for claim in sorted_claims:
-            if claim.get('claim_type') == 'independent':
-                text = claim.get('text', '').strip()
-                if text and '(삭제)' not in text:
-                    return text
-
-        for claim in sorted_claims:
-            text = claim.get('text', '').strip()
-            if text and '(삭제)' not in text:
-                return text
+        claim = find_independent_claim(all_claims)
+        return claim.get('text', '').strip() if claim else None
 
     # string 형식
     elif isinstance(all_claims[0], str):
@@ -126,6 +190,39 @@ def get_unregistered_template(patent: dict) -> str:
 # Step A: 구성요소 추출
 # ============================================
 
+_component_store = None
+_component_store_lock = threading.Lock()
+
+
+def get_component_store():
+    """사전 추출 구성요소 저장소 (파일이 없으면 None, 처음 호출할 때 한 번만 열기)"""
+    global _component_store
+    with _component_store_lock:
+        if _component_store is None:
+            _component_store = ComponentStore(COMPONENT_STORE_PATH) if os.path.exists(COMPONENT_STORE_PATH) else False
+        return _component_store or None
+
+
+def lookup_precomputed_components(patent: dict):
+    """
+    dj/component_llm이 미리 추출한 독립항 구성요소 조회 (없으면 None)
+
+    component_llm은 last_version 독립항을 '{patent_id}_claim_{N}'으로 저장하므로,
+    분석 대상 청구항이 last_version일 때만 사용
+    """
+    store = get_component_store()
+    if store is None:
+        return None
+
+    claim = find_independent_claim(patent.get('all_claims', []))
+    if not claim or claim.get('source_type', 'last_version') != 'last_version' \
+            or claim.get('claim_type') != 'independent':
+        return None
+
+    patent_id = patent.get('application_number') or patent.get('parent_id', '')
+    return store.get(patent_id, claim.get('claim_number'))
+
+
 def step_a_extract_components(claim_text: str) -> list:
     """
     Step A: 청구항에서 구성요소 추출
@@ -133,18 +230,9 @@ def step_a_extract_components(claim_text: str) -> list:
     Returns:
         list: 구성요소 리스트 (JSON 배열)
     """
-    model = get_model()
     prompt = f"{STEP_A_PROMPT}\n\n## 분석할 청구항\n{claim_text}"
 
-    response = model.generate_content(
-        contents=[{"role": "user", "parts": [{"text": prompt}]}],
-        generation_config=genai.GenerationConfig(
-            temperature=0,
-            response_mime_type="application/json"
-        )
-    )
-
-    result = json.loads(response.text)
+    result = generate_json(prompt)
 
     if isinstance(result, dict) and 'components' in result:
         return result['components']
@@ -165,7 +253,6 @@ def step_b_compare(patent_components: list, user_query: str, user_components: st
     Returns:
         dict: 구성대비 결과 (comparison 키 포함)
     """
-    model = get_model()
     user_input = f"""## 특허 구성요소
 {json.dumps(patent_components, ensure_ascii=False)}
 
@@ -177,15 +264,7 @@ def step_b_compare(patent_components: list, user_query: str, user_components: st
 
     prompt = f"{STEP_B_PROMPT}\n\n{user_input}"
 
-    response = model.generate_content(
-        contents=[{"role": "user", "parts": [{"text": prompt}]}],
-        generation_config=genai.GenerationConfig(
-            temperature=0,
-            response_mime_type="application/json"
-        )
-    )
-
-    result = json.loads(response.text)
+    result = generate_json(prompt)
 
     if isinstance(result, dict) and 'comparison' in result:
         return result
@@ -206,21 +285,12 @@ def step_c_judge(comparison_result: dict) -> dict:
     Returns:
         dict: {"judgment": "...", "conclusion": "..."}
     """
-    model = get_model()
     user_input = f"""## 구성 대비 결과
 {json.dumps(comparison_result, ensure_ascii=False)}"""
 
     prompt = f"{STEP_C_PROMPT}\n\n{user_input}"
 
-    response = model.generate_content(
-        contents=[{"role": "user", "parts": [{"text": prompt}]}],
-        generation_config=genai.GenerationConfig(
-            temperature=0,
-            response_mime_type="application/json"
-        )
-    )
-
-    result = json.loads(response.text)
+    result = generate_json(prompt)
 
     if 'judgment' not in result:
         result['judgment'] = '분석 결과를 생성할 수 없습니다.'
@@ -234,12 +304,23 @@ def step_c_judge(comparison_result: dict) -> dict:
 # 단일 특허 분석 (등록/미등록 분기)
 # ============================================
 
-def analyze_single_patent(patent: dict, user_query: str, user_components: str) -> dict:
+class AnalysisCancelled(Exception):
+    """제한 시간 초과 등으로 분석이 취소됨 (다음 LLM 단계를 시작하지 않음)"""
+
+
+def _check_cancelled(cancel: Optional[threading.Event], step: str) -> None:
+    if cancel is not None and cancel.is_set():
+        raise AnalysisCancelled(f'분석 취소됨 ({step} 시작 전)')
+
+
+def analyze_single_patent(patent: dict, user_query: str, user_components: str,
+                          cancel: Optional[threading.Event] = None) -> dict:
     """
     단일 특허에 대해 분석 수행
 
-    - 등록 특허: Step A → B → C 순차 실행
+    - 등록 특허: Step A → B → C 순차 실행 (Step A는 사전 추출 저장소 우선)
     - 미등록 특허: LLM 호출 없이 고정 템플릿 반환
+    - cancel이 설정되면 진행 중인 LLM 호출이 끝난 뒤 다음 단계를 시작하지 않고 실패 결과 반환
 
     Returns:
         dict: analysis_results 항목
@@ -275,6 +356,7 @@ def analyze_single_patent(patent: dict, user_query: str, user_components: str) -
         'error': None,
         'claim_text': None,
         'components': None,
+        'components_source': None,
         'comparison': None,
         'judgment': None,
         'conclusion': None,
@@ -289,15 +371,22 @@ def analyze_single_patent(patent: dict, user_query: str, user_components: str) -
 
         result['claim_text'] = claim_text
 
-        # Step A: 구성요소 추출
-        patent_components = step_a_extract_components(claim_text)
+        # Step A: 구성요소 추출 (사전 추출 결과가 있으면 LLM 호출 생략)
+        _check_cancelled(cancel, 'Step A')
+        patent_components = lookup_precomputed_components(patent)
+        result['components_source'] = 'precomputed'
+        if patent_components is None:
+            patent_components = step_a_extract_components(claim_text)
+            result['components_source'] = 'llm'
         result['components'] = patent_components
 
         # Step B: 구성 대비
+        _check_cancelled(cancel, 'Step B')
         comparison = step_b_compare(patent_components, user_query, user_components)
         result['comparison'] = comparison
 
         # Step C: 판단 및 결론
+        _check_cancelled(cancel, 'Step C')
         judgment_result = step_c_judge(comparison)
         result['judgment'] = judgment_result.get('judgment', '')
         result['conclusion'] = judgment_result.get('conclusion', '')
@@ -1,18 +1,121 @@
 """
 FTO 분석 메인 실행 모듈
 
-- 각 특허별 개별 분석 (1건씩 LLM 호출)
+- 각 특허별 개별 분석 (특허 1건 = Step A → B → C LLM 호출)
+- 특허끼리는 스레드 풀에서 동시에 분석 (max_workers), 특허별 제한 시간 (patent_timeout)
 - 미등록 특허는 LLM 스킵
-- 전체 결과를 analysis_results로 모아서 HTML 조립
+- 전체 결과를 검색 순위 순서대로 analysis_results로 모아서 HTML 조립
 """
 
 import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
-from .fto_pipeline import analyze_single_patent
+from typing import Optional
+from .config import FTO_MAX_WORKERS, FTO_PATENT_TIMEOUT
+from .fto_pipeline import analyze_single_patent, get_llm_cache, is_patent_registered
 from .report_generator import generate_html_report
 
 
-def run_fto_analysis(user_query: str, user_components: str, patents_data: list) -> str:
+def _failed_result(patent: dict, error: str) -> dict:
+    """분석 도중 시간 초과/예외로 끝난 특허의 실패 결과 (analyze_single_patent와 같은 형식)"""
+    return {
+        'rank': patent.get('rank', 0),
+        'application_number': patent.get('application_number', ''),
+        'register_number': patent.get('register_number', ''),
+        'open_number': patent.get('open_number', ''),
+        'register_status': patent.get('register_status', ''),
+        'title': patent.get('title', ''),
+        'is_registered': is_patent_registered(patent),
+        'success': False,
+        'error': error,
+        'claim_text': None,
+        'components': None,
+        'components_source': None,
+        'comparison': None,
+        'judgment': None,
+        'conclusion': None,
+    }
+
+
+def analyze_patents(
+    patents_data: list,
+    user_query: str,
+    user_components: str,
+    max_workers: int = FTO_MAX_WORKERS,
+    patent_timeout: Optional[float] = FTO_PATENT_TIMEOUT,
+) -> list:
+    """
+    특허별 분석을 동시에 실행하고 patents_data와 같은 순서로 결과 반환
+
+    제한 시간은 특허 분석이 실제로 시작된 시점부터 셈 (대기열에 있던 시간 제외).
+    시간을 넘긴 특허는 실패 결과로 채우고 기다리지 않음. 취소 신호를 보내므로 진행 중인 LLM 호출은
+    백그라운드에서 끝나지만 그 뒤 Step A/B/C의 다음 단계는 시작하지 않음
+    """
+    results = [None] * len(patents_data)
+    started = {}  # {index: 분석 시작 시각}
+    cancels = [threading.Event() for _ in patents_data]
+
+    def run(index: int) -> dict:
+        started[index] = time.monotonic()
+        return analyze_single_patent(patents_data[index], user_query, user_components, cancel=cancels[index])
+
+    def report(index: int, result: dict) -> None:
+        patent = patents_data[index]
+        print(f"[{index + 1}/{len(patents_data)}] {patent.get('title', 'N/A')} "
+              f"({patent.get('application_number', 'N/A')}) | 상태: {patent.get('register_status', 'N/A')}")
+        if result['is_registered']:
+            if result['success']:
+                print(f"  -> [등록] 결론: {result['conclusion']}")
+            else:
+                print(f"  -> [등록] 분석 실패: {result['error']}")
+        else:
+            print(f"  -> [미등록] 공개 문헌 - LLM 분석 스킵")
+
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    try:
+        pending = {executor.submit(run, i): i for i in range(len(patents_data))}
+        while pending:
+            # 다음 대기 시간: 진행 중인 특허 중 가장 먼저 제한 시간이 끝나는 시점까지
+            wait_timeout = None
+            if patent_timeout:
+                deadlines = [started[i] + patent_timeout for i in pending.values() if i in started]
+                wait_timeout = max(0.05, min(deadlines) - time.monotonic()) if deadlines else 0.1
+            done, _ = wait(pending, timeout=wait_timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    results[index] = _failed_result(patents_data[index], str(e))
+                report(index, results[index])
+
+            if patent_timeout:
+                now = time.monotonic()
+                for future, index in list(pending.items()):
+                    if index in started and now - started[index] >= patent_timeout:
+                        pending.pop(future)
+                        cancels[index].set()
+                        results[index] = _failed_result(patents_data[index], f'분석 시간 초과 ({patent_timeout:g}초)')
+                        report(index, results[index])
+                        print("  -> 진행 중인 LLM 호출은 백그라운드에서 끝난 뒤 중단 (다음 단계 실행 안 함)")
+    finally:
+        # 시간 초과로 남은 작업은 기다리지 않음 (실행 중인 분석에는 취소 신호)
+        for cancel in cancels:
+            cancel.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results
+
+
+def run_fto_analysis(
+    user_query: str,
+    user_components: str,
+    patents_data: list,
+    max_workers: int = FTO_MAX_WORKERS,
+    patent_timeout: Optional[float] = FTO_PATENT_TIMEOUT,
+) -> str:
     """
     FTO 분석 전체 파이프라인 실행
 
@@ -20,6 +123,8 @@ def run_fto_analysis(user_query: str, user_components: str, patents_data: list)
         user_query: 사용자 질문
         user_components: RAG에서 추출한 사용자 구성요소
         patents_data: RAG 검색 결과 특허 리스트
+        max_workers: 동시에 분석할 특허 수 (1이면 순차 실행)
+        patent_timeout: 특허 1건 분석 제한 시간 (초, None이면 무제한)
 
     Returns:
         str: 생성된 HTML 보고서 파일 경로
@@ -29,32 +134,19 @@ def run_fto_analysis(user_query: str, user_components: str, patents_data: list)
     print(f"FTO 침해 분석 시작: {len(patents_data)}건 특허")
     print(f"{'='*80}\n")
 
-    # 각 특허별 개별 분석 → analysis_results에 수집
-    analysis_results = []
-    registered_count = 0
-    unregistered_count = 0
-
-    for i, patent in enumerate(patents_data, 1):
-        title = patent.get('title', 'N/A')
-        app_num = patent.get('application_number', 'N/A')
-        reg_status = patent.get('register_status', 'N/A')
-
-        print(f"[{i}/{len(patents_data)}] {title} ({app_num}) | 상태: {reg_status}")
-
-        result = analyze_single_patent(patent, user_query, user_components)
-        analysis_results.append(result)
-
-        if result['is_registered']:
-            registered_count += 1
-            if result['success']:
-                print(f"  -> [등록] 결론: {result['conclusion']}")
-            else:
-                print(f"  -> [등록] 분석 실패: {result['error']}")
-        else:
-            unregistered_count += 1
-            print(f"  -> [미등록] 공개 문헌 - LLM 분석 스킵")
+    # 각 특허별 개별 분석 (동시 실행) → analysis_results에 검색 순위 순서대로 수집
+    start = time.time()
+    analysis_results = analyze_patents(patents_data, user_query, user_components, max_workers, patent_timeout)
+    registered_count = sum(1 for r in analysis_results if r['is_registered'])
+    unregistered_count = len(analysis_results) - registered_count
+    print(f"\n특허별 분석 완료: {time.time() - start:.1f}초 (동시 {max(1, max_workers)}건)")
 
+    precomputed_count = sum(1 for r in analysis_results if r.get('components_source') == 'precomputed')
     print(f"\n분석 대상: 등록 {registered_count}건 (LLM 분석), 미등록 {unregistered_count}건 (템플릿)")
+    print(f"Step A 사전 추출 구성요소 재사용: {precomputed_count}건 (나머지는 LLM 추출)")
+    llm_cache = get_llm_cache()
+    if llm_cache is not None:
+        print(f"Step A/B/C {llm_cache.stats()}")
 
     # HTML 보고서 생성
     print(f"\n{'='*80}")
@@ -0,0 +1,20 @@
+from .ingest import (
+    parse_patent_file,
+    build_parent_page_content,
+    run_ingestion,
+    run_incremental_ingestion,
+    iter_pickle_chunks,
+    load_child_documents,
+    load_parent_documents,
+)
+from .manifest import (
+    IngestManifest,
+    make_chunk_id,
+    dedupe_by_id,
+    delete_ids,
+    delete_stale_ids,
+    CLAIMS_COLLECTION,
+    PARENT_COLLECTION,
+)
+from .parent_store import ParentStore, build_parent_store, join_parent_metadata, BIBLIO_FIELDS
+from .keyword_index import KeywordIndex
@@ -0,0 +1,245 @@
+"""
+임베딩 배치 스케줄러 (동시 실행 + 분당 토큰 예산 + 429 적응형 백오프)
+
+- 여러 배치를 동시에 실행 (max_in_flight)
+- 분당 토큰 예산(tpm_limit)을 토큰 버킷으로 지킴 (고정 sleep 없음)
+- 429(rate limit)를 받으면 모든 워커가 함께 쉬고, 연속 429마다 대기 시간을 2배로 늘림
+  (같은 시점에 나간 요청들의 429는 한 번으로 셈, 성공하면 다시 절반으로 줄어듦)
+- 429가 나면 토큰 예산도 25%씩 낮추고, 성공할 때마다 원래 예산 쪽으로 조금씩 되돌림
+  (tpm_limit이 실제 쿼터보다 높게 잡혀 있어도 실제 한도 근처로 수렴)
+- 그 외 오류는 작은 배치(fallback_size)로 쪼개서 재시도
+- 배치가 반영되면 on_committed(batch)를 호출 (메인 스레드) → 매니페스트 pending 삭제로
+  체크포인트를 남기므로, 중간에 죽어도 --incremental로 남은 배치부터 이어서 실행 가능
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Sequence
+
+# ============================================
+# 기본 설정
+# ============================================
+
+EMBED_TPM_LIMIT = 1_000_000   # text-embedding-3-small 분당 토큰 한도
+EMBED_MAX_IN_FLIGHT = 4       # 동시에 실행할 배치 수
+EMBED_MAX_RETRIES = 8         # 배치당 최대 재시도 횟수
+EMBED_FALLBACK_SIZE = 20      # 오류 시 쪼갤 작은 배치 크기
+MAX_BACKOFF = 60.0            # 429 대기 시간 상한 (초)
+
+
+def estimate_tokens(text: str) -> int:
+    """토큰 수 추정 (한글 1글자 ≈ 1토큰 ≈ 3바이트, 영문 ≈ 4바이트/토큰 → 보수적으로 3바이트/토큰)"""
+    return max(1, len(text.encode('utf-8')) // 3)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """429 / rate limit 오류 판별 (openai.RateLimitError 포함)"""
+    if getattr(error, 'status_code', None) == 429:
+        return True
+    message = str(error).lower()
+    return '429' in message or 'rate limit' in message or 'rate_limit' in message
+
+
+# ============================================
+# 분당 토큰 버킷
+# ============================================
+
+class TokenBucket:
+    """분당 tpm_limit 토큰을 꾸준히 채우는 버킷 (스레드 안전)"""
+
+    def __init__(self, tpm_limit: int):
+        self.capacity = float(tpm_limit)
+        self.max_rate = tpm_limit / 60.0
+        self.rate = self.max_rate  # 초당 충전량
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def slow_down(self) -> None:
+        """429 → 충전 속도 25% 감소 (최대 예산의 10%까지), 남은 토큰 비움"""
+        with self._lock:
+            self.rate = max(self.max_rate * 0.1, self.rate * 0.75)
+            self.tokens = 0.0
+            self.updated = time.monotonic()
+
+    def speed_up(self) -> None:
+        """성공 → 충전 속도를 최대 예산의 5%만큼 회복"""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+    def acquire(self, tokens: int) -> None:
+        """토큰이 충분해질 때까지 대기 후 차감 (한 번에 capacity를 넘지 않도록 자름)"""
+        tokens = min(float(tokens), self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait_sec = (tokens - self.tokens) / self.rate
+            time.sleep(wait_sec)
+
+
+# ============================================
+# 스케줄러
+# ============================================
+
+class EmbeddingScheduler:
+    """임베딩(+벡터 DB 저장) 배치를 예산 안에서 동시에 실행"""
+
+    def __init__(
+        self,
+        tpm_limit: int = EMBED_TPM_LIMIT,
+        max_in_flight: int = EMBED_MAX_IN_FLIGHT,
+        max_retries: int = EMBED_MAX_RETRIES,
+        fallback_size: int = EMBED_FALLBACK_SIZE,
+        text_fn: Callable[[Any], str] = lambda doc: doc.page_content,
+    ):
+        self.bucket = TokenBucket(tpm_limit)
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.fallback_size = fallback_size
+        self.text_fn = text_fn
+
+        # 429 공유 쿨다운 (generation: 쿨다운이 새로 걸릴 때마다 증가)
+        self._backoff = 0.0
+        self._resume_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    # ── 429 백오프 ──
+
+    def _on_rate_limited(self, generation: int) -> float:
+        """쿨다운 설정 후 남은 대기 시간 반환 (이미 새 쿨다운이 걸린 뒤의 429는 늘리지 않음)"""
+        with self._lock:
+            if generation == self._generation:
+                self._backoff = min(MAX_BACKOFF, max(1.0, self._backoff * 2))
+                delay = min(MAX_BACKOFF, self._backoff * (1 + random.random() * 0.25))
+                self._resume_at = max(self._resume_at, time.monotonic() + delay)
+                self._generation += 1
+                self.bucket.slow_down()
+            return max(0.0, self._resume_at - time.monotonic())
+
+    def _on_success(self) -> None:
+        with self._lock:
+            self._backoff /= 2
+            if self._backoff < 1.0:
+                self._backoff = 0.0
+        self.bucket.speed_up()
+
+    def _wait_cooldown(self) -> None:
+        while True:
+            with self._lock:
+                remaining = self._resume_at - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(remaining)
+
+    # ── 워커 ──
+
+    def _run_batch(self, process_fn: Callable[[Sequence[Any]], Any], batch: Sequence[Any]):
+        """배치 1개 실행 → (시작 시점 generation, 오류 또는 None)"""
+        self._wait_cooldown()
+        self.bucket.acquire(sum(estimate_tokens(self.text_fn(item)) for item in batch))
+        generation = self._generation
+        try:
+            process_fn(batch)
+        except Exception as e:
+            return generation, e
+        return generation, None
+
+    def run(
+        self,
+        items: Sequence[Any],
+        process_fn: Callable[[Sequence[Any]], Any],
+        batch_size: int = 1000,
+        on_committed: Callable[[Sequence[Any]], None] = None,
+        report_every: int = 10,
+    ) -> Dict[str, Any]:
+        """
+        items를 batch_size로 나눠 process_fn(batch)를 동시에 실행
+
+        Args:
+            items: 임베딩할 문서 리스트
+            process_fn: 배치 1개를 임베딩+저장하는 함수 (워커 스레드에서 실행)
+            batch_size: 배치 크기
+            on_committed: 배치 성공 시 메인 스레드에서 호출 (체크포인트 기록용)
+            report_every: 진행 상황 출력 간격 (완료 배치 수)
+
+        Returns:
+            dict: {'committed', 'failed', 'rate_limited', 'elapsed', 'failed_items'}
+        """
+        queue = deque((items[i:i + batch_size], 0) for i in range(0, len(items), batch_size))
+        total_batches = len(queue)
+
+        committed = 0
+        committed_batches = 0
+        rate_limited = 0
+        failed_items = []
+        start = time.time()
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            in_flight = {}
+
+            while queue or in_flight:
+                while queue and len(in_flight) < self.max_in_flight:
+                    batch, attempt = queue.popleft()
+                    future = executor.submit(self._run_batch, process_fn, batch)
+                    in_flight[future] = (batch, attempt)
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    batch, attempt = in_flight.pop(future)
+                    generation, error = future.result()
+
+                    if error is None:
+                        self._on_success()
+                        committed += len(batch)
+                        committed_batches += 1
+                        if on_committed is not None:
+                            on_committed(batch)
+                        if committed_batches % report_every == 0:
+                            elapsed = time.time() - start
+                            print(f"진행: {committed}/{len(items)}개 문서 "
+                                  f"({committed / elapsed:.1f} docs/sec, 대기열 {len(queue)}개 배치)")
+                        continue
+
+                    if attempt >= self.max_retries:
+                        print(f"배치 최종 실패 ({len(batch)}개 문서): {error}")
+                        failed_items.extend(batch)
+
+                    elif is_rate_limit_error(error):
+                        rate_limited += 1
+                        delay = self._on_rate_limited(generation)
+                        print(f"429 rate limit → {delay:.1f}초 대기 후 재시도")
+                        queue.appendleft((batch, attempt + 1))
+
+                    elif len(batch) > self.fallback_size:
+                        # 에러 발생 시 더 작은 배치로 재시도
+                        print(f"배치 에러 ({len(batch)}개 문서): {error} → {self.fallback_size}개씩 재시도")
+                        smaller_batches = [batch[j:j + self.fallback_size]
+                                           for j in range(0, len(batch), self.fallback_size)]
+                        for small_batch in reversed(smaller_batches):
+                            queue.appendleft((small_batch, attempt + 1))
+
+                    else:
+                        print(f"소 배치 에러: {error}")
+                        queue.append((batch, attempt + 1))
+
+        elapsed = time.time() - start
+        print(f"임베딩 완료: {committed}/{len(items)}개 문서, 배치 {total_batches}개 "
+              f"(429 {rate_limited}회, 실패 {len(failed_items)}개, {elapsed:.1f}초)")
+
+        return {
+            'committed': committed,
+            'failed': len(failed_items),
+            'rate_limited': rate_limited,
+            'elapsed': elapsed,
+            'failed_items': failed_items,
+        }
@@ -0,0 +1,115 @@
+"""
+임베딩 디스크 캐시 (SQLite, float32)
+
+- 키: sha1(모델명 + 텍스트) 20바이트, 값: float32 벡터 바이트 (1536차원 = 6KB)
+- first_version / last_version 에 같은 청구항이 있거나, 벡터 DB를 다시 만들거나,
+  "글리세린 화장품" 같은 검색어가 반복되면 API를 다시 부르지 않음
+- LangChain Embeddings 인터페이스를 그대로 따르므로 기존 임베딩 객체를 감싸서 사용
+
+    embeddings = CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-3-small"))
+"""
+
+import hashlib
+import sqlite3
+import threading
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+from langchain_core.embeddings import Embeddings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS vectors (
+    key    BLOB PRIMARY KEY,
+    vector BLOB NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def _cache_key(model: str, text: str) -> bytes:
+    return hashlib.sha1(f"{model}\0{text}".encode('utf-8')).digest()
+
+
+def _pack(vector: Sequence[float]) -> bytes:
+    return array('f', vector).tobytes()
+
+
+def _unpack(data: bytes) -> List[float]:
+    vector = array('f')
+    vector.frombytes(data)
+    return vector.tolist()
+
+
+class EmbeddingCache:
+    """(모델, 텍스트) → float32 벡터 저장소 (스레드 안전)"""
+
+    def __init__(self, path: str = 'embedding_cache.sqlite'):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, model: str, texts: Sequence[str]) -> Dict[str, List[float]]:
+        """캐시에 있는 텍스트만 {text: vector}로 반환"""
+        keys = {_cache_key(model, text): text for text in set(texts)}
+        found = {}
+        key_list = list(keys)
+        with self._lock:
+            for i in range(0, len(key_list), 500):
+                batch = key_list[i:i + 500]
+                placeholders = ','.join('?' * len(batch))
+                for key, data in self.conn.execute(
+                    f"SELECT key, vector FROM vectors WHERE key IN ({placeholders})", batch
+                ):
+                    found[keys[key]] = _unpack(data)
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, Sequence[float]]) -> None:
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO vectors (key, vector) VALUES (?, ?)",
+                [(_cache_key(model, text), _pack(vector)) for text, vector in vectors.items()]
+            )
+            self.conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """캐시를 먼저 보고, 없는 텍스트만 원래 임베딩 모델로 계산하는 래퍼"""
+
+    def __init__(self, embeddings: Embeddings, cache_path: str = 'embedding_cache.sqlite', model: Optional[str] = None):
+        self.embeddings = embeddings
+        self.model = model or getattr(embeddings, 'model', type(embeddings).__name__)
+        self.cache = EmbeddingCache(cache_path)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        cached = self.cache.get_many(self.model, texts)
+
+        # 캐시에 없는 텍스트만 (중복 제거해서) 계산
+        missing = [text for text in dict.fromkeys(texts) if text not in cached]
+        if missing:
+            computed = dict(zip(missing, self.embeddings.embed_documents(missing)))
+            self.cache.put_many(self.model, computed)
+            cached.update(computed)
+
+        return [cached[text] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        cached = self.cache.get_many(self.model, [text])
+        if text in cached:
+            return cached[text]
+
+        vector = self.embeddings.embed_query(text)
+        self.cache.put_many(self.model, {text: vector})
+        return vector
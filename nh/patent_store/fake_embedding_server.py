@@ -0,0 +1,145 @@
+"""
+테스트용 로컬 가짜 임베딩 서버 (OpenAI /v1/embeddings 호환)
+
+- 입력 텍스트(또는 토큰 ID 배열)의 해시로 결정적인 단위 벡터를 돌려줌
+- --tpm 을 넘기면 429를 돌려줘서 스케줄러의 백오프를 시험할 수 있음
+- --fail-rate 로 임의의 429를 섞을 수 있음
+
+    python -m patent_store.fake_embedding_server --port 8001 --tpm 200000
+    OPENAI_API_BASE=http://127.0.0.1:8001/v1 python step2_build_vectordb.py
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, List
+
+
+def fake_embedding(item: Any, dim: int) -> List[float]:
+    """입력의 sha256에서 만든 결정적 단위 벡터"""
+    key = item if isinstance(item, str) else json.dumps(item)
+    seed = hashlib.sha256(key.encode('utf-8')).digest()
+    values = []
+    counter = 0
+    while len(values) < dim:
+        block = hashlib.sha256(seed + counter.to_bytes(4, 'little')).digest()
+        values.extend(v / 2**31 - 1.0 for v in struct.unpack('<8I', block))
+        counter += 1
+    values = values[:dim]
+    norm = sum(v * v for v in values) ** 0.5 or 1.0
+    return [v / norm for v in values]
+
+
+def _count_tokens(item: Any) -> int:
+    if isinstance(item, list):
+        return len(item)
+    return max(1, len(str(item).encode('utf-8')) // 3)
+
+
+class _FakeState:
+    def __init__(self, dim: int, tpm: int, fail_rate: float, latency: float):
+        self.dim = dim
+        self.tpm = tpm
+        self.fail_rate = fail_rate
+        self.latency = latency
+        self.window_start = time.monotonic()
+        self.window_tokens = 0
+        self.requests = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def admit(self, tokens: int) -> bool:
+        """1분 고정 윈도우로 TPM 초과 여부 확인"""
+        with self.lock:
+            self.requests += 1
+            now = time.monotonic()
+            if now - self.window_start >= 60:
+                self.window_start, self.window_tokens = now, 0
+            over = self.tpm and self.window_tokens + tokens > self.tpm
+            if over or random.random() < self.fail_rate:
+                self.rejected += 1
+                return False
+            self.window_tokens += tokens
+            return True
+
+
+def make_handler(state: _FakeState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body: dict) -> None:
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            if status == 429:
+                self.send_header('Retry-After', '1')
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            if not self.path.rstrip('/').endswith('/embeddings'):
+                self._send(404, {'error': {'message': 'not found'}})
+                return
+
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            inputs = payload.get('input', [])
+            if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+                inputs = [inputs]
+
+            tokens = sum(_count_tokens(item) for item in inputs)
+            if not state.admit(tokens):
+                self._send(429, {'error': {'message': 'Rate limit reached (fake server)', 'type': 'rate_limit_exceeded'}})
+                return
+
+            if state.latency:
+                time.sleep(state.latency)
+
+            dim = payload.get('dimensions') or state.dim
+            self._send(200, {
+                'object': 'list',
+                'model': payload.get('model', 'fake'),
+                'data': [
+                    {'object': 'embedding', 'index': i, 'embedding': fake_embedding(item, dim)}
+                    for i, item in enumerate(inputs)
+                ],
+                'usage': {'prompt_tokens': tokens, 'total_tokens': tokens},
+            })
+
+    return Handler
+
+
+def serve(host: str = '127.0.0.1', port: int = 8001, dim: int = 1536, tpm: int = 0,
+          fail_rate: float = 0.0, latency: float = 0.0) -> ThreadingHTTPServer:
+    """서버를 백그라운드 스레드로 띄우고 반환 (테스트 코드에서 사용, 종료는 server.shutdown())"""
+    state = _FakeState(dim, tpm, fail_rate, latency)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--dim", type=int, default=1536, help="벡터 차원 (text-embedding-3-small = 1536)")
+    parser.add_argument("--tpm", type=int, default=0, help="분당 토큰 한도 (0이면 무제한)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="임의 429 비율")
+    parser.add_argument("--latency", type=float, default=0.0, help="요청당 지연 (초)")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.dim, args.tpm, args.fail_rate, args.latency)
+    print(f"가짜 임베딩 서버 실행 중: http://{args.host}:{args.port}/v1/embeddings")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
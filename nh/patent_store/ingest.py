@@ -0,0 +1,561 @@
+"""
+특허 JSON 병렬 전처리 (스트리밍 저장)
+
+- 파일 1건 → (Child Documents, Parent Document) 변환은 parse_patent_file()
+- 프로세스 풀 워커가 JSON을 병렬로 파싱하고, 메인 프로세스는 결과를
+  chunk_size 단위로 pickle 프레임에 이어 써서 전체를 메모리에 들고 있지 않음
+- 저장 파일은 여러 pickle 프레임이 이어진 형태이므로
+  load_child_documents() / load_parent_documents()로 읽어야 함
+  (기존 단일 pickle 파일도 프레임 1개짜리로 그대로 읽힘)
+"""
+
+import glob
+import hashlib
+import json
+import os
+import pickle
+import time
+from multiprocessing import Pool
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from .keyword_index import KeywordIndex
+from .manifest import IngestManifest, make_chunk_id
+from .parent_store import ParentStore
+
+
+# ============================================
+# 파일 1건 파싱
+# ============================================
+
+def _build_all_claims(register_claims: list, open_claims: list, register_number: str) -> List[Dict]:
+    """Parent Document용 all_claims (claim_number, claim_type, text, source_type) 생성"""
+    all_claims = []
+
+    # last_version 청구항 (등록/공개 청구항)
+    for claim in register_claims:
+        all_claims.append({
+            'claim_number': claim.get('claim_number'),
+            'claim_type': claim.get('claim_type', ''),
+            'text': claim.get('text', ''),
+            'source_type': 'last_version'
+        })
+
+    # first_version 청구항 (등록특허인 경우만)
+    if register_number:
+        for claim in open_claims:
+            all_claims.append({
+                'claim_number': claim.get('claim_number'),
+                'claim_type': claim.get('claim_type', ''),
+                'text': claim.get('text', ''),
+                'source_type': 'first_version'
+            })
+
+    return all_claims
+
+
+def parse_patent(raw_patent: dict) -> Optional[Tuple[List[Document], Dict[str, Any]]]:
+    """
+    KIPRIS 특허 JSON 1건을 Child Documents(청구항)와 Parent Document(특허)로 변환
+
+    Returns:
+        (child_docs, parent_doc) 또는 출원번호가 없으면 None
+    """
+    # Bibliographic 정보 추출
+    biblio = raw_patent.get('biblioSummaryInfoArray', {}).get('biblioSummaryInfo', {})
+
+    # IPC 코드 추출
+    ipc_list = raw_patent.get('ipcInfoArray', {}).get('ipcInfo', [])
+    if isinstance(ipc_list, dict):
+        ipc_list = [ipc_list]
+    elif not isinstance(ipc_list, list):
+        ipc_list = []
+    ipc_codes = [ipc.get('ipcNumber', '') for ipc in ipc_list]
+
+    # 초록 추출
+    abstract = raw_patent.get('abstractInfoArray', {}).get('abstractInfo', {}).get('astrtCont', '')
+
+    # Claims 추출
+    claims_data = raw_patent.get('claims', {})
+
+    # 공개청구항
+    open_claims = claims_data.get('first_version', {}).get('claims', [])
+
+    # (status=등록) 등록청구항 / (status=공개) 가장 마지막 변동이력인 공개청구항
+    register_claims = claims_data.get('last_version', {}).get('claims', [])
+
+    # 변동이력
+    total_amendments = claims_data.get('total_amendments', '')
+
+    # 기본 정보
+    app_number = biblio.get('applicationNumber', '')  # 출원번호
+    title = biblio.get('inventionTitle', '')  # 특허명
+
+    if not app_number:
+        return None
+
+    # 등록번호 확인
+    register_number = biblio.get('registerNumber', '')
+
+    # ============================================
+    # Child Documents 생성 (각 청구항)
+    # ============================================
+
+    # 청구항 메타데이터는 부모 ID와 청구항 식별 정보만 보관
+    # (서지정보는 Parent Document에 1번만 저장, 필요 시 join_parent_metadata()로 결합)
+    def make_metadata(claim: dict, source_type: str) -> dict:
+        return {
+            'parent_id': app_number,  # 출원번호(부모 문서 ID)
+            'claim_number': claim.get('claim_number'),  # 청구항 번호
+            'claim_type': claim.get('claim_type', ''),  # 청구항 유형 (독립항/종속항)
+            'source_type': source_type,  # 문서 유형: last_version / first_version
+        }
+
+    child_docs = []
+
+    # last_version 청구항 저장
+    versions = [(register_claims, 'last_version')]
+    # first_version 청구항 저장 (등록번호가 있는 경우만)
+    if register_number:
+        versions.append((open_claims, 'first_version'))
+
+    for claims, source_type in versions:
+        for claim in claims:
+            # 문서 내용: 청구항
+            page_content = claim.get('text', '')
+
+            if not page_content.strip():
+                continue
+
+            child_docs.append(Document(
+                page_content=page_content,
+                metadata=make_metadata(claim, source_type)
+            ))
+
+    # ============================================
+    # Parent Document 생성 (전체 특허)
+    # ============================================
+
+    all_claims = _build_all_claims(register_claims, open_claims, register_number)
+
+    parent_doc = {
+        'parent_id': app_number,
+        'title': title,
+        'title_eng': biblio.get('inventionTitleEng', ''),
+        'application_number': app_number,
+        'open_number': biblio.get('openNumber', ''),
+        'register_number': register_number,
+        'application_date': biblio.get('applicationDate', ''),
+        'open_date': biblio.get('openDate', ''),
+        'register_date': biblio.get('registerDate', ''),
+        'register_status': biblio.get('registerStatus', ''),
+        'ipc_codes': ipc_codes,
+        'abstract': abstract,
+        'total_amendments': total_amendments,  # 변동이력
+        'all_claims': all_claims,  # 모든 청구항 정보 (source_type 포함)
+        'claim_count': len(all_claims)
+    }
+
+    return child_docs, parent_doc
+
+
+def build_parent_page_content(parent_doc: Dict[str, Any]) -> str:
+    """Parent 벡터 DB 문서 본문: 전체 청구항을 "[청구항 N] (type/source) text"로 이어 붙임 (없으면 빈 문자열)"""
+    claim_texts = []
+    for claim in parent_doc.get('all_claims', []):
+        text = claim.get('text', '').strip()
+        if text:
+            claim_num = claim.get('claim_number', '')
+            claim_type = claim.get('claim_type', '')
+            source_type = claim.get('source_type', '')
+            claim_texts.append(f"[청구항 {claim_num}] ({claim_type}/{source_type}) {text}")
+    return "\n\n".join(claim_texts)
+
+
+def parse_patent_file(file_path: str) -> Tuple[str, List[Document], Optional[Dict[str, Any]], Optional[str], Optional[tuple]]:
+    """
+    JSON 파일 1건 파싱 (프로세스 풀 워커 함수)
+
+    워커에서 예외가 나면 풀 전체가 멈추므로 예외는 문자열로 돌려줌
+
+    Returns:
+        (file_path, child_docs, parent_doc, error, fingerprint)
+        - 출원번호가 없으면 parent_doc=None, error=None
+        - fingerprint: 매니페스트용 (sha1, mtime, size)
+    """
+    try:
+        with open(file_path, "rb") as f:
+            raw_bytes = f.read()
+        st = os.stat(file_path)
+        fingerprint = (hashlib.sha1(raw_bytes).hexdigest(), st.st_mtime, st.st_size)
+
+        raw_patent = json.loads(raw_bytes.decode("utf-8"))
+
+        parsed = parse_patent(raw_patent)
+        if parsed is None:
+            return file_path, [], None, None, fingerprint
+
+        child_docs, parent_doc = parsed
+        return file_path, child_docs, parent_doc, None, fingerprint
+
+    except Exception as e:
+        return file_path, [], None, str(e), None
+
+
+# ============================================
+# 청크 단위 pickle 저장 / 로드
+# ============================================
+
+class PickleChunkWriter:
+    """
+    레코드를 버퍼에 모았다가 chunk_size마다 pickle 프레임 1개로 이어 씀
+
+    as_dict=True면 (key, value) 쌍을 받아 dict 프레임으로 저장 (Parent Documents용)
+    """
+
+    def __init__(self, path: str, chunk_size: int, as_dict: bool = False):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.as_dict = as_dict
+        self.count = 0
+        self._buffer = []
+        self._file = open(path, 'wb')
+
+    def add(self, item) -> None:
+        self._buffer.append(item)
+        self.count += 1
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        frame = dict(self._buffer) if self.as_dict else self._buffer
+        pickle.dump(frame, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._file.flush()
+        self._buffer = []
+
+    def close(self) -> None:
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_pickle_chunks(path: str) -> Iterator[Any]:
+    """pickle 파일의 프레임을 순서대로 하나씩 반환 (EOF까지)"""
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def load_child_documents(path: str = 'child_documents.pkl') -> List[Document]:
+    """청크로 저장된 Child Documents를 하나의 리스트로 로드"""
+    child_docs = []
+    for chunk in iter_pickle_chunks(path):
+        child_docs.extend(chunk)
+    return child_docs
+
+
+def load_parent_documents(path: str = 'parent_documents.pkl') -> Dict[str, Dict[str, Any]]:
+    """청크로 저장된 Parent Documents를 {parent_id: parent} dict로 로드"""
+    parent_docs = {}
+    for chunk in iter_pickle_chunks(path):
+        parent_docs.update(chunk)
+    return parent_docs
+
+
+# ============================================
+# 병렬 전처리 실행
+# ============================================
+
+def find_patent_files(patent_paths: List[str]) -> List[str]:
+    """경로들 아래의 모든 JSON 파일 목록 (하위 폴더 포함)"""
+    files = []
+    for path in patent_paths:
+        files.extend(glob.glob(os.path.join(path, "**", "*.json"), recursive=True))
+    return files
+
+
+def _iter_parsed(files: List[str], workers: int):
+    """파일을 파싱한 결과를 입력 순서대로 흘려보냄"""
+    if workers <= 1:
+        yield from map(parse_patent_file, files)
+    else:
+        # imap: 입력 순서대로 결과를 흘려보내므로 저장 순서가 순차 처리와 동일
+        with Pool(processes=workers) as pool:
+            yield from pool.imap(parse_patent_file, files, chunksize=32)
+
+
+def _index_patent(
+    claim_index: Optional[KeywordIndex],
+    parent_index: Optional[KeywordIndex],
+    child_docs: List[Document],
+    parent_doc: Dict[str, Any],
+) -> None:
+    """특허 1건을 키워드 색인에 반영 (이전 버전 문서는 먼저 삭제 표시)"""
+    parent_id = parent_doc['parent_id']
+    if claim_index is not None:
+        claim_index.remove_parent(parent_id)
+        for doc in child_docs:
+            claim_index.add(make_chunk_id(doc.metadata), parent_id, doc.page_content)
+    if parent_index is not None:
+        parent_index.remove_parent(parent_id)
+        page_content = build_parent_page_content(parent_doc)
+        if page_content:
+            parent_index.add(parent_id, parent_id, page_content)
+
+
+def _open_indexes(claim_index_path: Optional[str], parent_index_path: Optional[str]):
+    claim_index = KeywordIndex(claim_index_path, readonly=False) if claim_index_path else None
+    parent_index = KeywordIndex(parent_index_path, readonly=False) if parent_index_path else None
+    return claim_index, parent_index
+
+
+def _close_indexes(*indexes: Optional[KeywordIndex]) -> None:
+    for index in indexes:
+        if index is not None:
+            index.close()
+
+
+def _write_parsed(
+    files: List[str],
+    workers: int,
+    child_writer: PickleChunkWriter,
+    parent_writer: PickleChunkWriter,
+    manifest: Optional[IngestManifest],
+    parent_store: Optional[ParentStore],
+    report_every: int,
+    claim_index: Optional[KeywordIndex] = None,
+    parent_index: Optional[KeywordIndex] = None,
+) -> Tuple[int, set]:
+    """
+    파싱 결과를 writer(와 Parent Store, 키워드 색인)에 스트리밍 저장하고 매니페스트에 기록
+
+    Returns:
+        (오류 파일 수, 저장된 출원번호 집합)
+    """
+    total = len(files)
+    errors = 0
+    emitted = set()
+    start = time.time()
+
+    for done, (file_path, child_docs, parent_doc, error, fingerprint) in enumerate(_iter_parsed(files, workers), 1):
+        if error:
+            print(f"오류 발생 ({file_path}): {error}")
+            errors += 1
+        elif parent_doc is not None:
+            for doc in child_docs:
+                child_writer.add(doc)
+            parent_writer.add((parent_doc['parent_id'], parent_doc))
+            emitted.add(parent_doc['parent_id'])
+
+            if parent_store is not None:
+                parent_store.put(parent_doc['parent_id'], parent_doc)
+
+            _index_patent(claim_index, parent_index, child_docs, parent_doc)
+
+            if manifest is not None:
+                manifest.record_patent(
+                    parent_doc['parent_id'], file_path, fingerprint,
+                    [make_chunk_id(doc.metadata) for doc in child_docs]
+                )
+
+        if done % report_every == 0 or done == total:
+            elapsed = time.time() - start
+            rate = done / elapsed if elapsed > 0 else 0.0
+            print(f"진행: {done}/{total} 파일 ({rate:.1f} files/sec)")
+
+    return errors, emitted
+
+
+def run_ingestion(
+    patent_paths: List[str],
+    child_path: str = 'child_documents.pkl',
+    parent_path: str = 'parent_documents.pkl',
+    workers: int = None,
+    chunk_size: int = 5000,
+    report_every: int = 1000,
+    manifest_path: str = None,
+    parent_store_path: str = None,
+    claim_index_path: str = None,
+    parent_index_path: str = None,
+) -> Dict[str, Any]:
+    """
+    JSON 파일들을 프로세스 풀로 병렬 파싱하고 결과를 청크 단위로 디스크에 저장
+
+    Args:
+        patent_paths: json 파일이 들어있는 경로 리스트
+        child_path: Child Documents 저장 파일
+        parent_path: Parent Documents 저장 파일
+        workers: 워커 프로세스 수 (None이면 CPU 수, 1이면 풀 없이 순차 처리)
+        chunk_size: pickle 프레임 1개에 담을 레코드 수
+        report_every: 진행 상황(files/sec) 출력 간격 (파일 수)
+        manifest_path: 지정하면 매니페스트를 새로 만들어 전체 특허를 기록
+                       (이후 run_incremental_ingestion의 기준이 됨)
+        parent_store_path: 지정하면 Parent Store(SQLite)도 새로 만들어 함께 저장
+        claim_index_path / parent_index_path: 지정하면 청구항 / Parent 키워드 역색인도 새로 만듦
+
+    Returns:
+        dict: {'files', 'child_count', 'parent_count', 'errors', 'elapsed'}
+    """
+    files = find_patent_files(patent_paths)
+    workers = workers or os.cpu_count() or 1
+
+    print(f"처리 대상: {len(files)}개 JSON 파일 | 워커: {workers}개 | 청크: {chunk_size}건")
+
+    manifest = IngestManifest(manifest_path) if manifest_path else None
+    if manifest is not None:
+        manifest.reset()
+
+    parent_store = ParentStore(parent_store_path, readonly=False) if parent_store_path else None
+    if parent_store is not None:
+        parent_store.clear()
+
+    claim_index, parent_index = _open_indexes(claim_index_path, parent_index_path)
+    for index in (claim_index, parent_index):
+        if index is not None:
+            index.clear()
+
+    start = time.time()
+
+    with PickleChunkWriter(child_path, chunk_size) as child_writer, \
+            PickleChunkWriter(parent_path, chunk_size, as_dict=True) as parent_writer:
+        errors, _ = _write_parsed(files, workers, child_writer, parent_writer, manifest, parent_store, report_every,
+                                  claim_index, parent_index)
+
+    _close_indexes(claim_index, parent_index)
+    if parent_store is not None:
+        parent_store.close()
+    if manifest is not None:
+        manifest.close()
+
+    return {
+        'files': len(files),
+        'child_count': child_writer.count,
+        'parent_count': parent_writer.count,
+        'errors': errors,
+        'elapsed': time.time() - start,
+    }
+
+
+# ============================================
+# 증분 전처리
+# ============================================
+
+def _merge_chunks(old_path: str, new_path: str, out_path: str, chunk_size: int, drop_ids: set, as_dict: bool) -> int:
+    """
+    기존 파일에서 drop_ids 특허를 걸러낸 뒤 새 파일 레코드를 이어 붙여 out_path에 저장
+
+    Returns:
+        저장된 레코드 수
+    """
+    with PickleChunkWriter(out_path, chunk_size, as_dict=as_dict) as writer:
+        if os.path.exists(old_path):
+            for chunk in iter_pickle_chunks(old_path):
+                if as_dict:
+                    for parent_id, parent in chunk.items():
+                        if parent_id not in drop_ids:
+                            writer.add((parent_id, parent))
+                else:
+                    for doc in chunk:
+                        if doc.metadata['parent_id'] not in drop_ids:
+                            writer.add(doc)
+
+        for chunk in iter_pickle_chunks(new_path):
+            for item in (chunk.items() if as_dict else chunk):
+                writer.add(item)
+
+    return writer.count
+
+
+def run_incremental_ingestion(
+    patent_paths: List[str],
+    child_path: str = 'child_documents.pkl',
+    parent_path: str = 'parent_documents.pkl',
+    manifest_path: str = 'ingest_manifest.sqlite',
+    parent_store_path: str = None,
+    workers: int = None,
+    chunk_size: int = 5000,
+    report_every: int = 1000,
+    claim_index_path: str = None,
+    parent_index_path: str = None,
+) -> Dict[str, Any]:
+    """
+    매니페스트와 비교해 새로 생기거나 바뀐 파일만 파싱하고, 사라진 파일의 특허는 제거
+
+    - child/parent pkl은 기존 레코드 중 바뀐/삭제된 특허를 걸러내고 새 레코드를 붙여 다시 씀
+    - 벡터 DB에 반영할 upsert/delete 작업은 매니페스트 pending 테이블에 쌓임
+      (step2_build_vectordb*.py --incremental 에서 반영)
+    - 바뀐 파일은 다시 파싱하기 전에 이전 특허를 삭제 대상으로 올림
+      (다시 파싱한 결과가 출원번호/청구항이 없거나 오류여도 이전 특허가 남지 않음)
+    - parent_store_path를 지정하면 Parent Store에도 삭제/갱신을 바로 반영
+    - claim_index_path / parent_index_path를 지정하면 키워드 역색인에도 반영
+
+    Returns:
+        dict: {'files', 'parsed', 'unchanged', 'removed', 'child_count', 'parent_count', 'errors', 'elapsed'}
+    """
+    files = find_patent_files(patent_paths)
+    workers = workers or os.cpu_count() or 1
+    start = time.time()
+
+    manifest = IngestManifest(manifest_path)
+    to_parse, removed, unchanged = manifest.plan(files)
+
+    print(f"전체: {len(files)}개 | 변경/신규: {len(to_parse)}개 | 그대로: {unchanged}개 | 삭제: {len(removed)}개")
+
+    # 삭제 먼저 기록 (파일명만 바뀐 특허는 아래 파싱에서 다시 upsert됨)
+    parent_store = ParentStore(parent_store_path, readonly=False) if parent_store_path else None
+    claim_index, parent_index = _open_indexes(claim_index_path, parent_index_path)
+
+    # 바뀐 파일의 이전 특허도 먼저 삭제 (새 파싱 결과가 없거나 오류여도 이전 특허가 남지 않도록)
+    replaced = [app_number for app_number in map(manifest.forget_file, to_parse) if app_number]
+
+    for app_number in removed + replaced:
+        manifest.remove_patent(app_number)
+        if parent_store is not None:
+            parent_store.delete(app_number)
+        for index in (claim_index, parent_index):
+            if index is not None:
+                index.remove_parent(app_number)
+
+    child_new, parent_new = child_path + '.new', parent_path + '.new'
+
+    with PickleChunkWriter(child_new, chunk_size) as child_writer, \
+            PickleChunkWriter(parent_new, chunk_size, as_dict=True) as parent_writer:
+        errors, emitted = _write_parsed(to_parse, workers, child_writer, parent_writer, manifest, parent_store, report_every,
+                                        claim_index, parent_index)
+
+    drop_ids = emitted | set(removed) | set(replaced)
+    child_count = _merge_chunks(child_path, child_new, child_path + '.tmp', chunk_size, drop_ids, as_dict=False)
+    parent_count = _merge_chunks(parent_path, parent_new, parent_path + '.tmp', chunk_size, drop_ids, as_dict=True)
+
+    os.replace(child_path + '.tmp', child_path)
+    os.replace(parent_path + '.tmp', parent_path)
+    os.remove(child_new)
+    os.remove(parent_new)
+
+    # pkl 교체까지 끝난 뒤 커밋 (중간에 죽으면 다음 실행에서 다시 처리)
+    _close_indexes(claim_index, parent_index)
+    if parent_store is not None:
+        parent_store.close()
+    manifest.close()
+
+    return {
+        'files': len(files),
+        'parsed': len(to_parse),
+        'unchanged': unchanged,
+        'removed': len(removed),
+        'child_count': child_count,
+        'parent_count': parent_count,
+        'errors': errors,
+        'elapsed': time.time() - start,
+    }
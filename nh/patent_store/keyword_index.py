@@ -0,0 +1,194 @@
+"""
+키워드 역색인 (SQLite, 키워드 → 문서 번호 posting list)
+
+검색어마다 Chroma에 where_document={"$and": [{"$contains": kw}, ...]}를 보내면
+Chroma가 부분 문자열 검색으로 전체 문서를 훑음. 전처리 단계에서 공백 단위 토큰의
+posting list를 만들어 두고, 검색 전에 AND 교집합을 먼저 계산해서
+- 교집합이 비어 있는 검색어는 벡터 검색 자체를 건너뛰고
+- 나머지는 매칭되는 특허(parent_id)로 범위를 좁혀 검색함
+
+$contains는 부분 문자열 매칭이므로 "화장"은 "화장품"에도 걸림. 공백이 없는 키워드가
+문서에 들어 있다는 것은 문서의 어떤 토큰에 들어 있다는 것과 같으므로, 키워드를 포함하는
+모든 토큰의 posting list 합집합 = Chroma $contains 결과와 동일함.
+
+    index = KeywordIndex('keyword_index_parent.sqlite')
+    parent_ids = index.match_parent_ids(["글리세린", "보습"])
+
+청구항 DB와 Parent DB는 문서 단위가 다르므로 파일을 따로 만듦
+(keyword_index_claims.sqlite / keyword_index_parent.sqlite, step1_preprocess.py에서 생성).
+"""
+
+import os
+import sqlite3
+from array import array
+from collections import defaultdict
+from typing import Iterable, Set
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc_no    INTEGER PRIMARY KEY,
+    doc_id    TEXT NOT NULL,
+    parent_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_docs_parent ON docs(parent_id);
+
+CREATE TABLE IF NOT EXISTS terms (
+    term     TEXT PRIMARY KEY,
+    postings BLOB NOT NULL      -- doc_no 오름차순 uint32 배열
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS dead (
+    doc_no INTEGER PRIMARY KEY  -- 삭제된 문서 (posting list에서는 조회 시 걸러냄)
+);
+"""
+
+FLUSH_EVERY = 20000  # 이 문서 수마다 메모리 posting을 SQLite에 이어 씀
+
+
+def _postings(data: bytes) -> array:
+    values = array('I')
+    values.frombytes(data)
+    return values
+
+
+class KeywordIndex:
+    """공백 토큰 기반 역색인 (Chroma $contains AND 필터와 같은 결과)"""
+
+    def __init__(self, path: str, readonly: bool = True):
+        self.path = path
+        if readonly:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"키워드 색인 파일이 없습니다: {path} (step1_preprocess.py 실행 필요)")
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.executescript(_SCHEMA)
+
+        # 이전 버전은 다시 연 뒤 삭제된 번호를 새 문서에 재사용했음 → 살아 있는 문서 번호는 삭제 표시에서 제외
+        # (삭제된 문서의 토큰이 남아 더 넓게 매칭될 수는 있지만 새 문서를 놓치지는 않음)
+        self._dead = {doc_no for (doc_no,) in self.conn.execute(
+            "SELECT doc_no FROM dead WHERE doc_no NOT IN (SELECT doc_no FROM docs)"
+        )}
+        # 삭제된 문서 번호도 posting list에 남아 있으므로 다시 쓰면 안 됨 (docs ∪ dead 최댓값 다음부터)
+        self._next_doc_no = (self.conn.execute(
+            "SELECT MAX(doc_no) FROM (SELECT MAX(doc_no) AS doc_no FROM docs UNION ALL SELECT MAX(doc_no) FROM dead)"
+        ).fetchone()[0] or 0) + 1
+        self._buffer = defaultdict(lambda: array('I'))
+        self._buffered_docs = 0
+        self._cache = {}
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ── 쓰기 ──
+
+    def add(self, doc_id: str, parent_id: str, text: str) -> None:
+        """문서 1건 색인 (doc_id = 벡터 DB ID)"""
+        doc_no = self._next_doc_no
+        self._next_doc_no += 1
+        self.conn.execute(
+            "INSERT INTO docs (doc_no, doc_id, parent_id) VALUES (?, ?, ?)",
+            (doc_no, doc_id, parent_id)
+        )
+        for term in set(text.split()):
+            self._buffer[term].append(doc_no)
+
+        self._buffered_docs += 1
+        if self._buffered_docs >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self) -> None:
+        """버퍼의 posting을 기존 posting list 뒤에 이어 씀 (doc_no는 계속 증가하므로 정렬 유지)"""
+        if not self._buffer:
+            return
+        for term, doc_nos in self._buffer.items():
+            row = self.conn.execute("SELECT postings FROM terms WHERE term = ?", (term,)).fetchone()
+            data = (row[0] if row else b'') + doc_nos.tobytes()
+            self.conn.execute("INSERT OR REPLACE INTO terms (term, postings) VALUES (?, ?)", (term, data))
+        self._buffer.clear()
+        self._buffered_docs = 0
+        self._cache.clear()
+
+    def remove_parent(self, parent_id: str) -> int:
+        """특허 1건의 문서를 삭제 표시 (posting list는 조회 시 걸러냄). 삭제 건수 반환"""
+        doc_nos = [doc_no for (doc_no,) in self.conn.execute(
+            "SELECT doc_no FROM docs WHERE parent_id = ?", (parent_id,)
+        )]
+        self.conn.executemany("INSERT OR IGNORE INTO dead (doc_no) VALUES (?)", ((d,) for d in doc_nos))
+        self.conn.execute("DELETE FROM docs WHERE parent_id = ?", (parent_id,))
+        self._dead.update(doc_nos)
+        self._cache.clear()
+        return len(doc_nos)
+
+    def clear(self) -> None:
+        self.conn.execute("DELETE FROM docs")
+        self.conn.execute("DELETE FROM terms")
+        self.conn.execute("DELETE FROM dead")
+        self._buffer.clear()
+        self._buffered_docs = 0
+        self._dead = set()
+        self._next_doc_no = 1
+        self._cache.clear()
+
+    # ── 조회 ──
+
+    def lookup(self, keyword: str) -> Set[int]:
+        """키워드를 부분 문자열로 포함하는 문서 번호 집합 (Chroma $contains와 동일)"""
+        if keyword not in self._cache:
+            doc_nos = set()
+            for (data,) in self.conn.execute("SELECT postings FROM terms WHERE instr(term, ?) > 0", (keyword,)):
+                doc_nos.update(_postings(data))
+            self._cache[keyword] = frozenset(doc_nos - self._dead)
+        return self._cache[keyword]
+
+    def match_all(self, keywords: Iterable[str]) -> Set[int]:
+        """모든 키워드를 포함하는 문서 번호 집합 (작은 posting list부터 교집합)"""
+        postings = sorted((self.lookup(kw) for kw in set(keywords)), key=len)
+        if not postings:
+            return set()
+        result = set(postings[0])
+        for other in postings[1:]:
+            if not result:
+                break
+            result &= other
+        return result
+
+    def doc_freq(self, keyword: str) -> int:
+        return len(self.lookup(keyword))
+
+    def count_matches(self, query: str) -> int:
+        """검색어(공백 구분 키워드 AND)에 매칭되는 문서 수"""
+        return len(self.match_all(query.split()))
+
+    def parent_ids(self, doc_nos: Iterable[int]) -> Set[str]:
+        return self._docs_column('parent_id', doc_nos)
+
+    def doc_ids(self, doc_nos: Iterable[int]) -> Set[str]:
+        return self._docs_column('doc_id', doc_nos)
+
+    def match_parent_ids(self, keywords: Iterable[str]) -> Set[str]:
+        """모든 키워드를 포함하는 문서의 parent_id 집합"""
+        return self.parent_ids(self.match_all(keywords))
+
+    def _docs_column(self, column: str, doc_nos: Iterable[int]) -> Set[str]:
+        doc_nos = list(doc_nos)
+        values = set()
+        # SQLite 바인딩 변수 제한(999) 고려
+        for i in range(0, len(doc_nos), 500):
+            batch = doc_nos[i:i + 500]
+            placeholders = ','.join('?' * len(batch))
+            values.update(value for (value,) in self.conn.execute(
+                f"SELECT {column} FROM docs WHERE doc_no IN ({placeholders})", batch
+            ))
+        return values
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
@@ -0,0 +1,178 @@
+"""
+LLM 응답 캐시 (SQLite, (모델, 프롬프트 해시) → 응답 텍스트, 크기 기반 LRU)
+
+FTO Step A/B/C, 구성요소 추출(dj/component_llm), 키워드 추출(dj/keywords_llm)은 모두
+temperature 0(또는 고정값)에 결정적인 프롬프트를 쓰므로 같은 입력이면 같은 응답을 재사용해도 됨.
+보고서를 다시 만들거나 HTML만 고칠 때 LLM 호출 없이 저장된 응답을 바로 씀.
+
+- 키: sha256(모델 이름 + 생성 설정 + 프롬프트 파트들)
+- 값: 응답 원문 텍스트 (파싱 전). 파싱에 성공한 응답만 저장할 것
+- 전체 크기가 max_bytes를 넘으면 가장 오래 안 쓴 항목부터 삭제 (max_bytes의 90%까지)
+- 적중할 때마다 쓰기/커밋하지 않도록 조회 시각(accessed)은 모아 두었다가 put / close 또는
+  ACCESS_FLUSH_EVERY건마다 한 번에 기록 (조회는 읽기만 하므로 WAL에서 다른 쓰기를 기다리지 않음)
+- WAL 모드라서 nh 파이프라인과 dj 추출 스크립트가 같은 파일을 동시에 써도 됨
+
+표준 라이브러리만 사용 (dj 스크립트에서 patent_store 패키지 의존성 없이 이 파일만 import 가능)
+
+    cache = LLMCache('llm_cache.sqlite')
+    text = cache.get('gemini-2.0-flash', prompt, temperature=0)
+    if text is None:
+        text = call_llm(prompt)
+        cache.put('gemini-2.0-flash', prompt, text, temperature=0)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Sequence, Union
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key      TEXT PRIMARY KEY,   -- sha256(모델, 생성 설정, 프롬프트)
+    model    TEXT NOT NULL,
+    size     INTEGER NOT NULL,   -- 응답 UTF-8 바이트 수
+    created  REAL NOT NULL,
+    accessed REAL NOT NULL,
+    response TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed);
+"""
+
+LLM_CACHE_MAX_BYTES = 1024 * 1024 * 1024   # 캐시 최대 크기 (응답 텍스트 합계, 1GB)
+ACCESS_FLUSH_EVERY = 256                   # 모아 두었다가 한 번에 기록할 조회 시각 수
+
+Prompt = Union[str, Sequence[str]]
+
+
+def make_cache_key(model: str, prompt: Prompt, **params) -> str:
+    """(모델, 생성 설정, 프롬프트) → 캐시 키. prompt는 문자열 또는 contents 파트 리스트"""
+    parts = [prompt] if isinstance(prompt, str) else list(prompt)
+    digest = hashlib.sha256()
+    digest.update(model.encode('utf-8'))
+    digest.update(b'\0' + json.dumps(params, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    for part in parts:
+        digest.update(b'\0' + part.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class LLMCache:
+    """(모델, 프롬프트) → LLM 응답 텍스트 캐시 (스레드 안전, 여러 프로세스 공유 가능)"""
+
+    def __init__(self, path: str = 'llm_cache.sqlite', max_bytes: int = LLM_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._bytes = self._total_bytes()
+        self._touched = {}  # {key: 조회 시각} 아직 기록하지 않은 accessed
+        self.hits = 0
+        self.misses = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_accessed()
+            self.conn.commit()
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def _total_bytes(self) -> int:
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> str:
+        return f"LLM 캐시 적중 {self.hits}건 / 미스 {self.misses}건 ({self.hit_rate:.0%})"
+
+    # ── 조회 / 저장 ──
+
+    def get(self, model: str, prompt: Prompt, **params) -> Optional[str]:
+        """저장된 응답 텍스트 (없으면 None)"""
+        key = make_cache_key(model, prompt, **params)
+        with self._lock:
+            row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._touched[key] = time.time()
+            if len(self._touched) >= ACCESS_FLUSH_EVERY:
+                self._flush_accessed()
+                self.conn.commit()
+            self.hits += 1
+        return row[0]
+
+    def put(self, model: str, prompt: Prompt, response: str, **params) -> None:
+        key = make_cache_key(model, prompt, **params)
+        size = len(response.encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, size, created, accessed, response) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, size, now, now, response)
+            )
+            self._bytes += size
+            self._flush_accessed()
+            if self._bytes > self.max_bytes:
+                self._evict()
+            self.conn.commit()
+
+    def _flush_accessed(self) -> None:
+        """모아 둔 조회 시각 기록 (커밋은 호출하는 쪽에서)"""
+        if self._touched:
+            self.conn.executemany(
+                "UPDATE responses SET accessed = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _evict(self) -> None:
+        """다른 프로세스가 쓴 양까지 반영해 다시 합산한 뒤, 오래 안 쓴 항목부터 max_bytes의 90%까지 삭제"""
+        self._bytes = self._total_bytes()
+        target = int(self.max_bytes * 0.9)
+        if self._bytes <= self.max_bytes:
+            return
+        cursor = self.conn.execute("SELECT key, size FROM responses ORDER BY accessed")
+        victims = []
+        for key, size in cursor:
+            if self._bytes <= target:
+                break
+            victims.append((key,))
+            self._bytes -= size
+        cursor.close()
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+            self._bytes = 0
+
+
+def open_llm_cache(path: Optional[str], max_bytes: int = LLM_CACHE_MAX_BYTES) -> Optional[LLMCache]:
+    """경로가 비어 있으면 캐시 사용 안 함(None), 열기에 실패해도 None (LLM 호출은 그대로 진행)"""
+    if not path:
+        return None
+    try:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        return LLMCache(path, max_bytes)
+    except sqlite3.Error as e:
+        print(f"⚠️ LLM 캐시를 열 수 없음 → 캐시 없이 진행: {path} ({e})")
+        return None
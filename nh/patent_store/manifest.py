@@ -0,0 +1,297 @@
+"""
+증분 전처리용 매니페스트 (SQLite)
+
+- patents: 출원번호 → 원본 파일, 파일 해시(sha1)/mtime/size
+- chunks: 벡터 DB에 들어간 청구항 chunk_id → 출원번호
+- pending: 아직 벡터 DB에 반영되지 않은 upsert/delete 작업 (컬렉션별)
+
+step1이 바뀐 파일만 다시 파싱하면서 pending 작업을 쌓고,
+step2가 해당 컬렉션의 pending 작업을 반영한 뒤 비움.
+step2 전체 실행(--incremental 없이)은 컬렉션에서 원본에 없는 ID를 찾아 삭제함 (delete_stale_ids).
+"""
+
+import hashlib
+import os
+import sqlite3
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# 벡터 DB 컬렉션 이름 (step2_build_vectordb*.py와 동일)
+CLAIMS_COLLECTION = 'patent_claims'
+PARENT_COLLECTION = 'patent_parent'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS patents (
+    app_number TEXT PRIMARY KEY,
+    file       TEXT NOT NULL,
+    sha1       TEXT NOT NULL,
+    mtime      REAL NOT NULL,
+    size       INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_patents_file ON patents(file);
+
+CREATE TABLE IF NOT EXISTS chunks (
+    chunk_id   TEXT PRIMARY KEY,
+    app_number TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_app ON chunks(app_number);
+
+CREATE TABLE IF NOT EXISTS pending (
+    collection TEXT NOT NULL,
+    doc_id     TEXT NOT NULL,
+    op         TEXT NOT NULL,   -- 'upsert' | 'delete'
+    PRIMARY KEY (collection, doc_id)
+);
+"""
+
+
+# ============================================
+# ID / 파일 지문
+# ============================================
+
+def make_chunk_id(metadata: dict) -> str:
+    """청구항 Document의 벡터 DB ID: {출원번호}_{source_type}_{청구항번호}"""
+    return f"{metadata['parent_id']}_{metadata['source_type']}_{metadata['claim_number']}"
+
+
+def dedupe_by_id(docs: Iterable[Any], get_id: Callable[[Any], str]) -> List[Any]:
+    """
+    같은 ID의 문서는 마지막 것만 남김 (원래 순서 유지)
+
+    Chroma는 한 번의 upsert 안에 같은 ID가 두 번 있으면 DuplicateIDError를 냄
+    (청구항 번호가 중복된 특허, 같은 특허가 두 번 들어온 경우)
+    """
+    docs = list(docs)
+    last = {get_id(doc): i for i, doc in enumerate(docs)}
+    return [doc for i, doc in enumerate(docs) if last[get_id(doc)] == i]
+
+
+def file_sha1(file_path: str) -> str:
+    """파일 내용 sha1"""
+    h = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_fingerprint(file_path: str) -> Tuple[str, float, int]:
+    """(sha1, mtime, size)"""
+    st = os.stat(file_path)
+    return file_sha1(file_path), st.st_mtime, st.st_size
+
+
+# ============================================
+# 매니페스트
+# ============================================
+
+class IngestManifest:
+    """출원번호 → 파일 해시 → chunk_id 매니페스트"""
+
+    def __init__(self, path: str = 'ingest_manifest.sqlite'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM patents").fetchone()[0]
+
+    # ── 변경 감지 ──
+
+    def plan(self, files: Iterable[str]) -> Tuple[List[str], List[str], int]:
+        """
+        현재 파일 목록과 매니페스트를 비교
+
+        mtime/size가 같으면 파일을 열지 않고 unchanged,
+        다르면 sha1을 비교해 내용이 같으면 unchanged (mtime만 갱신)
+
+        Returns:
+            (to_parse, removed_app_numbers, unchanged_count)
+        """
+        by_file = {
+            row[0]: row[1:]
+            for row in self.conn.execute("SELECT file, app_number, sha1, mtime, size FROM patents")
+        }
+
+        to_parse = []
+        unchanged = 0
+        seen_files = set()
+
+        for file_path in files:
+            seen_files.add(file_path)
+            known = by_file.get(file_path)
+            if known is None:
+                to_parse.append(file_path)
+                continue
+
+            app_number, sha1, mtime, size = known
+            st = os.stat(file_path)
+            if st.st_mtime == mtime and st.st_size == size:
+                unchanged += 1
+                continue
+
+            if file_sha1(file_path) == sha1:
+                self.conn.execute(
+                    "UPDATE patents SET mtime = ?, size = ? WHERE app_number = ?",
+                    (st.st_mtime, st.st_size, app_number)
+                )
+                unchanged += 1
+                continue
+
+            to_parse.append(file_path)
+
+        removed = [known[0] for file_path, known in by_file.items() if file_path not in seen_files]
+        self.conn.commit()
+
+        return to_parse, removed, unchanged
+
+    def app_number_for_file(self, file_path: str) -> Optional[str]:
+        row = self.conn.execute("SELECT app_number FROM patents WHERE file = ?", (file_path,)).fetchone()
+        return row[0] if row else None
+
+    def chunk_ids(self, app_number: str) -> Set[str]:
+        return {
+            row[0] for row in
+            self.conn.execute("SELECT chunk_id FROM chunks WHERE app_number = ?", (app_number,))
+        }
+
+    # ── 기록 ──
+
+    def record_patent(
+        self,
+        app_number: str,
+        file_path: str,
+        fingerprint: Tuple[str, float, int],
+        chunk_ids: List[str],
+    ) -> None:
+        """
+        파싱된 특허 1건을 기록하고 벡터 DB pending 작업을 쌓음
+
+        - 새 chunk_id 전부 upsert, 이전에만 있던 chunk_id는 delete
+        - Parent 컬렉션은 출원번호 1건 upsert
+        """
+        # 같은 파일이 다른 출원번호로 바뀐 경우 이전 특허는 삭제
+        previous = self.app_number_for_file(file_path)
+        if previous and previous != app_number:
+            self.remove_patent(previous)
+
+        stale = self.chunk_ids(app_number) - set(chunk_ids)
+
+        sha1, mtime, size = fingerprint
+        self.conn.execute(
+            "INSERT OR REPLACE INTO patents (app_number, file, sha1, mtime, size) VALUES (?, ?, ?, ?, ?)",
+            (app_number, file_path, sha1, mtime, size)
+        )
+        self.conn.execute("DELETE FROM chunks WHERE app_number = ?", (app_number,))
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO chunks (chunk_id, app_number) VALUES (?, ?)",
+            [(chunk_id, app_number) for chunk_id in chunk_ids]
+        )
+
+        self._queue(CLAIMS_COLLECTION, stale, 'delete')
+        self._queue(CLAIMS_COLLECTION, chunk_ids, 'upsert')
+        self._queue(PARENT_COLLECTION, [app_number], 'upsert')
+
+    def remove_patent(self, app_number: str) -> None:
+        """특허 1건과 그 청구항 chunk를 매니페스트에서 지우고 delete 작업을 쌓음"""
+        self._queue(CLAIMS_COLLECTION, self.chunk_ids(app_number), 'delete')
+        self._queue(PARENT_COLLECTION, [app_number], 'delete')
+        self.conn.execute("DELETE FROM chunks WHERE app_number = ?", (app_number,))
+        self.conn.execute("DELETE FROM patents WHERE app_number = ?", (app_number,))
+
+    def forget_file(self, file_path: str) -> Optional[str]:
+        """
+        바뀐 파일의 이전 특허를 지우고 delete 작업을 쌓음 (이전 출원번호 반환, 처음 보는 파일이면 None)
+
+        새로 파싱한 결과가 출원번호 없음/청구항 없음/오류여도 이전 특허가 벡터 DB에 남지 않도록
+        다시 파싱하기 전에 호출함. 다시 파싱된 청구항은 record_patent에서 upsert로 바뀜
+        """
+        previous = self.app_number_for_file(file_path)
+        if previous:
+            self.remove_patent(previous)
+        return previous
+
+    def reset(self) -> None:
+        """전체 재처리 전 매니페스트 초기화 (pending 포함)"""
+        self.conn.execute("DELETE FROM patents")
+        self.conn.execute("DELETE FROM chunks")
+        self.conn.execute("DELETE FROM pending")
+        self.conn.commit()
+
+    def commit(self) -> None:
+        self.conn.commit()
+
+    # ── pending 작업 (step2에서 사용) ──
+
+    def _queue(self, collection: str, doc_ids: Iterable[str], op: str) -> None:
+        # 같은 ID의 마지막 작업만 남김 (delete 후 upsert → upsert)
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO pending (collection, doc_id, op) VALUES (?, ?, ?)",
+            [(collection, doc_id, op) for doc_id in doc_ids]
+        )
+
+    def pending(self, collection: str) -> Dict[str, Set[str]]:
+        """{'upsert': {...}, 'delete': {...}}"""
+        ops = {'upsert': set(), 'delete': set()}
+        for doc_id, op in self.conn.execute(
+            "SELECT doc_id, op FROM pending WHERE collection = ?", (collection,)
+        ):
+            ops[op].add(doc_id)
+        return ops
+
+    def clear_pending(self, collection: str, doc_ids: Iterable[str] = None) -> None:
+        """반영 완료된 pending 작업 삭제 (doc_ids가 없으면 컬렉션 전체)"""
+        if doc_ids is None:
+            self.conn.execute("DELETE FROM pending WHERE collection = ?", (collection,))
+        else:
+            self.conn.executemany(
+                "DELETE FROM pending WHERE collection = ? AND doc_id = ?",
+                [(collection, doc_id) for doc_id in doc_ids]
+            )
+        self.conn.commit()
+
+
+# ============================================
+# 벡터 DB 동기화 (step2에서 사용)
+# ============================================
+
+VECTORSTORE_ID_BATCH = 5000   # Chroma get/delete 1회에 다룰 ID 수
+
+
+def iter_collection_ids(vectorstore, batch_size: int = VECTORSTORE_ID_BATCH) -> Iterator[str]:
+    """벡터 DB 컬렉션의 전체 문서 ID (임베딩/본문은 읽지 않음)"""
+    offset = 0
+    while True:
+        ids = vectorstore.get(include=[], limit=batch_size, offset=offset)['ids']
+        if not ids:
+            return
+        yield from ids
+        offset += len(ids)
+
+
+def delete_ids(vectorstore, ids: Iterable[str], batch_size: int = VECTORSTORE_ID_BATCH) -> int:
+    """ID 목록을 batch_size씩 나눠 삭제. 삭제 요청 수 반환"""
+    ids = sorted(ids)
+    for i in range(0, len(ids), batch_size):
+        vectorstore.delete(ids=ids[i:i + batch_size])
+    return len(ids)
+
+
+def delete_stale_ids(vectorstore, keep_ids: Set[str], batch_size: int = VECTORSTORE_ID_BATCH) -> int:
+    """
+    전체 재구축용: 컬렉션에 있지만 keep_ids(이번 원본)에 없는 문서를 삭제
+
+    upsert만으로는 원본에서 빠진 특허가 계속 검색되므로 전체 실행 때 함께 정리함.
+    삭제 건수 반환
+    """
+    stale = [doc_id for doc_id in iter_collection_ids(vectorstore, batch_size) if doc_id not in keep_ids]
+    return delete_ids(vectorstore, stale, batch_size)
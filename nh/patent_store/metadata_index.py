@@ -0,0 +1,183 @@
+"""
+메타데이터 사전 필터 색인 (특허 단위 비트맵 + IPC posting list)
+
+검색 결과를 받은 뒤 독립항/등록 특허만 골라내면 k개 중 대부분이 버려짐.
+Parent Store에서 미리
+- 등록 여부(is_patent_registered와 같은 기준) 비트맵
+- register_status 값별 비트맵
+- IPC 코드별 특허 posting list
+를 만들어 두고, 검색 전에 조건에 맞는 특허 집합을 계산해서 벡터 검색에 밀어 넣음
+(NumPy 백엔드는 행 마스크, Chroma는 parent_id $in 필터).
+
+    python -m patent_store.metadata_index parent_store.sqlite metadata_index.npz
+
+    index = MetadataIndex('metadata_index.npz')
+    parent_ids = index.eligible_parent_ids(registered_only=True, ipc_prefixes=['A61K 8', 'A61Q'])
+"""
+
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Union
+
+import numpy as np
+
+from .parent_store import ParentStore
+
+
+def _normalize_ipc(code: str) -> str:
+    return code.replace(' ', '').upper()
+
+
+def ipc_matches(code: str, prefix: str) -> bool:
+    """
+    IPC 계층 단위 접두어 매칭
+
+    - 'A61' / 'A61K': 문자열 접두어 (섹션/클래스/서브클래스)
+    - 'A61K 8': 메인그룹 일치 ('A61K 8/34'는 매칭, 'A61K 80/00'은 매칭 안 됨)
+    - 'A61K 8/3': 문자열 접두어 (서브그룹)
+    """
+    code, prefix = _normalize_ipc(code), _normalize_ipc(prefix)
+    if len(prefix) <= 4 or '/' in prefix:
+        return code.startswith(prefix)
+    return code.split('/')[0] == prefix
+
+
+def is_registered(parent: Dict) -> bool:
+    """등록 특허 여부 (fto_analyzer.fto_pipeline.is_patent_registered와 같은 기준)"""
+    register_number = str(parent.get('register_number', '') or '').strip()
+    return bool(register_number) and parent.get('register_status', '') == '등록'
+
+
+def _as_list(value: Union[None, str, Sequence[str]]) -> Optional[List[str]]:
+    if value is None:
+        return None
+    return [value] if isinstance(value, str) else list(value)
+
+
+class MetadataIndex:
+    """특허 단위 메타데이터 비트맵 색인 (읽기 전용)"""
+
+    def __init__(self, path: str = 'metadata_index.npz'):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"메타데이터 색인 파일이 없습니다: {path} (step1_preprocess.py 실행 필요)")
+
+        data = np.load(path, allow_pickle=False)
+        self.path = path
+        self.parent_ids = data['parent_ids']
+        n = len(self.parent_ids)
+        self.registered = np.unpackbits(data['registered'], count=n).astype(bool)
+        self.status_values = [str(v) for v in data['status_values']]
+        self.status_bitmaps = np.unpackbits(data['status_bitmaps'], axis=1, count=n).astype(bool)
+        self.ipc_codes = [str(c) for c in data['ipc_codes']]
+        self.ipc_offsets = data['ipc_offsets']
+        self.ipc_parents = data['ipc_parents']
+        self._position = {parent_id: i for i, parent_id in enumerate(self.parent_ids.tolist())}
+        self._ipc_cache = {}
+
+    def __len__(self) -> int:
+        return len(self.parent_ids)
+
+    def positions(self, parent_ids: Iterable[str]) -> np.ndarray:
+        """parent_id → 색인 위치 (없는 특허는 -1)"""
+        return np.fromiter((self._position.get(p, -1) for p in parent_ids), dtype=np.int64)
+
+    def ipc_mask(self, prefix: str) -> np.ndarray:
+        """IPC 접두어에 매칭되는 코드를 하나라도 가진 특허"""
+        if prefix not in self._ipc_cache:
+            mask = np.zeros(len(self), dtype=bool)
+            for i, code in enumerate(self.ipc_codes):
+                if ipc_matches(code, prefix):
+                    mask[self.ipc_parents[self.ipc_offsets[i]:self.ipc_offsets[i + 1]]] = True
+            self._ipc_cache[prefix] = mask
+        return self._ipc_cache[prefix]
+
+    def parent_mask(
+        self,
+        registered_only: bool = False,
+        register_status: Union[None, str, Sequence[str]] = None,
+        ipc_prefixes: Union[None, str, Sequence[str]] = None,
+    ) -> Optional[np.ndarray]:
+        """
+        조건에 맞는 특허 마스크 (필드 안에서는 OR, 필드끼리는 AND, 조건이 없으면 None)
+
+        Args:
+            registered_only: 등록 특허만 (등록번호 있음 + register_status == '등록')
+            register_status: 허용할 register_status 값
+            ipc_prefixes: 허용할 IPC 접두어 (하나라도 매칭되면 통과)
+        """
+        masks = []
+        if registered_only:
+            masks.append(self.registered)
+
+        statuses = _as_list(register_status)
+        if statuses is not None:
+            mask = np.zeros(len(self), dtype=bool)
+            for status in statuses:
+                if status in self.status_values:
+                    mask |= self.status_bitmaps[self.status_values.index(status)]
+            masks.append(mask)
+
+        prefixes = _as_list(ipc_prefixes)
+        if prefixes is not None:
+            mask = np.zeros(len(self), dtype=bool)
+            for prefix in prefixes:
+                mask |= self.ipc_mask(prefix)
+            masks.append(mask)
+
+        if not masks:
+            return None
+        return np.logical_and.reduce(masks)
+
+    def eligible_parent_ids(self, **conditions) -> Optional[Set[str]]:
+        """조건에 맞는 parent_id 집합 (조건이 없으면 None = 전체)"""
+        mask = self.parent_mask(**conditions)
+        if mask is None:
+            return None
+        return set(self.parent_ids[mask].tolist())
+
+
+def build_metadata_index(parent_store_path: str = 'parent_store.sqlite', index_path: str = 'metadata_index.npz') -> int:
+    """Parent Store → 메타데이터 색인 (.npz). 특허 수 반환"""
+    parent_ids, registered, statuses = [], [], []
+    ipc_postings: Dict[str, List[int]] = {}
+
+    with ParentStore(parent_store_path) as store:
+        for i, (parent_id, parent) in enumerate(store.items()):
+            parent_ids.append(parent_id)
+            registered.append(is_registered(parent))
+            statuses.append(parent.get('register_status', '') or '')
+            for code in dict.fromkeys(parent.get('ipc_codes', []) or []):
+                if code:
+                    ipc_postings.setdefault(code, []).append(i)
+
+    n = len(parent_ids)
+    status_values = sorted(set(statuses))
+    status_array = np.array(statuses, dtype=object)
+    status_bitmaps = np.stack([status_array == v for v in status_values]) if status_values else np.zeros((0, n), bool)
+
+    ipc_codes = sorted(ipc_postings)
+    ipc_offsets = np.zeros(len(ipc_codes) + 1, dtype=np.int64)
+    for i, code in enumerate(ipc_codes):
+        ipc_offsets[i + 1] = ipc_offsets[i] + len(ipc_postings[code])
+    ipc_parents = np.fromiter((p for code in ipc_codes for p in ipc_postings[code]), dtype=np.int32,
+                              count=int(ipc_offsets[-1]))
+
+    np.savez(
+        index_path,
+        parent_ids=np.array(parent_ids, dtype=str),
+        registered=np.packbits(np.array(registered, dtype=bool)),
+        status_values=np.array(status_values, dtype=str),
+        status_bitmaps=np.packbits(status_bitmaps, axis=1),
+        ipc_codes=np.array(ipc_codes, dtype=str),
+        ipc_offsets=ipc_offsets,
+        ipc_parents=ipc_parents,
+    )
+    return n
+
+
+if __name__ == "__main__":
+    import sys
+
+    args = sys.argv[1:]
+    store_path = args[0] if len(args) > 0 else 'parent_store.sqlite'
+    out_path = args[1] if len(args) > 1 else 'metadata_index.npz'
+    print(f"✓ 메타데이터 색인 생성 완료: {out_path} ({build_metadata_index(store_path, out_path)}개 특허)")
@@ -0,0 +1,164 @@
+"""
+Parent Document 저장소 (SQLite, parent_id 단위 랜덤 액세스)
+
+parent_documents.pkl 전체를 메모리에 올리는 대신, 검색 결과로 나온
+특허만 parent_id로 꺼내 읽음. dict처럼 get(parent_id) / [parent_id] / in / len 지원.
+
+    parent_store = ParentStore('parent_store.sqlite')
+    parent = parent_store.get('10-2004-7015570')
+
+기존 parent_documents.pkl에서 만들기:
+    python -m patent_store.parent_store parent_documents.pkl parent_store.sqlite
+"""
+
+import json
+import os
+import sqlite3
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS parents (
+    parent_id TEXT PRIMARY KEY,
+    data      BLOB NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def _encode(parent: Dict[str, Any]) -> bytes:
+    return json.dumps(parent, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _decode(data: bytes) -> Dict[str, Any]:
+    return json.loads(data)
+
+
+class ParentStore:
+    """SQLite 기반 Parent Document 저장소 (dict 호환 읽기 인터페이스)"""
+
+    def __init__(self, path: str = 'parent_store.sqlite', readonly: bool = True):
+        self.path = path
+        if readonly:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Parent Store 파일이 없습니다: {path} (step1_preprocess.py 실행 필요)")
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ── 읽기 (dict 호환) ──
+
+    def get(self, parent_id: str, default: Any = None) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT data FROM parents WHERE parent_id = ?", (parent_id,)).fetchone()
+        return _decode(row[0]) if row else default
+
+    def get_many(self, parent_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """여러 건을 한 번에 조회 (없는 ID는 결과에서 빠짐)"""
+        parent_ids = list(parent_ids)
+        result = {}
+        # SQLite 바인딩 변수 제한(999) 고려
+        for i in range(0, len(parent_ids), 500):
+            batch = parent_ids[i:i + 500]
+            placeholders = ','.join('?' * len(batch))
+            for parent_id, data in self.conn.execute(
+                f"SELECT parent_id, data FROM parents WHERE parent_id IN ({placeholders})", batch
+            ):
+                result[parent_id] = _decode(data)
+        return result
+
+    def __getitem__(self, parent_id: str) -> Dict[str, Any]:
+        parent = self.get(parent_id)
+        if parent is None:
+            raise KeyError(parent_id)
+        return parent
+
+    def __contains__(self, parent_id: str) -> bool:
+        return self.conn.execute(
+            "SELECT 1 FROM parents WHERE parent_id = ?", (parent_id,)
+        ).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM parents").fetchone()[0]
+
+    def keys(self) -> Iterator[str]:
+        for (parent_id,) in self.conn.execute("SELECT parent_id FROM parents"):
+            yield parent_id
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for parent_id, data in self.conn.execute("SELECT parent_id, data FROM parents"):
+            yield parent_id, _decode(data)
+
+    # ── 쓰기 ──
+
+    def put(self, parent_id: str, parent: Dict[str, Any]) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO parents (parent_id, data) VALUES (?, ?)",
+            (parent_id, _encode(parent))
+        )
+
+    def put_many(self, items: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO parents (parent_id, data) VALUES (?, ?)",
+            ((parent_id, _encode(parent)) for parent_id, parent in items)
+        )
+
+    def delete(self, parent_id: str) -> None:
+        self.conn.execute("DELETE FROM parents WHERE parent_id = ?", (parent_id,))
+
+    def clear(self) -> None:
+        self.conn.execute("DELETE FROM parents")
+
+
+# 청구항 메타데이터에 결합할 서지정보 필드
+BIBLIO_FIELDS = (
+    'application_number', 'open_number', 'register_number',
+    'title', 'title_eng',
+    'application_date', 'open_date', 'register_date', 'register_status',
+    'ipc_codes', 'abstract', 'total_amendments',
+)
+
+
+def join_parent_metadata(metadata: Dict[str, Any], parent_store) -> Dict[str, Any]:
+    """
+    청구항 메타데이터(parent_id, claim_number, claim_type, source_type)에
+    Parent Store의 서지정보를 결합
+
+    parent_store는 ParentStore 또는 {parent_id: parent} dict.
+    청구항 메타데이터에 이미 있는 값(이전 형식의 벡터 DB)이 우선함.
+    """
+    parent = parent_store.get(metadata.get('parent_id')) or {}
+    joined = {field: parent.get(field, '') for field in BIBLIO_FIELDS}
+    if isinstance(joined['ipc_codes'], list):
+        joined['ipc_codes'] = ','.join(joined['ipc_codes'])
+    joined.update(metadata)
+    return joined
+
+
+def build_parent_store(parent_pkl_path: str = 'parent_documents.pkl', store_path: str = 'parent_store.sqlite') -> int:
+    """(청크) parent_documents.pkl → Parent Store 변환. 저장 건수 반환"""
+    from .ingest import iter_pickle_chunks
+
+    with ParentStore(store_path, readonly=False) as store:
+        store.clear()
+        for chunk in iter_pickle_chunks(parent_pkl_path):
+            store.put_many(chunk.items())
+        count = len(store)
+    return count
+
+
+if __name__ == "__main__":
+    import sys
+
+    args = sys.argv[1:]
+    pkl_path = args[0] if len(args) > 0 else 'parent_documents.pkl'
+    db_path = args[1] if len(args) > 1 else 'parent_store.sqlite'
+    print(f"✓ Parent Store 생성 완료: {db_path} ({build_parent_store(pkl_path, db_path)}개 특허)")
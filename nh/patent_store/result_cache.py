@@ -0,0 +1,221 @@
+"""
+사용자 질문 단위 결과 캐시 (SQLite, TTL + LRU)
+
+같은 질문(또는 거의 같은 질문)이 다시 들어오면 구성요소 추출 → 검색어 생성 → 검색 → FTO 분석을
+처음부터 다시 하지 않고 저장해 둔 결과를 바로 반환함.
+
+- 키: 정규화한 질문 텍스트 (NFKC, 소문자, 공백/끝 문장부호 정리)
+- 임베딩 객체를 넘기면(선택) 정규화 텍스트가 달라도 코사인 유사도가 similarity_threshold 이상이면 근사 적중
+  (성분 하나만 달라도 유사도가 높게 나오므로 근사 적중 결과는 '_exact_match'가 False.
+   호출하는 쪽에서 추출 구성요소/검색 조건이 같은지 확인한 뒤에만 재사용해야 함)
+- 값: 추출 구성요소, 순위가 매겨진 patents_data, FTO 보고서(HTML) 등 pickle 가능한 dict
+- ttl 초가 지난 항목은 만료, max_entries를 넘으면 가장 오래 안 쓴 항목부터 삭제
+- 색인 버전(index_version: Parent Store / 매니페스트 / 색인 파일의 크기·수정 시각)이 바뀌면 기존 항목 전부 무효화
+  (Chroma는 디렉터리 대신 chroma.sqlite3 파일을 넣음. 조회만 해서는 바뀌지 않고 문서 추가/삭제 시 바뀜)
+
+    cache = QuestionCache('question_cache.sqlite',
+                          version=index_version('parent_store.sqlite', './chroma_db_parent/chroma.sqlite3'))
+    cached = cache.get(query)
+    if cached is None:
+        ...
+        cache.put(query, {'components': components, 'patents_data': patents_data, ...})
+"""
+
+import hashlib
+import os
+import pickle
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key        TEXT PRIMARY KEY,   -- 정규화한 질문
+    question   TEXT NOT NULL,      -- 처음 저장할 때의 원문
+    version    TEXT NOT NULL,      -- 저장 시점의 색인 버전
+    embedding  BLOB,               -- 정규화 질문 임베딩 (float32, 없으면 NULL)
+    created    REAL NOT NULL,
+    accessed   REAL NOT NULL,
+    payload    BLOB NOT NULL       -- pickle(dict)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed);
+"""
+
+QUESTION_CACHE_TTL = 7 * 24 * 3600       # 항목 유효 기간 (초)
+QUESTION_CACHE_MAX_ENTRIES = 500         # 최대 항목 수 (넘으면 LRU 삭제)
+QUESTION_SIMILARITY_THRESHOLD = 0.97     # 임베딩 코사인 유사도 적중 기준
+
+
+def normalize_question(question: str) -> str:
+    """캐시 키용 질문 정규화 (전각/반각 통일, 소문자, 공백 정리, 끝 문장부호 제거)"""
+    text = unicodedata.normalize('NFKC', question).lower()
+    text = re.sub(r'\s+', ' ', text).strip()
+    text = re.sub(r'\s*,\s*', ', ', text)
+    return text.rstrip(' ?!.~')
+
+
+def index_version(*paths: str) -> str:
+    """파일/디렉터리의 (경로, 크기, 수정 시각) 해시 → 색인이 다시 만들어지면 바뀜"""
+    digest = hashlib.sha1()
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+        else:
+            files = [path]
+        for file in files:
+            try:
+                stat = os.stat(file)
+            except FileNotFoundError:
+                continue
+            digest.update(f"{file}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class QuestionCache:
+    """정규화 질문(+선택적 임베딩 유사도) → 파이프라인 결과 캐시 (스레드 안전)"""
+
+    def __init__(
+        self,
+        path: str = 'question_cache.sqlite',
+        version: str = '',
+        embeddings=None,
+        ttl: float = QUESTION_CACHE_TTL,
+        max_entries: int = QUESTION_CACHE_MAX_ENTRIES,
+        similarity_threshold: float = QUESTION_SIMILARITY_THRESHOLD,
+    ):
+        self.path = path
+        self.version = version
+        self.embeddings = embeddings
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        # 색인 버전이 바뀌었으면 이전 결과는 모두 무효
+        with self._lock:
+            self.conn.execute("DELETE FROM entries WHERE version != ?", (version,))
+            self.conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    # ── 조회 ──
+
+    def _embed(self, key: str) -> Optional[np.ndarray]:
+        if self.embeddings is None:
+            return None
+        try:
+            vector = np.asarray(self.embeddings.embed_query(key), dtype=np.float32)
+        except Exception as e:
+            print(f"⚠️ 질문 임베딩 실패 → 정확히 같은 질문만 캐시 조회: {e}")
+            return None
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else None
+
+    def _similar_key(self, vector: np.ndarray) -> Optional[str]:
+        """임베딩 유사도가 기준 이상인 가장 가까운 항목의 키"""
+        rows = self.conn.execute(
+            "SELECT key, embedding FROM entries WHERE embedding IS NOT NULL AND created >= ?",
+            (time.time() - self.ttl,)
+        ).fetchall()
+        rows = [(key, data) for key, data in rows if len(data) == vector.nbytes]
+        if not rows:
+            return None
+        matrix = np.frombuffer(b''.join(data for _, data in rows), dtype=np.float32).reshape(len(rows), -1)
+        similarities = matrix @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.similarity_threshold:
+            return rows[best][0]
+        return None
+
+    def get(self, question: str) -> Optional[Dict[str, Any]]:
+        """
+        저장된 결과 dict (없거나 만료되면 None)
+
+        적중하면 '_cached_question'에 저장 당시 원문, '_exact_match'에 정규화 질문이 같은지(False면 임베딩 근사 적중)가 들어 있음
+        """
+        key = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT key, question, created, payload FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None and self.embeddings is not None:
+                vector = self._embed(key)
+                similar = self._similar_key(vector) if vector is not None else None
+                if similar is not None:
+                    row = self.conn.execute(
+                        "SELECT key, question, created, payload FROM entries WHERE key = ?", (similar,)
+                    ).fetchone()
+
+            if row is None or now - row[2] > self.ttl:
+                if row is not None:
+                    self.conn.execute("DELETE FROM entries WHERE key = ?", (row[0],))
+                    self.conn.commit()
+                self.misses += 1
+                return None
+
+            self.conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, row[0]))
+            self.conn.commit()
+            self.hits += 1
+
+        payload = pickle.loads(row[3])
+        payload['_cached_question'] = row[1]
+        payload['_exact_match'] = row[0] == key
+        return payload
+
+    # ── 저장 ──
+
+    def put(self, question: str, payload: Dict[str, Any]) -> None:
+        key = normalize_question(question)
+        vector = self._embed(key)
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (key, question, version, embedding, created, accessed, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, question, self.version, vector.tobytes() if vector is not None else None,
+                 now, now, pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+            )
+            self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now: float) -> None:
+        """만료 항목 삭제 후 max_entries를 넘는 만큼 오래 안 쓴 항목부터 삭제"""
+        self.conn.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl,))
+        overflow = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            self.conn.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed LIMIT ?)",
+                (overflow,)
+            )
+
+    def invalidate(self, question: Optional[str] = None) -> None:
+        """질문 1건 또는 전체 삭제"""
+        with self._lock:
+            if question is None:
+                self.conn.execute("DELETE FROM entries")
+            else:
+                self.conn.execute("DELETE FROM entries WHERE key = ?", (normalize_question(question),))
+            self.conn.commit()
@@ -0,0 +1,752 @@
+"""
+NumPy 벡터 검색 엔진 (Chroma 대체용, 정확한 top-k)
+
+Chroma 컬렉션의 임베딩을 float32 행렬(.npy, 메모리 맵)로 내보내고,
+ID / 본문 / 메타데이터는 SQLite 행 테이블에 둠. 검색은
+- 검색어 여러 개를 행렬곱 한 번으로 처리 (블록 단위로 나눠 메모리 제한)
+- filter / where_document는 검색 전에 불리언 마스크로 적용 (마스크는 캐시)
+- 점수는 Chroma와 같은 거리값 (컬렉션 space: l2=제곱 거리, cosine=1-cos, ip=1-내적)
+- 선택적으로 int8 / float16 압축 행렬로 후보를 넉넉히 고른 뒤(k × rescore_factor)
+  float32 원본으로 다시 계산해서 top-k를 정함 (원본은 후보 행만 읽음)
+
+Chroma와 같은 인터페이스(similarity_search_with_score,
+similarity_search_by_vector_with_relevance_scores, get, embeddings)를 제공하므로
+utils_v3.search_patents_with_multiple_queries에 그대로 넣을 수 있음.
+
+    python -m patent_store.vector_index build ./chroma_db_parent patent_parent ./chroma_db_parent_npy
+    python -m patent_store.vector_index bench ./chroma_db_parent patent_parent ./chroma_db_parent_npy
+    python -m patent_store.vector_index quantize ./chroma_db_parent patent_parent --dtype int8
+    python -m patent_store.vector_index bench-quant ./chroma_db_parent patent_parent --dtype int8
+
+    vectorstore = load_vectorstore('numpy', './chroma_db_parent', 'patent_parent', embeddings)
+    vectorstore = load_vectorstore('numpy', './chroma_db_parent', 'patent_parent', embeddings, quantization='int8')
+
+색인은 Chroma의 스냅샷이므로 index.json에 내보낼 때의 컬렉션 버전(collection_version)을 기록함.
+step2 실행 등으로 Chroma가 바뀌면 load_vectorstore가 오래된 색인 대신 Chroma를 사용하고(경고 출력),
+step2_build_vectordb*.py는 색인 폴더가 있으면 끝에서 다시 내보냄 (refresh_vector_index).
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import time
+import warnings
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rows (
+    row      INTEGER PRIMARY KEY,
+    id       TEXT NOT NULL,
+    document TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+"""
+
+BLOCK_ROWS = 65536   # 행렬곱 1회에 처리할 문서 행 수 (검색어 수 × 블록 크기만큼 메모리 사용)
+EXPORT_BATCH = 5000  # Chroma에서 한 번에 읽어올 문서 수
+RESCORE_FACTOR = 4   # 압축 색인: k × RESCORE_FACTOR개 후보를 float32로 다시 계산
+CAST_ROWS = 4096     # 압축 색인: float32로 변환해 곱하는 행 수 (블록 전체를 한 번에 변환하지 않음)
+QUANTIZATIONS = ('int8', 'float16')
+
+
+def default_index_dir(persist_directory: str) -> str:
+    """Chroma 폴더 옆의 NumPy 색인 폴더 (./chroma_db_parent → ./chroma_db_parent_npy)"""
+    return persist_directory.rstrip('/\\') + '_npy'
+
+
+def chroma_sqlite_path(persist_directory: str) -> str:
+    """Chroma 폴더의 메타데이터/기록 DB (문서 추가·삭제 때마다 갱신, 조회만 하면 그대로)"""
+    return os.path.join(persist_directory, 'chroma.sqlite3')
+
+
+def collection_version(persist_directory: str) -> Optional[str]:
+    """Chroma 폴더의 변경 버전 (chroma.sqlite3 크기·수정 시각, 폴더가 없으면 None)"""
+    try:
+        stat = os.stat(chroma_sqlite_path(persist_directory))
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def is_index_current(index_dir: str, persist_directory: str) -> bool:
+    """
+    NumPy 색인이 지금의 Chroma 컬렉션과 같은 버전인지
+
+    Chroma 폴더가 없으면(색인만 배포한 경우) 비교할 대상이 없으므로 최신으로 봄.
+    버전이 기록되지 않은 예전 색인은 오래된 것으로 봄
+    """
+    current = collection_version(persist_directory)
+    if current is None:
+        return True
+    try:
+        with open(os.path.join(index_dir, 'index.json'), encoding='utf-8') as f:
+            return json.load(f).get('source_version') == current
+    except FileNotFoundError:
+        return False
+
+
+# ============================================
+# 필터 → 불리언 마스크
+# ============================================
+
+def _contains_mask(texts: Sequence[str], keyword: str) -> np.ndarray:
+    return np.fromiter((keyword in text for text in texts), dtype=bool, count=len(texts))
+
+
+def _compare(column: np.ndarray, op: str, value: Any) -> np.ndarray:
+    if op == '$eq':
+        return column == value
+    if op == '$ne':
+        return column != value
+    if op == '$in':
+        return np.isin(column, list(value))
+    if op == '$nin':
+        return ~np.isin(column, list(value))
+    if op in ('$gt', '$gte', '$lt', '$lte'):
+        numeric = np.array([v if isinstance(v, (int, float)) else np.nan for v in column], dtype=float)
+        with np.errstate(invalid='ignore'):
+            return {'$gt': numeric > value, '$gte': numeric >= value,
+                    '$lt': numeric < value, '$lte': numeric <= value}[op]
+    raise ValueError(f"지원하지 않는 필터 연산자: {op}")
+
+
+# ============================================
+# 검색 엔진
+# ============================================
+
+class NumpyVectorStore:
+    """메모리 맵 float32 행렬 + SQLite 행 테이블 기반 정확한 벡터 검색 (Chroma 호환 인터페이스)"""
+
+    def __init__(self, index_dir: str, embedding_function=None, quantization: Optional[str] = None,
+                 rescore_factor: int = RESCORE_FACTOR):
+        info_path = os.path.join(index_dir, 'index.json')
+        if not os.path.exists(info_path):
+            raise FileNotFoundError(f"벡터 색인이 없습니다: {index_dir} (python -m patent_store.vector_index build 실행 필요)")
+
+        with open(info_path, encoding='utf-8') as f:
+            self.info = json.load(f)
+        self.index_dir = index_dir
+        self.space = self.info.get('space', 'l2')
+        self.vectors = np.load(os.path.join(index_dir, 'embeddings.npy'), mmap_mode='r')
+        self.sq_norms = np.load(os.path.join(index_dir, 'sq_norms.npy'))
+
+        # 압축 색인 (quantize_vector_index로 생성)
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        self.q_vectors = None
+        self.q_scales = None
+        if quantization is not None:
+            if quantization not in QUANTIZATIONS:
+                raise ValueError(f"지원하지 않는 압축 형식: {quantization} (int8 / float16)")
+            q_path = os.path.join(index_dir, f'embeddings_{quantization}.npy')
+            if not os.path.exists(q_path):
+                raise FileNotFoundError(f"압축 색인이 없습니다: {q_path} (python -m patent_store.vector_index quantize 실행 필요)")
+            self.q_vectors = np.load(q_path, mmap_mode='r')
+            if quantization == 'int8':
+                self.q_scales = np.load(os.path.join(index_dir, 'scales_int8.npy'))
+        self.conn = sqlite3.connect(f"file:{os.path.join(index_dir, 'rows.sqlite')}?mode=ro",
+                                    uri=True, check_same_thread=False)
+        self._embedding_function = embedding_function
+        self._ids = None
+        self._texts = None
+        self._columns = {}
+        self._contains_cache = {}
+        self._prefilter_cache = {}
+
+    @property
+    def embeddings(self):
+        return self._embedding_function
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    # ── 행 테이블 ──
+
+    def _all_ids(self) -> np.ndarray:
+        if self._ids is None:
+            self._ids = np.array([i for (i,) in self.conn.execute("SELECT id FROM rows ORDER BY row")], dtype=object)
+        return self._ids
+
+    def _all_texts(self) -> List[str]:
+        if self._texts is None:
+            self._texts = [t for (t,) in self.conn.execute("SELECT document FROM rows ORDER BY row")]
+        return self._texts
+
+    def _column(self, field: str) -> np.ndarray:
+        """메타데이터 필드 1개를 행 순서 배열로 (처음 쓸 때 한 번만 읽음)"""
+        if field not in self._columns:
+            self._columns[field] = np.array(
+                [json.loads(m).get(field) for (m,) in self.conn.execute("SELECT metadata FROM rows ORDER BY row")],
+                dtype=object
+            )
+        return self._columns[field]
+
+    def _fetch(self, rows: Sequence[int]) -> Dict[int, Tuple[str, str, Dict[str, Any]]]:
+        result = {}
+        rows = [int(r) for r in rows]
+        for i in range(0, len(rows), 500):
+            batch = rows[i:i + 500]
+            placeholders = ','.join('?' * len(batch))
+            for row, doc_id, document, metadata in self.conn.execute(
+                f"SELECT row, id, document, metadata FROM rows WHERE row IN ({placeholders})", batch
+            ):
+                result[row] = (doc_id, document, json.loads(metadata))
+        return result
+
+    # ── 마스크 ──
+
+    def where_mask(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Chroma 메타데이터 필터 → 불리언 마스크 (None이면 전체)"""
+        if not where:
+            return None
+        masks = []
+        for key, value in where.items():
+            if key == '$and':
+                mask = np.logical_and.reduce([self.where_mask(w) for w in value])
+            elif key == '$or':
+                mask = np.logical_or.reduce([self.where_mask(w) for w in value])
+            elif isinstance(value, dict):
+                mask = np.logical_and.reduce([_compare(self._column(key), op, v) for op, v in value.items()])
+            else:
+                mask = self._column(key) == value
+            masks.append(np.asarray(mask, dtype=bool))
+        return np.logical_and.reduce(masks)
+
+    def where_document_mask(self, where_document: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Chroma 본문 필터($contains / $not_contains / $and / $or) → 불리언 마스크"""
+        if not where_document:
+            return None
+        masks = []
+        for key, value in where_document.items():
+            if key == '$and':
+                masks.append(np.logical_and.reduce([self.where_document_mask(w) for w in value]))
+            elif key == '$or':
+                masks.append(np.logical_or.reduce([self.where_document_mask(w) for w in value]))
+            elif key in ('$contains', '$not_contains'):
+                if value not in self._contains_cache:
+                    self._contains_cache[value] = _contains_mask(self._all_texts(), value)
+                mask = self._contains_cache[value]
+                masks.append(mask if key == '$contains' else ~mask)
+            else:
+                raise ValueError(f"지원하지 않는 본문 필터 연산자: {key}")
+        return np.logical_and.reduce(masks)
+
+    def _mask(self, filter: Optional[Dict[str, Any]], where_document: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        masks = [m for m in (self.where_mask(filter), self.where_document_mask(where_document)) if m is not None]
+        if not masks:
+            return None
+        return np.logical_and.reduce(masks)
+
+    def prefilter_mask(self, metadata_index=None, claim_type=None, source_type=None,
+                       **parent_conditions) -> Optional[np.ndarray]:
+        """
+        메타데이터 사전 필터 → 행 마스크 (조건이 없으면 None)
+
+        Args:
+            metadata_index: MetadataIndex (등록 여부/register_status/IPC 조건에 필요)
+            claim_type: 허용할 claim_type (예: 'independent')
+            source_type: 허용할 source_type
+            **parent_conditions: MetadataIndex.parent_mask 조건
+                (registered_only, register_status, ipc_prefixes)
+        """
+        key = repr((id(metadata_index), claim_type, source_type, sorted(parent_conditions.items())))
+        if key in self._prefilter_cache:
+            return self._prefilter_cache[key]
+
+        masks = []
+        for field, value in (('claim_type', claim_type), ('source_type', source_type)):
+            if value is not None:
+                values = [value] if isinstance(value, str) else list(value)
+                masks.append(np.isin(self._column(field), values))
+
+        if any(v for v in parent_conditions.values()):
+            if metadata_index is None:
+                raise ValueError(f"메타데이터 색인 없이 특허 단위 조건을 쓸 수 없습니다: {parent_conditions}")
+            parent_mask = metadata_index.parent_mask(**parent_conditions)
+            if parent_mask is not None:
+                positions = metadata_index.positions(self._column('parent_id'))
+                masks.append((positions >= 0) & parent_mask[np.maximum(positions, 0)])
+
+        mask = np.logical_and.reduce(masks) if masks else None
+        self._prefilter_cache[key] = mask
+        return mask
+
+    # ── 거리 계산 ──
+
+    def _to_distances(self, queries: np.ndarray, dots: np.ndarray, x_sq_norms: np.ndarray) -> np.ndarray:
+        """내적 → Chroma와 같은 거리값"""
+        if self.space == 'ip':
+            return 1.0 - dots
+        if self.space == 'cosine':
+            q_norms = np.sqrt((queries * queries).sum(axis=1))[:, None]
+            return 1.0 - dots / np.maximum(q_norms * np.sqrt(x_sq_norms), 1e-12)
+        q_sq = (queries * queries).sum(axis=1)[:, None]
+        return np.maximum(q_sq + x_sq_norms - 2.0 * dots, 0.0)
+
+    def _block_dots(self, queries: np.ndarray, start: int, end: int) -> np.ndarray:
+        """검색어 × 문서 블록 내적 (압축 색인이면 압축 행렬로 근사)"""
+        if self.q_vectors is None:
+            return queries @ np.asarray(self.vectors[start:end]).T
+        # 블록 전체를 float32로 변환하면 원본과 같은 크기의 임시 행렬이 생기므로 CAST_ROWS씩 나눠 변환
+        dots = np.empty((queries.shape[0], end - start), dtype=np.float32)
+        for lo in range(start, end, CAST_ROWS):
+            hi = min(lo + CAST_ROWS, end)
+            np.matmul(queries, np.asarray(self.q_vectors[lo:hi], dtype=np.float32).T, out=dots[:, lo - start:hi - start])
+        if self.q_scales is not None:
+            dots *= self.q_scales[None, start:end]
+        return dots
+
+    def _scan(self, queries: np.ndarray, k: int, masks: Sequence[Optional[np.ndarray]], block_rows: int):
+        """블록 단위로 거리를 계산하며 검색어별 top-k (행 번호, 거리) 유지"""
+        n_queries, n_rows = queries.shape[0], len(self)
+        best_dist = np.full((n_queries, 0), np.inf, dtype=np.float32)
+        best_rows = np.empty((n_queries, 0), dtype=np.int64)
+
+        for start in range(0, n_rows, block_rows):
+            end = min(start + block_rows, n_rows)
+            dots = self._block_dots(queries, start, end)
+            dist = self._to_distances(queries, dots, self.sq_norms[None, start:end]).astype(np.float32, copy=False)
+            for qi, mask in enumerate(masks):
+                if mask is not None:
+                    dist[qi, ~mask[start:end]] = np.inf
+
+            # 이전 블록까지의 top-k와 합쳐서 다시 top-k
+            dist = np.concatenate([best_dist, dist], axis=1)
+            rows = np.concatenate([best_rows, np.broadcast_to(np.arange(start, end), (n_queries, end - start))], axis=1)
+            if dist.shape[1] > k:
+                top = np.argpartition(dist, k - 1, axis=1)[:, :k]
+                dist = np.take_along_axis(dist, top, axis=1)
+                rows = np.take_along_axis(rows, top, axis=1)
+            best_dist, best_rows = dist, rows
+
+        return best_dist, best_rows
+
+    def _rescore(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """후보 행만 float32 원본으로 정확한 거리 재계산"""
+        order = np.argsort(rows)  # 메모리 맵은 행 번호 순으로 읽는 편이 빠름
+        sorted_rows = rows[order]
+        vectors = np.asarray(self.vectors[sorted_rows], dtype=np.float32)
+        dist = self._to_distances(query[None, :], (vectors @ query)[None, :], self.sq_norms[None, sorted_rows])[0]
+        exact = np.empty_like(dist)
+        exact[order] = dist
+        return exact
+
+    def search_rows(
+        self,
+        query_vectors: Sequence[Sequence[float]],
+        k: int,
+        masks: Sequence[Optional[np.ndarray]] = None,
+        block_rows: int = BLOCK_ROWS,
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        여러 검색어의 top-k 행 번호와 거리를 한 번에 계산
+
+        masks[i]가 있으면 i번째 검색어는 마스크가 True인 행만 대상.
+        압축 색인이면 k × rescore_factor개 후보를 고른 뒤 float32로 다시 계산
+        """
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        masks = masks or [None] * queries.shape[0]
+        n_candidates = k * self.rescore_factor if self.q_vectors is not None else k
+        best_dist, best_rows = self._scan(queries, n_candidates, masks, block_rows)
+
+        results = []
+        for qi in range(queries.shape[0]):
+            keep = np.isfinite(best_dist[qi])
+            rows, dist = best_rows[qi][keep], best_dist[qi][keep]
+            if self.q_vectors is not None and len(rows):
+                dist = self._rescore(queries[qi], rows)
+            order = np.argsort(dist, kind='stable')[:k]
+            results.append([(int(rows[j]), float(dist[j])) for j in order])
+        return results
+
+    def _to_documents(self, hits: List[List[Tuple[int, float]]]) -> List[List[Tuple[Document, float]]]:
+        rows = self._fetch({row for query_hits in hits for row, _ in query_hits})
+        return [
+            [(Document(page_content=rows[row][1], metadata=rows[row][2], id=rows[row][0]), dist)
+             for row, dist in query_hits]
+            for query_hits in hits
+        ]
+
+    # ── Chroma 호환 인터페이스 ──
+
+    def batch_similarity_search_by_vectors(
+        self,
+        embeddings: Sequence[Sequence[float]],
+        k: int = 4,
+        filters: Sequence[Optional[Dict[str, Any]]] = None,
+        where_documents: Sequence[Optional[Dict[str, Any]]] = None,
+        base_mask: Optional[np.ndarray] = None,
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        검색어 여러 개를 행렬곱 한 번으로 검색 → 검색어별 [(doc, score)]
+
+        base_mask: 모든 검색어에 공통으로 적용할 행 마스크 (prefilter_mask 결과)
+        """
+        n = len(embeddings)
+        filters = filters or [None] * n
+        where_documents = where_documents or [None] * n
+        masks = [self._mask(f, w) for f, w in zip(filters, where_documents)]
+        if base_mask is not None:
+            masks = [base_mask if m is None else (m & base_mask) for m in masks]
+        return self._to_documents(self.search_rows(embeddings, k, masks))
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self, embedding: List[float], k: int = 4, filter: Dict[str, Any] = None,
+        where_document: Dict[str, Any] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.batch_similarity_search_by_vectors([embedding], k, [filter], [where_document],
+                                                       base_mask=kwargs.get('base_mask'))[0]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Dict[str, Any] = None,
+        where_document: Dict[str, Any] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        if self._embedding_function is None:
+            raise ValueError("embedding_function이 없으면 검색어 문자열로 검색할 수 없습니다")
+        embedding = self._embedding_function.embed_query(query)
+        return self.similarity_search_by_vector_with_relevance_scores(embedding, k, filter, where_document, **kwargs)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def get(self, ids=None, where=None, where_document=None, include=None, limit=None, offset=None) -> Dict[str, Any]:
+        """조건에 맞는 문서 ({'ids': [...]}, include에 documents/metadatas가 있으면 함께 반환)"""
+        mask = self._mask(where, where_document)
+        all_ids = self._all_ids()
+        rows = np.arange(len(all_ids)) if mask is None else np.flatnonzero(mask)
+        if ids is not None:
+            wanted = {ids} if isinstance(ids, str) else set(ids)
+            rows = [r for r in rows if all_ids[r] in wanted]
+        rows = list(rows)[offset or 0:]
+        rows = rows[:limit] if limit else rows
+
+        result = {'ids': [all_ids[r] for r in rows]}
+        include = include or []
+        if 'documents' in include or 'metadatas' in include:
+            fetched = self._fetch(rows)
+            if 'documents' in include:
+                result['documents'] = [fetched[int(r)][1] for r in rows]
+            if 'metadatas' in include:
+                result['metadatas'] = [fetched[int(r)][2] for r in rows]
+        return result
+
+
+def load_vectorstore(backend: str, persist_directory: str, collection_name: str, embedding_function,
+                     index_dir: str = None, quantization: Optional[str] = None):
+    """
+    검색 백엔드 선택 ('chroma' | 'numpy')
+
+    numpy는 build_vector_index로 만든 색인 폴더(기본: persist_directory + '_npy')를 사용하고,
+    quantization('int8' | 'float16')을 주면 압축 색인으로 후보를 고른 뒤 float32로 재계산.
+    색인을 만든 뒤 Chroma 컬렉션이 바뀌었으면 오래된 색인을 검색하지 않도록 경고 후 Chroma를 사용
+    """
+    if backend not in ('chroma', 'numpy'):
+        raise ValueError(f"알 수 없는 벡터 백엔드: {backend}")
+
+    if backend == 'numpy':
+        index_dir = index_dir or default_index_dir(persist_directory)
+        if is_index_current(index_dir, persist_directory):
+            return NumpyVectorStore(index_dir, embedding_function, quantization=quantization)
+        warnings.warn(
+            f"NumPy 벡터 색인이 Chroma 컬렉션보다 오래됨 → Chroma로 검색: {index_dir} "
+            f"(python -m patent_store.vector_index build {persist_directory} {collection_name} 로 다시 생성)"
+        )
+
+    from langchain_chroma import Chroma
+    return Chroma(persist_directory=persist_directory, embedding_function=embedding_function,
+                  collection_name=collection_name)
+
+
+# ============================================
+# Chroma 컬렉션 → NumPy 색인
+# ============================================
+
+def _collection_space(collection) -> str:
+    metadata = collection.metadata or {}
+    if 'hnsw:space' in metadata:
+        return metadata['hnsw:space']
+    try:
+        return collection.configuration['hnsw']['space'] or 'l2'
+    except Exception:
+        return 'l2'
+
+
+def build_vector_index(persist_directory: str, collection_name: str, index_dir: str = None,
+                       batch_size: int = EXPORT_BATCH) -> int:
+    """
+    Chroma 컬렉션의 임베딩/본문/메타데이터를 NumPy 색인으로 내보냄. 문서 수 반환
+
+    내보내기 전 컬렉션 버전을 index.json에 기록함 (내보내는 도중 바뀌면 다음 로드 때 오래된 색인으로 판정).
+    이전 색인의 압축 행렬은 지우고, 있던 형식은 새 행렬로 다시 만듦
+    """
+    import chromadb
+
+    index_dir = index_dir or default_index_dir(persist_directory)
+    os.makedirs(index_dir, exist_ok=True)
+    source_version = collection_version(persist_directory)
+
+    # 이전 색인의 압축 행렬은 새 행렬과 맞지 않으므로 삭제 (아래에서 다시 생성)
+    requantize = []
+    for dtype in QUANTIZATIONS:
+        for name in (f'embeddings_{dtype}.npy', f'scales_{dtype}.npy'):
+            path = os.path.join(index_dir, name)
+            if os.path.exists(path):
+                os.remove(path)
+                if name.startswith('embeddings_'):
+                    requantize.append(dtype)
+
+    collection = chromadb.PersistentClient(path=persist_directory).get_collection(collection_name)
+    total = collection.count()
+    if total == 0:
+        raise ValueError(f"컬렉션이 비어 있습니다: {collection_name}")
+
+    first = collection.get(limit=1, include=['embeddings'])
+    dim = len(first['embeddings'][0])
+
+    rows_path = os.path.join(index_dir, 'rows.sqlite')
+    if os.path.exists(rows_path):
+        os.remove(rows_path)
+    conn = sqlite3.connect(rows_path)
+    conn.executescript(_SCHEMA)
+
+    vectors = np.lib.format.open_memmap(os.path.join(index_dir, 'embeddings.npy'), mode='w+',
+                                        dtype=np.float32, shape=(total, dim))
+    sq_norms = np.empty(total, dtype=np.float32)
+
+    row = 0
+    start = time.time()
+    for offset in range(0, total, batch_size):
+        batch = collection.get(limit=batch_size, offset=offset, include=['embeddings', 'documents', 'metadatas'])
+        n = len(batch['ids'])
+        if n == 0:
+            break
+        emb = np.asarray(batch['embeddings'], dtype=np.float32)
+        vectors[row:row + n] = emb
+        sq_norms[row:row + n] = (emb * emb).sum(axis=1)
+        conn.executemany(
+            "INSERT INTO rows (row, id, document, metadata) VALUES (?, ?, ?, ?)",
+            [(row + i, doc_id, document or '', json.dumps(metadata or {}, ensure_ascii=False))
+             for i, (doc_id, document, metadata) in enumerate(zip(batch['ids'], batch['documents'], batch['metadatas']))]
+        )
+        row += n
+        print(f"내보내기: {row}/{total} ({row / max(time.time() - start, 1e-9):.0f} docs/sec)")
+
+    conn.commit()
+    conn.close()
+    vectors.flush()
+    del vectors
+
+    # 도중에 컬렉션 크기가 달라졌으면 실제 행 수만 남김
+    if row != total:
+        trimmed = np.load(os.path.join(index_dir, 'embeddings.npy'))[:row]
+        np.save(os.path.join(index_dir, 'embeddings.npy'), trimmed)
+    np.save(os.path.join(index_dir, 'sq_norms.npy'), sq_norms[:row])
+
+    for dtype in requantize:
+        quantize_vector_index(index_dir, dtype)
+
+    with open(os.path.join(index_dir, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump({'collection': collection_name, 'count': row, 'dim': dim,
+                   'space': _collection_space(collection), 'source_version': source_version},
+                  f, ensure_ascii=False, indent=2)
+    return row
+
+
+def refresh_vector_index(persist_directory: str, collection_name: str, index_dir: str = None) -> Optional[int]:
+    """
+    step2 끝에서 호출: NumPy 색인 폴더가 있고 컬렉션이 바뀌었으면 다시 내보냄
+
+    Returns:
+        다시 내보낸 문서 수 (색인이 없거나 이미 최신이면 None)
+    """
+    index_dir = index_dir or default_index_dir(persist_directory)
+    if not os.path.exists(os.path.join(index_dir, 'index.json')) or is_index_current(index_dir, persist_directory):
+        return None
+    return build_vector_index(persist_directory, collection_name, index_dir)
+
+
+def quantize_vector_index(index_dir: str, dtype: str = 'int8', block_rows: int = BLOCK_ROWS) -> int:
+    """
+    float32 색인에서 압축 행렬 생성 (원본은 그대로 두고 재계산용으로 사용)
+
+    - int8: 행마다 scale = max|x| / 127 로 나눠 반올림 (scales_int8.npy에 scale 저장, 1/4 크기)
+    - float16: 그대로 반정밀도로 변환 (1/2 크기)
+
+    Returns:
+        압축 행렬 파일 크기 (bytes)
+    """
+    if dtype not in QUANTIZATIONS:
+        raise ValueError(f"지원하지 않는 압축 형식: {dtype} (int8 / float16)")
+
+    vectors = np.load(os.path.join(index_dir, 'embeddings.npy'), mmap_mode='r')
+    q_path = os.path.join(index_dir, f'embeddings_{dtype}.npy')
+    quantized = np.lib.format.open_memmap(q_path, mode='w+', dtype=np.int8 if dtype == 'int8' else np.float16,
+                                          shape=vectors.shape)
+    scales = np.empty(vectors.shape[0], dtype=np.float32)
+
+    for start in range(0, vectors.shape[0], block_rows):
+        block = np.asarray(vectors[start:start + block_rows], dtype=np.float32)
+        if dtype == 'int8':
+            scale = np.maximum(np.abs(block).max(axis=1), 1e-12) / 127.0
+            quantized[start:start + len(block)] = np.clip(np.rint(block / scale[:, None]), -127, 127)
+            scales[start:start + len(block)] = scale
+        else:
+            quantized[start:start + len(block)] = block.astype(np.float16)
+
+    quantized.flush()
+    del quantized
+    if dtype == 'int8':
+        np.save(os.path.join(index_dir, 'scales_int8.npy'), scales)
+    return os.path.getsize(q_path)
+
+
+# ============================================
+# 벤치마크 (Chroma vs NumPy, 압축 색인 recall)
+# ============================================
+
+def _sample_queries(engine: NumpyVectorStore, n_queries: int, seed: int) -> List[List[float]]:
+    """저장된 문서 임베딩에 잡음을 섞어 검색어 벡터로 사용 (API 호출 없음)"""
+    rng = np.random.default_rng(seed)
+    rows = random.Random(seed).sample(range(len(engine)), min(n_queries, len(engine)))
+    queries = np.asarray(engine.vectors[sorted(rows)], dtype=np.float32)
+    queries = queries + rng.normal(0, 0.01, queries.shape).astype(np.float32)
+    return [q.tolist() for q in queries]
+
+
+def benchmark(persist_directory: str, collection_name: str, index_dir: str = None,
+              n_queries: int = 200, k: int = 50, seed: int = 0) -> Dict[str, float]:
+    """
+    저장된 문서 임베딩에 잡음을 섞은 벡터를 검색어로 써서 (API 호출 없음)
+    Chroma 검색어별 조회 vs NumPy 검색어별 조회 vs NumPy 일괄 조회 시간과 top-k 일치율 비교
+    """
+    from langchain_chroma import Chroma
+
+    engine = NumpyVectorStore(index_dir or default_index_dir(persist_directory))
+    chroma = Chroma(persist_directory=persist_directory, collection_name=collection_name)
+    queries = _sample_queries(engine, n_queries, seed)
+
+    start = time.time()
+    chroma_results = [chroma.similarity_search_by_vector_with_relevance_scores(q, k=k) for q in queries]
+    chroma_sec = time.time() - start
+
+    start = time.time()
+    for q in queries:
+        engine.similarity_search_by_vector_with_relevance_scores(q, k=k)
+    numpy_sec = time.time() - start
+
+    start = time.time()
+    numpy_results = engine.batch_similarity_search_by_vectors(queries, k=k)
+    batch_sec = time.time() - start
+
+    overlap = [
+        len({doc.id for doc, _ in a} & {doc.id for doc, _ in b}) / max(len(a), 1)
+        for a, b in zip(chroma_results, numpy_results)
+    ]
+    result = {
+        'queries': len(queries),
+        'chroma_sec': chroma_sec,
+        'numpy_sec': numpy_sec,
+        'numpy_batch_sec': batch_sec,
+        'topk_overlap': float(np.mean(overlap)),
+    }
+    print(f"검색어 {len(queries)}개, k={k}, 문서 {len(engine)}개")
+    print(f"  Chroma (검색어별)  : {chroma_sec:.2f}초 ({chroma_sec / len(queries) * 1000:.1f} ms/검색어)")
+    print(f"  NumPy  (검색어별)  : {numpy_sec:.2f}초 ({numpy_sec / len(queries) * 1000:.1f} ms/검색어)")
+    print(f"  NumPy  (일괄)      : {batch_sec:.2f}초 ({batch_sec / len(queries) * 1000:.1f} ms/검색어)")
+    print(f"  top-{k} 일치율 (Chroma HNSW 대비): {result['topk_overlap']:.3f}")
+    return result
+
+
+def quantization_benchmark(index_dir: str, dtype: str = 'int8', n_queries: int = 200, k: int = 50,
+                           rescore_factor: int = RESCORE_FACTOR, seed: int = 0,
+                           persist_directory: str = None, collection_name: str = None) -> Dict[str, float]:
+    """
+    float32 정확 검색 대비 압축 색인(+재계산)의 recall@k, 최고 점수 차이, 검색 시간, 행렬 크기 비교
+
+    persist_directory / collection_name을 주면 같은 검색어로 Chroma(HNSW) 검색의 recall@k와 시간도 기준선으로 측정
+    """
+    exact = NumpyVectorStore(index_dir)
+    quant = NumpyVectorStore(index_dir, quantization=dtype, rescore_factor=rescore_factor)
+    queries = _sample_queries(exact, n_queries, seed)
+
+    chroma_hits = None
+    if persist_directory and collection_name:
+        from langchain_chroma import Chroma
+
+        chroma = Chroma(persist_directory=persist_directory, collection_name=collection_name)
+        start = time.time()
+        chroma_hits = [chroma.similarity_search_by_vector_with_relevance_scores(q, k=k) for q in queries]
+        chroma_sec = time.time() - start
+
+    start = time.time()
+    exact_hits = exact.search_rows(queries, k)
+    exact_sec = time.time() - start
+
+    start = time.time()
+    quant_hits = quant.search_rows(queries, k)
+    quant_sec = time.time() - start
+
+    recall = [len({r for r, _ in a} & {r for r, _ in b}) / max(len(a), 1) for a, b in zip(exact_hits, quant_hits)]
+    top1 = [a[0][0] == b[0][0] for a, b in zip(exact_hits, quant_hits) if a and b]
+    best_diff = [abs(a[0][1] - b[0][1]) for a, b in zip(exact_hits, quant_hits) if a and b]
+
+    full_bytes = exact.vectors.nbytes
+    quant_bytes = quant.q_vectors.nbytes + (quant.q_scales.nbytes if quant.q_scales is not None else 0)
+    result = {
+        'queries': len(queries),
+        'recall': float(np.mean(recall)),
+        'top1_agreement': float(np.mean(top1)) if top1 else 0.0,
+        'max_best_score_diff': float(np.max(best_diff)) if best_diff else 0.0,
+        'exact_sec': exact_sec,
+        'quant_sec': quant_sec,
+        'compression': full_bytes / max(quant_bytes, 1),
+    }
+    if chroma_hits is not None:
+        ids = exact._all_ids()
+        chroma_recall = [
+            len({ids[r] for r, _ in a} & {doc.id for doc, _ in b}) / max(len(a), 1)
+            for a, b in zip(exact_hits, chroma_hits)
+        ]
+        result['chroma_recall'] = float(np.mean(chroma_recall))
+        result['chroma_sec'] = chroma_sec
+    print(f"검색어 {len(queries)}개, k={k}, 문서 {len(exact)}개, {dtype} (후보 k × {rescore_factor})")
+    print(f"  행렬 크기: float32 {full_bytes / 2**20:.1f}MB → {dtype} {quant_bytes / 2**20:.1f}MB "
+          f"({result['compression']:.1f}배 압축)")
+    print(f"  검색 시간: float32 {exact_sec:.2f}초 / {dtype}+재계산 {quant_sec:.2f}초")
+    print(f"  recall@{k}: {result['recall']:.4f} | top-1 일치율: {result['top1_agreement']:.4f} "
+          f"| 최고 점수 최대 차이: {result['max_best_score_diff']:.2e}")
+    if chroma_hits is not None:
+        print(f"  Chroma 기준선: recall@{k} {result['chroma_recall']:.4f} | 검색 시간 {chroma_sec:.2f}초 "
+              f"({chroma_sec / len(queries) * 1000:.1f} ms/검색어, 검색어별)")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["build", "bench", "quantize", "bench-quant"])
+    parser.add_argument("persist_directory", help="Chroma 폴더 (예: ./chroma_db_parent)")
+    parser.add_argument("collection_name", help="컬렉션명 (예: patent_parent)")
+    parser.add_argument("index_dir", nargs="?", default=None, help="NumPy 색인 폴더 (기본: <Chroma 폴더>_npy)")
+    parser.add_argument("--queries", type=int, default=200, help="벤치마크 검색어 수")
+    parser.add_argument("-k", type=int, default=50, help="벤치마크 top-k")
+    parser.add_argument("--dtype", choices=QUANTIZATIONS, default="int8", help="압축 형식")
+    parser.add_argument("--rescore-factor", type=int, default=RESCORE_FACTOR, help="재계산 후보 배수")
+    args = parser.parse_args()
+    index_dir = args.index_dir or default_index_dir(args.persist_directory)
+
+    if args.command == "build":
+        count = build_vector_index(args.persist_directory, args.collection_name, index_dir)
+        print(f"✓ NumPy 벡터 색인 생성 완료: {index_dir} ({count}개 문서)")
+    elif args.command == "bench":
+        benchmark(args.persist_directory, args.collection_name, index_dir, args.queries, args.k)
+    elif args.command == "quantize":
+        size = quantize_vector_index(index_dir, args.dtype)
+        print(f"✓ {args.dtype} 압축 색인 생성 완료: {index_dir} ({size / 2**20:.1f}MB)")
+    else:
+        quantization_benchmark(index_dir, args.dtype, args.queries, args.k, args.rescore_factor,
+                               persist_directory=args.persist_directory, collection_name=args.collection_name)
@@ -4,17 +4,26 @@
 Step 1. 특허 json 파일 전처리 및 저장
 코드 실행시 child_documents.pkl, parent_documents.pkl 파일 생성됨.
 
-- child_documents.pkl: 청구항 단위의 Document 리스트 
+- child_documents.pkl: 청구항 단위의 Document 리스트
+  (메타데이터는 parent_id, claim_number, claim_type, source_type만 보관, 서지정보는 parent에서 결합)
 - parent_documents.pkl: 특허 문헌 단위, 전체 청구항 보관
+- parent_store.sqlite: parent_documents.pkl과 같은 내용, parent_id로 바로 조회 (검색 단계용)
+- keyword_index_claims.sqlite / keyword_index_parent.sqlite: 키워드 → 문서 역색인
+  (검색 시 매칭 문서가 없는 키워드 조합은 벡터 검색 없이 건너뜀)
+- metadata_index.npz: 등록 여부/등록 상태/IPC 비트맵 (검색 전에 조건에 맞는 특허로 범위 제한)
 
+JSON 파싱은 프로세스 풀에서 병렬로 수행하고, 결과는 청크 단위 pickle 프레임으로
+바로 저장됨 (읽을 때는 patent_store.load_child_documents / load_parent_documents 사용)
+
+    python step1_preprocess.py                 # CPU 수만큼 워커
+    python step1_preprocess.py --workers 1     # 순차 처리
+    python step1_preprocess.py --incremental   # 바뀐 파일만 다시 처리 (ingest_manifest.sqlite 기준)
 """
 
-import json
-import glob
+import argparse
 import os
-import pickle
-from typing import List, Dict
-from langchain_core.documents import Document
+from patent_store import run_ingestion, run_incremental_ingestion, iter_pickle_chunks, join_parent_metadata
+from patent_store.metadata_index import build_metadata_index
 
 
 # 1. 데이터 로드 및 전처리
@@ -22,255 +31,101 @@ from langchain_core.documents import Document
 # json 파일이 들어있는 경로 설정
 patent_paths = [r"data\json_refine"]
 
-# Child Documents (Vector Store용 - 청구항들)
-child_docs = []
-
-# Parent Documents (Document Store용 - 전체 특허 정보)
-parent_docs = {}
-
-# json -> Document 변환
-# 각 경로 순회
-for path in patent_paths:
-    print(f"처리 중인 경로: {path}")
-    
-    for file_path in glob.glob(os.path.join(path, "**", "*.json"), recursive=True):
-        try:
-            # JSON 로드
-            with open(file_path, "r", encoding="utf-8") as f:
-                raw_patent = json.load(f)
-            
-            # Bibliographic 정보 추출
-            biblio = raw_patent.get('biblioSummaryInfoArray', {}).get('biblioSummaryInfo', {})
-            
-            # IPC 코드 추출
-            ipc_list = raw_patent.get('ipcInfoArray', {}).get('ipcInfo', [])
-            if isinstance(ipc_list, dict):
-                ipc_list = [ipc_list]
-            elif not isinstance(ipc_list, list):
-                ipc_list = []
-            ipc_codes = [ipc.get('ipcNumber', '') for ipc in ipc_list]
-            
-            # 초록 추출
-            abstract = raw_patent.get('abstractInfoArray', {}).get('abstractInfo', {}).get('astrtCont', '')
-            
-            # Claims 추출
-            claims_data = raw_patent.get('claims', {})
-
-            # 공개청구항 
-            open_claims = claims_data.get('first_version', {}).get('claims', [])
-
-            # (status=등록) 등록청구항 / (status=공개) 가장 마지막 변동이력인 공개청구항
-            register_claims = claims_data.get('last_version', {}).get('claims', [])
-
-            #변동이력
-            total_amendments = claims_data.get('total_amendments', '')
-            
-            # 기본 정보
-            app_number = biblio.get('applicationNumber', '') # 출원번호
-            title = biblio.get('inventionTitle', '') # 특허명
-            
-            if not app_number:
-                continue
-            
-            # ============================================
-            # Child Documents 생성 (각 청구항)
-            # ============================================
-
-            # 등록번호 확인
-            register_number = biblio.get('registerNumber', '')
-            
-            # last_version 청구항 저장
-            for claim in register_claims:
-
-                # 문서 내용: 청구항 
-                page_content = claim.get('text', '')
-                
-                if not page_content.strip():
-                    continue
-                
-                # 메타데이터 구성
-                metadata = {
-
-                    'parent_id': app_number, # 출원번호(부모 문서 ID)
-                    'claim_number': claim.get('claim_number'), # 청구항 번호
-                    'claim_type': claim.get('claim_type', ''), # 청구항 유형 (독립항/종속항)
-                    'total_amendments': total_amendments, # 변동이력
-
-                    # 서지정보
-                    'application_number': app_number, # 출원번호
-                    'open_number': biblio.get('openNumber', ''), # 공개번호
-                    'register_number': register_number, # 등록번호
-                    'title': title, # 특허명
-                    'title_eng': biblio.get('inventionTitleEng', ''), # 영문 특허명'
-                    'application_date': biblio.get('applicationDate', ''), # 출원일
-                    'open_date': biblio.get('openDate', ''), # 공개일
-                    'register_date': biblio.get('registerDate', ''), # 등록일
-                    'register_status': biblio.get('registerStatus', ''), # 등록상태
-                    'ipc_codes': ','.join(ipc_codes), # IPC 코드들
-                    'abstract': abstract, # 초록
-
-                    #기존 메타데이터에 source_type 추가
-                    'source_type' : 'last_version', # 문서 유형: 마지막 변동
-                }
-                
-                child_docs.append(Document(
-                    page_content=page_content,
-                    metadata=metadata
-                ))
-
-
-            # first_version 청구항 저장 (등록번호가 있는 경우만)
-            if register_number:
-                for claim in open_claims:
-
-                    # 문서 내용: 청구항 
-                    page_content = claim.get('text', '')
-                    
-                    if not page_content.strip():
-                        continue
-                    
-                    # 메타데이터 구성
-                    metadata = {
-
-                        'parent_id': app_number, # 출원번호(부모 문서 ID)
-                        'claim_number': claim.get('claim_number'), # 청구항 번호
-                        'claim_type': claim.get('claim_type', ''), # 청구항 유형 (독립항/종속항)
-                        'total_amendments': total_amendments, # 변동이력
-
-                        # 서지정보
-                        'application_number': app_number, # 출원번호
-                        'open_number': biblio.get('openNumber', ''), # 공개번호
-                        'register_number': register_number, # 등록번호
-                        'title': title, # 특허명
-                        'title_eng': biblio.get('inventionTitleEng', ''), # 영문 특허명'
-                        'application_date': biblio.get('applicationDate', ''), # 출원일
-                        'open_date': biblio.get('openDate', ''), # 공개일
-                        'register_date': biblio.get('registerDate', ''), # 등록일
-                        'register_status': biblio.get('registerStatus', ''), # 등록상태
-                        'ipc_codes': ','.join(ipc_codes), # IPC 코드들
-                        'abstract': abstract, # 초록
-
-                        # 기존에 없던 항목
-                        'source_type' : 'first_version', # 문서 유형: 최초 변동
-
-                    }
-                    
-                    child_docs.append(Document(
-                        page_content=page_content,
-                        metadata=metadata
-                    ))
-            
-
-            
-            # ============================================
-            # Parent Document 생성 (전체 특허)
-            # ============================================
-           
-            # 필요한 필드(claim_number, claim_type, text, source_type)만 추출
-            all_claims = []
-            
-            # last_version 청구항 (등록/공개 청구항)
-            for claim in register_claims:
-                all_claims.append({
-                    'claim_number': claim.get('claim_number'),
-                    'claim_type': claim.get('claim_type', ''),
-                    'text': claim.get('text', ''),
-                    'source_type': 'last_version'
-                })
-            
-            # first_version 청구항 (등록특허인 경우만)
-            if register_number:
-                for claim in open_claims:
-                    all_claims.append({
-                        'claim_number': claim.get('claim_number'),
-                        'claim_type': claim.get('claim_type', ''),
-                        'text': claim.get('text', ''),
-                        'source_type': 'first_version'
-                    })
-            
-            parent_docs[app_number] = {
-                'parent_id': app_number,
-                'title': title,
-                'application_number': app_number,
-                'open_number': biblio.get('openNumber', ''),
-                'register_number': register_number,
-                'application_date': biblio.get('applicationDate', ''),
-                'open_date': biblio.get('openDate', ''),
-                'register_date': biblio.get('registerDate', ''),
-                'register_status': biblio.get('registerStatus', ''),
-                'ipc_codes': ipc_codes,
-                'abstract': abstract,
-                'all_claims': all_claims, # 모든 청구항 정보 (source_type 포함)
-                'claim_count': len(all_claims)
-            }
-            
-        except Exception as e:
-            print(f"오류 발생 ({file_path}): {e}")
-            continue
-
-print(f"\n총 {len(child_docs)}개의 청구항 문서 생성")
-print(f"총 {len(parent_docs)}개의 특허 문헌 저장")
-
-
-# ============================================
-# 문서 저장
-# ============================================
-
-# Child Documents 저장
-with open('child_documents.pkl', 'wb') as f:
-    pickle.dump(child_docs, f)
-print(f"✓ Child Documents 저장 완료: child_documents.pkl")
-
-# Parent Documents 저장
-with open('parent_documents.pkl', 'wb') as f:
-    pickle.dump(parent_docs, f)
-print(f"✓ Parent Documents 저장 완료: parent_documents.pkl")
-
-
-# ============================================
-# 잘만들어졌는지 확인
-# ============================================
-
-# Child Documents 로드
-with open('child_documents.pkl', 'rb') as f:
-    child_docs = pickle.load(f)
-print(f"✓ Child Documents 로드 완료: child_documents.pkl")
-
-# Parent Documents 로드
-with open('parent_documents.pkl', 'rb') as f:
-    parent_docs = pickle.load(f)
-print(f"✓ Parent Documents 로드 완료: parent_documents.pkl")
-
-print("\n" + "="*50)
-print("Child Document 샘플 (청구항)")
-print("="*50)
-
-for i in range(min(3, len(child_docs))):
-    doc = child_docs[i]
-    print(f"\n[청구항 {i+1}]")
-    print(f"내용: {doc.page_content[:150]}...")
-    print(f"특허명: {doc.metadata['title']}")
-    print(f"출원번호: {doc.metadata['application_number']}")
-    print(f"출원일자: {doc.metadata['application_date']}")
-    print(f"공개번호: {doc.metadata['open_number']}")
-    print(f"등록번호: {doc.metadata['register_number']}")
-    print(f"등록상태: {doc.metadata['register_status']}")
-    print(f"청구항 번호: {doc.metadata['claim_number']} ({doc.metadata['claim_type']})")   
-    print(f"변동이력: {doc.metadata['total_amendments']}")
-    print(f"소스 유형: {doc.metadata['source_type']}")
-
-print("\n" + "="*50)
-print("Parent Document 샘플 (전체 특허)")
-print("="*50)
 
-for i, (parent_id, parent) in enumerate(list(parent_docs.items())[:1]):
-    print(f"\n[특허 {i+1}]")
-    print(f"출원번호: {parent['parent_id']}")
-    print(f"출원일자: {parent['application_date']}")
-    print(f"공개번호: {parent['open_number']}")
-    print(f"등록번호: {parent['register_number']}")
-    print(f"등록상태: {parent['register_status']}")
-    print(f"특허명: {parent['title']}")
-    print(f"모든 청구항 텍스트: {parent['all_claims']}")
-    print(f"청구항 수: {parent['claim_count']}")
-    print(f"IPC 코드: {', '.join(parent['ipc_codes'][:3])}")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="워커 프로세스 수 (1이면 순차 처리)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="pickle 청크당 레코드 수")
+    parser.add_argument("--incremental", action="store_true", help="매니페스트 기준으로 신규/변경/삭제 파일만 반영")
+    args = parser.parse_args()
+
+    # json -> Document 변환 (프로세스 풀 병렬 파싱, 청크 단위로 바로 저장)
+    for path in patent_paths:
+        print(f"처리 중인 경로: {path}")
+
+    if args.incremental:
+        stats = run_incremental_ingestion(
+            patent_paths,
+            child_path='child_documents.pkl',
+            parent_path='parent_documents.pkl',
+            manifest_path='ingest_manifest.sqlite',
+            parent_store_path='parent_store.sqlite',
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            claim_index_path='keyword_index_claims.sqlite',
+            parent_index_path='keyword_index_parent.sqlite',
+        )
+        print(f"\n변경/신규 {stats['parsed']}개 파일 재처리, 삭제 {stats['removed']}건")
+        print("→ step2_build_vectordb*.py --incremental 로 벡터 DB에 반영하세요")
+    else:
+        # 전체 처리 시 매니페스트도 새로 생성 (이후 --incremental의 기준)
+        stats = run_ingestion(
+            patent_paths,
+            child_path='child_documents.pkl',
+            parent_path='parent_documents.pkl',
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            manifest_path='ingest_manifest.sqlite',
+            parent_store_path='parent_store.sqlite',
+            claim_index_path='keyword_index_claims.sqlite',
+            parent_index_path='keyword_index_parent.sqlite',
+        )
+
+    # 메타데이터 색인은 Parent Store 전체에서 다시 만듦 (증분 실행 후에도 최신 상태 유지)
+    metadata_count = build_metadata_index('parent_store.sqlite', 'metadata_index.npz')
+
+    print(f"\n총 {stats['child_count']}개의 청구항 문서 생성")
+    print(f"총 {stats['parent_count']}개의 특허 문헌 저장")
+    print(f"오류 파일: {stats['errors']}개")
+    print(f"소요 시간: {stats['elapsed']:.1f}초 ({stats['files'] / max(stats['elapsed'], 1e-9):.1f} files/sec)")
+    print(f"✓ Child Documents 저장 완료: child_documents.pkl")
+    print(f"✓ Parent Documents 저장 완료: parent_documents.pkl")
+    print(f"✓ Parent Store 저장 완료: parent_store.sqlite")
+    print(f"✓ 키워드 색인 저장 완료: keyword_index_claims.sqlite, keyword_index_parent.sqlite")
+    print(f"✓ 메타데이터 색인 저장 완료: metadata_index.npz ({metadata_count}개 특허)")
+
+    # ============================================
+    # 잘만들어졌는지 확인
+    # ============================================
+
+    # Child Documents는 첫 청크만 로드 (전체를 메모리에 올리지 않음)
+    child_docs = next(iter_pickle_chunks('child_documents.pkl'), [])
+    print(f"✓ Child Documents 로드 완료: child_documents.pkl")
+
+    # Parent Documents도 첫 청크만 로드
+    parent_docs = next(iter_pickle_chunks('parent_documents.pkl'), {})
+    print(f"✓ Parent Documents 로드 완료: parent_documents.pkl")
+
+    print("\n" + "="*50)
+    print("Child Document 샘플 (청구항)")
+    print("="*50)
+
+    for i, doc in enumerate(child_docs[:3]):
+        metadata = join_parent_metadata(doc.metadata, parent_docs)
+        print(f"\n[청구항 {i+1}]")
+        print(f"내용: {doc.page_content[:150]}...")
+        print(f"특허명: {metadata['title']}")
+        print(f"출원번호: {metadata['application_number']}")
+        print(f"출원일자: {metadata['application_date']}")
+        print(f"공개번호: {metadata['open_number']}")
+        print(f"등록번호: {metadata['register_number']}")
+        print(f"등록상태: {metadata['register_status']}")
+        print(f"청구항 번호: {metadata['claim_number']} ({metadata['claim_type']})")
+        print(f"변동이력: {metadata['total_amendments']}")
+        print(f"소스 유형: {metadata['source_type']}")
+
+    print("\n" + "="*50)
+    print("Parent Document 샘플 (전체 특허)")
+    print("="*50)
+
+    for i, (parent_id, parent) in enumerate(list(parent_docs.items())[:1]):
+        print(f"\n[특허 {i+1}]")
+        print(f"출원번호: {parent['parent_id']}")
+        print(f"출원일자: {parent['application_date']}")
+        print(f"공개번호: {parent['open_number']}")
+        print(f"등록번호: {parent['register_number']}")
+        print(f"등록상태: {parent['register_status']}")
+        print(f"특허명: {parent['title']}")
+        print(f"모든 청구항 텍스트: {parent['all_claims']}")
+        print(f"청구항 수: {parent['claim_count']}")
+        print(f"IPC 코드: {', '.join(parent['ipc_codes'][:3])}")
@@ -2,10 +2,23 @@
 Step 2. 청구항 문서(Child Documents) 벡터 DB 저장
 
 파일 실행시 chromadb/ 폴더(벡터 DB) 생성됨.
+청구항 ID는 {출원번호}_{source_type}_{청구항번호} (patent_store.make_chunk_id)
+
+    python step2_build_vectordb.py                 # 전체
+    python step2_build_vectordb.py --incremental   # step1 --incremental 이후 변경분만 / 중단 후 이어하기
+    python step2_build_vectordb.py --tpm 1000000 --concurrency 4
+
+임베딩 서버 대신 로컬 가짜 서버로 시험: patent_store/fake_embedding_server.py 참고
 """
 import os
-import time
-import pickle
+import argparse
+from patent_store import (
+    IngestManifest, iter_pickle_chunks, load_child_documents, make_chunk_id, CLAIMS_COLLECTION,
+    dedupe_by_id, delete_ids, delete_stale_ids,
+)
+from patent_store.embedding_cache import CachedEmbeddings
+from patent_store.embedding import EmbeddingScheduler, EMBED_TPM_LIMIT, EMBED_MAX_IN_FLIGHT
+from patent_store.vector_index import refresh_vector_index
 from langchain_openai import OpenAIEmbeddings
 from langchain_chroma import Chroma
 from dotenv import load_dotenv
@@ -14,20 +27,41 @@ api_key = os.environ.get('OPENAI_API_KEY')
 if not api_key:
     raise ValueError('OPENAI_API_KEY not set')
 
+parser = argparse.ArgumentParser()
+parser.add_argument("--incremental", action="store_true",
+                    help="ingest_manifest.sqlite의 pending 작업(신규/변경 upsert, 삭제)만 반영 (중단된 실행 이어하기 포함)")
+parser.add_argument("--tpm", type=int, default=EMBED_TPM_LIMIT, help="분당 임베딩 토큰 한도")
+parser.add_argument("--concurrency", type=int, default=EMBED_MAX_IN_FLIGHT, help="동시에 실행할 배치 수")
+args = parser.parse_args()
+
 # ============================================
 # 저장된 문서 로드
 # ============================================
 
 print("문서 로드 중...")
 
-with open('child_documents.pkl', 'rb') as f:
-    child_docs = pickle.load(f)
-
-with open('parent_documents.pkl', 'rb') as f:
-    parent_docs = pickle.load(f)
+manifest = IngestManifest('ingest_manifest.sqlite')
+pending = manifest.pending(CLAIMS_COLLECTION)
+
+if args.incremental:
+    # 신규/변경 특허의 청구항만 골라서 로드
+    child_docs = [
+        doc
+        for chunk in iter_pickle_chunks('child_documents.pkl')
+        for doc in chunk
+        if make_chunk_id(doc.metadata) in pending['upsert']
+    ]
+    print(f"✓ 증분 모드: upsert {len(child_docs)}개 / delete {len(pending['delete'])}개")
+else:
+    child_docs = load_child_documents('child_documents.pkl')
+
+# 같은 chunk_id가 두 번 있으면 Chroma upsert가 배치째 실패하므로 마지막 것만 남김
+loaded = len(child_docs)
+child_docs = dedupe_by_id(child_docs, lambda doc: make_chunk_id(doc.metadata))
+if len(child_docs) < loaded:
+    print(f"⚠️ 중복 chunk_id {loaded - len(child_docs)}개 제외 (마지막 청구항만 사용)")
 
 print(f"✓ Child Documents 로드완: {len(child_docs)}개")
-print(f"✓ Parent Documents 로드완: {len(parent_docs)}개")
 
 
 # ============================================
@@ -35,11 +69,12 @@ print(f"✓ Parent Documents 로드완: {len(parent_docs)}개")
 # 추후 변경 가능
 # ============================================
 
-embeddings = OpenAIEmbeddings(
+# 임베딩 캐시: 같은 텍스트는 다시 임베딩하지 않음 (embedding_cache.sqlite)
+embeddings = CachedEmbeddings(OpenAIEmbeddings(
     model="text-embedding-3-small",
-    openai_api_key=api_key  )
+    openai_api_key=api_key  ))
 
-print("✓ OpenAI Embeddings 준비 완료!")
+print(f"✓ OpenAI Embeddings 준비 완료! (캐시 {len(embeddings.cache)}개)")
 
 
 # ============================================
@@ -49,48 +84,47 @@ print("✓ OpenAI Embeddings 준비 완료!")
 print("\nVector Store 구축 중!")
 print("wait a moment ~")
 
+vectorstore = Chroma(
+    persist_directory="./chroma_db",#벡터db 저장 위치
+    embedding_function=embeddings,
+    collection_name=CLAIMS_COLLECTION #컬렉션 이름
+)
+
+# 삭제/변경된 특허의 이전 청구항 제거
+if args.incremental and pending['delete']:
+    deleted = delete_ids(vectorstore, pending['delete'])
+    manifest.clear_pending(CLAIMS_COLLECTION, pending['delete'])
+    print(f"✓ 이전 청구항 삭제 완료: {deleted}개")
+
+# 전체 실행: 원본(child_documents.pkl)에서 빠진 청구항 제거 (upsert만으로는 계속 검색됨)
+if not args.incremental:
+    deleted = delete_stale_ids(vectorstore, {make_chunk_id(doc.metadata) for doc in child_docs})
+    print(f"✓ 원본에 없는 청구항 삭제 완료: {deleted}개")
+
 # 배치 크기 설정 (토큰 제한 고려)
 BATCH_SIZE = 1000 #한번에 처리할 문서 개수
 
-first_batch = child_docs[:BATCH_SIZE]
 
-vectorstore = Chroma.from_documents(
-    documents=first_batch,
-    embedding=embeddings,
-    persist_directory="./chroma_db",#벡터db 저장 위치
-    collection_name="patent_claims" #컬렉션 이름
-)
+def add_batch(batch):
+    """chunk_id를 ID로 upsert (같은 청구항은 덮어씀)"""
+    vectorstore.add_documents(batch, ids=[make_chunk_id(doc.metadata) for doc in batch])
+
+
+def commit_batch(batch):
+    """반영된 배치는 pending에서 제거 (중단 후 --incremental로 이어서 실행)"""
+    manifest.clear_pending(CLAIMS_COLLECTION, [make_chunk_id(doc.metadata) for doc in batch])
+
+
+# 여러 배치를 동시에 임베딩 (분당 토큰 예산 + 429 백오프)
+scheduler = EmbeddingScheduler(tpm_limit=args.tpm, max_in_flight=args.concurrency)
+scheduler.run(child_docs, add_batch, batch_size=BATCH_SIZE, on_committed=commit_batch)
+
+manifest.close()
 
-print(f"✓ 첫 번째 배치 완료!: {len(first_batch)}개 문서")
-
-#나머지 문서들을 배치로 추가
-remaining_docs = child_docs[BATCH_SIZE:]
-total_batches = len(remaining_docs) // BATCH_SIZE + (1 if len(remaining_docs) % BATCH_SIZE > 0 else 0)
-
-
-for i in range(0, len(remaining_docs), BATCH_SIZE):
-    batch_num = i // BATCH_SIZE + 2  # 첫 번째 배치 다음부터
-    batch = remaining_docs[i:i + BATCH_SIZE]
-    
-    print(f"배치 {batch_num}/{total_batches + 1} 처리 중... ({len(batch)}개 문서)")
-    
-    try:
-        vectorstore.add_documents(batch)
-        print(f"배치 {batch_num} 완료!")
-        
-        # API 호출 제한 방지를 위한 잠시 대기
-        time.sleep(1)
-        
-    except Exception as e:
-        print(f"배치 {batch_num} 에러: {e}")
-        # 에러 발생 시 더 작은 배치로 재시도
-        smaller_batches = [batch[j:j+20] for j in range(0, len(batch), 20)]
-        for small_batch in smaller_batches:
-            try:
-                vectorstore.add_documents(small_batch)
-                time.sleep(0.5)
-            except Exception as small_e:
-                print(f"소 배치 에러: {small_e}")
+# NumPy 검색 색인(chroma_db_npy/)이 있으면 바뀐 컬렉션으로 다시 내보냄 (VECTOR_BACKEND=numpy용)
+refreshed = refresh_vector_index("./chroma_db", CLAIMS_COLLECTION)
+if refreshed is not None:
+    print(f"✓ NumPy 벡터 색인 갱신 완료: {refreshed}개 문서")
 
 print("벡터스토어 생성 완료!")
 print(f"저장 경로: ./chroma_db")
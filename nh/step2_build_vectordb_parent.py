@@ -2,11 +2,20 @@
 Step 2-2. 특허 문헌(Parent Documents) 벡터 DB 저장
 
 parent_documents.pkl에서 특허별 전체 청구항을 하나의 문서로 합쳐서
-chroma_db_parent/ 폴더에 벡터 DB를 생성함.
+chroma_db_parent/ 폴더에 벡터 DB를 생성함. (문서 ID = 출원번호)
+
+    python step2_build_vectordb_parent.py                 # 전체
+    python step2_build_vectordb_parent.py --incremental   # step1 --incremental 이후 변경분만 / 중단 후 이어하기
 """
 import os
-import time
-import pickle
+import argparse
+from patent_store import (
+    IngestManifest, iter_pickle_chunks, build_parent_page_content, PARENT_COLLECTION,
+    dedupe_by_id, delete_ids, delete_stale_ids,
+)
+from patent_store.embedding_cache import CachedEmbeddings
+from patent_store.embedding import EmbeddingScheduler, EMBED_TPM_LIMIT, EMBED_MAX_IN_FLIGHT
+from patent_store.vector_index import refresh_vector_index
 from langchain_openai import OpenAIEmbeddings
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
@@ -16,15 +25,31 @@ api_key = os.environ.get('OPENAI_API_KEY')
 if not api_key:
     raise ValueError('OPENAI_API_KEY not set')
 
+parser = argparse.ArgumentParser()
+parser.add_argument("--incremental", action="store_true",
+                    help="ingest_manifest.sqlite의 pending 작업(신규/변경 upsert, 삭제)만 반영 (중단된 실행 이어하기 포함)")
+parser.add_argument("--tpm", type=int, default=EMBED_TPM_LIMIT, help="분당 임베딩 토큰 한도")
+parser.add_argument("--concurrency", type=int, default=EMBED_MAX_IN_FLIGHT, help="동시에 실행할 배치 수")
+args = parser.parse_args()
+
 # ============================================
 # 저장된 문서 로드
 # ============================================
 
 print("문서 로드 중...")
 
-with open('parent_documents.pkl', 'rb') as f:
-    parent_docs = pickle.load(f)
+manifest = IngestManifest('ingest_manifest.sqlite')
+pending = manifest.pending(PARENT_COLLECTION)
+
+# 청크 단위로 읽으면서 필요한 특허만 남김 (증분 모드는 pending upsert 대상만)
+parent_docs = {}
+for chunk in iter_pickle_chunks('parent_documents.pkl'):
+    for app_number, patent in chunk.items():
+        if not args.incremental or app_number in pending['upsert']:
+            parent_docs[app_number] = patent
 
+if args.incremental:
+    print(f"✓ 증분 모드: upsert {len(parent_docs)}개 / delete {len(pending['delete'])}개")
 print(f"✓ Parent Documents 로드완: {len(parent_docs)}개")
 
 # ============================================
@@ -34,22 +59,16 @@ print(f"✓ Parent Documents 로드완: {len(parent_docs)}개")
 print("\nParent Documents → Document 변환 중...")
 
 parent_doc_list = []
+empty_ids = []
 
 for app_number, patent in parent_docs.items():
-    # 전체 청구항 텍스트를 하나로 합침
-    claim_texts = []
-    for claim in patent.get('all_claims', []):
-        text = claim.get('text', '').strip()
-        if text:
-            claim_num = claim.get('claim_number', '')
-            claim_type = claim.get('claim_type', '')
-            source_type = claim.get('source_type', '')
-            claim_texts.append(f"[청구항 {claim_num}] ({claim_type}/{source_type}) {text}")
-
-    if not claim_texts:
-        continue
+    # 전체 청구항 텍스트를 하나로 합침 (키워드 색인과 같은 본문)
+    page_content = build_parent_page_content(patent)
 
-    page_content = "\n\n".join(claim_texts)
+    if not page_content:
+        # 청구항 텍스트가 없는 특허는 벡터 DB에 넣지 않음 (이전 버전이 있으면 아래에서 삭제)
+        empty_ids.append(app_number)
+        continue
 
     # 메타데이터 (ChromaDB는 str, int, float, bool만 허용)
     metadata = {
@@ -75,17 +94,24 @@ for app_number, patent in parent_docs.items():
         metadata=metadata
     ))
 
+# 같은 parent_id가 두 번 있으면 Chroma upsert가 배치째 실패하므로 마지막 것만 남김
+converted = len(parent_doc_list)
+parent_doc_list = dedupe_by_id(parent_doc_list, lambda doc: doc.metadata['parent_id'])
+if len(parent_doc_list) < converted:
+    print(f"⚠️ 중복 parent_id {converted - len(parent_doc_list)}개 제외 (마지막 특허만 사용)")
+
 print(f"✓ 변환 완료: {len(parent_doc_list)}개 문서")
 
 # ============================================
 # 임베딩 모델 : OpenAIEmbeddings
 # ============================================
 
-embeddings = OpenAIEmbeddings(
+# 임베딩 캐시: 같은 텍스트는 다시 임베딩하지 않음 (embedding_cache.sqlite)
+embeddings = CachedEmbeddings(OpenAIEmbeddings(
     model="text-embedding-3-small",
-    openai_api_key=api_key)
+    openai_api_key=api_key))
 
-print("✓ OpenAI Embeddings 준비 완료!")
+print(f"✓ OpenAI Embeddings 준비 완료! (캐시 {len(embeddings.cache)}개)")
 
 # ============================================
 # Chroma Vector Store 구축
@@ -94,43 +120,52 @@ print("✓ OpenAI Embeddings 준비 완료!")
 print("\nParent Vector Store 구축 중!")
 print("wait a moment ~")
 
+vectorstore = Chroma(
+    persist_directory="./chroma_db_parent",
+    embedding_function=embeddings,
+    collection_name=PARENT_COLLECTION
+)
+
+# 삭제/변경된 특허 제거 (변경된 특허는 아래에서 같은 ID로 다시 upsert됨)
+if args.incremental and pending['delete']:
+    deleted = delete_ids(vectorstore, pending['delete'])
+    manifest.clear_pending(PARENT_COLLECTION, pending['delete'])
+    print(f"✓ 특허 삭제 완료: {deleted}개")
+
+# 청구항이 모두 사라진 특허는 이전 버전 삭제 후 pending에서 제거
+if empty_ids:
+    if args.incremental:
+        delete_ids(vectorstore, empty_ids)
+    manifest.clear_pending(PARENT_COLLECTION, empty_ids)
+
+# 전체 실행: 원본(parent_documents.pkl)에서 빠진 특허 제거 (upsert만으로는 계속 검색됨)
+if not args.incremental:
+    deleted = delete_stale_ids(vectorstore, {doc.metadata['parent_id'] for doc in parent_doc_list})
+    print(f"✓ 원본에 없는 특허 삭제 완료: {deleted}개")
+
 BATCH_SIZE = 500
 
-first_batch = parent_doc_list[:BATCH_SIZE]
 
-vectorstore = Chroma.from_documents(
-    documents=first_batch,
-    embedding=embeddings,
-    persist_directory="./chroma_db_parent",
-    collection_name="patent_parent"
-)
+def add_batch(batch):
+    """출원번호를 ID로 upsert"""
+    vectorstore.add_documents(batch, ids=[doc.metadata['parent_id'] for doc in batch])
 
-print(f"✓ 첫 번째 배치 완료!: {len(first_batch)}개 문서")
 
-# 나머지 문서들을 배치로 추가
-remaining_docs = parent_doc_list[BATCH_SIZE:]
-total_batches = len(remaining_docs) // BATCH_SIZE + (1 if len(remaining_docs) % BATCH_SIZE > 0 else 0)
+def commit_batch(batch):
+    """반영된 배치는 pending에서 제거 (중단 후 --incremental로 이어서 실행)"""
+    manifest.clear_pending(PARENT_COLLECTION, [doc.metadata['parent_id'] for doc in batch])
 
-for i in range(0, len(remaining_docs), BATCH_SIZE):
-    batch_num = i // BATCH_SIZE + 2
-    batch = remaining_docs[i:i + BATCH_SIZE]
 
-    print(f"배치 {batch_num}/{total_batches + 1} 처리 중... ({len(batch)}개 문서)")
+# 여러 배치를 동시에 임베딩 (분당 토큰 예산 + 429 백오프)
+scheduler = EmbeddingScheduler(tpm_limit=args.tpm, max_in_flight=args.concurrency)
+scheduler.run(parent_doc_list, add_batch, batch_size=BATCH_SIZE, on_committed=commit_batch)
 
-    try:
-        vectorstore.add_documents(batch)
-        print(f"배치 {batch_num} 완료!")
-        time.sleep(1)
+manifest.close()
 
-    except Exception as e:
-        print(f"배치 {batch_num} 에러: {e}")
-        smaller_batches = [batch[j:j+20] for j in range(0, len(batch), 20)]
-        for small_batch in smaller_batches:
-            try:
-                vectorstore.add_documents(small_batch)
-                time.sleep(0.5)
-            except Exception as small_e:
-                print(f"소 배치 에러: {small_e}")
+# NumPy 검색 색인(chroma_db_parent_npy/)이 있으면 바뀐 컬렉션으로 다시 내보냄 (VECTOR_BACKEND=numpy용)
+refreshed = refresh_vector_index("./chroma_db_parent", PARENT_COLLECTION)
+if refreshed is not None:
+    print(f"✓ NumPy 벡터 색인 갱신 완료: {refreshed}개 문서")
 
 # ============================================
 print("\n" + "="*50)
@@ -10,7 +10,8 @@ Step3. 벡터 DB 검색 테스트
 
 """
 
-import pickle
+from patent_store import ParentStore
+from patent_store.embedding_cache import CachedEmbeddings
 import os
 import sys
 from datetime import datetime
@@ -55,7 +56,7 @@ api_key = os.environ.get('OPENAI_API_KEY')
 if not api_key:
     raise ValueError('OPENAI_API_KEY not set')
 
-embeddings = OpenAIEmbeddings(model="text-embedding-3-small", openai_api_key=api_key)
+embeddings = CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-3-small", openai_api_key=api_key))  # 반복 검색어는 캐시에서
 
 # Vector Store 로드
 vectorstore = Chroma(
@@ -64,9 +65,8 @@ vectorstore = Chroma(
     collection_name="patent_claims" #저장시 설정한 컬렉션명
 )
 
-# Parent Store 로드
-with open('parent_documents.pkl', 'rb') as f:
-    parent_store = pickle.load(f)
+# Parent Store 로드 (SQLite, 검색 결과 특허만 조회)
+parent_store = ParentStore('parent_store.sqlite')
 
 print(f"✓ Vector Store 로드 완료")
 print(f"✓ Parent Store 로드 완료: {len(parent_store)}개 특허")
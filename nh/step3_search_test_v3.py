@@ -2,21 +2,22 @@
 Step3. 벡터 DB 검색 테스트 (v3 - Gemini 2.0 Flash + Parent DB)
 
 1. 사용자 질문 입력
-2. 구성요소 추출 (Gemini 2.0 Flash)
-3. 검색어 조합 생성 (Gemini 2.0 Flash)
+2. 구성요소 추출 + 성분/용도 분류 (Gemini 2.0 Flash, 1회 호출)
+3. 검색어 조합 생성
 4. 모든 조합 검색 실행
 5. 결과 출력
 
 변경점 (v2 대비): LLM을 GPT-4o → Gemini 2.0 Flash로 변경
 """
 
-import pickle
+from patent_store import ParentStore, KeywordIndex
+from patent_store.embedding_cache import CachedEmbeddings
+from patent_store.vector_index import load_vectorstore
 import os
 import sys
 import time
 from datetime import datetime
 from langchain_openai import OpenAIEmbeddings
-from langchain_chroma import Chroma
 from dotenv import load_dotenv
 
 
@@ -44,7 +45,7 @@ class TeeLogger:
 log_filename = f"log/search_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
 sys.stdout = TeeLogger(log_filename)
 from utils_v3 import (
-    extract_components,
+    extract_structured_components,
     create_search_queries_from_components,
     search_patents_with_multiple_queries
 )
@@ -62,18 +63,24 @@ if not google_api_key:
     raise ValueError('GOOGLE_API_KEY not set (Gemini LLM에 필요)')
 
 # 임베딩은 기존 OpenAI 유지 (벡터 DB 호환)
-embeddings = OpenAIEmbeddings(model="text-embedding-3-small", openai_api_key=openai_api_key)
+embeddings = CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-3-small", openai_api_key=openai_api_key))  # 반복 검색어는 캐시에서
 
 # Vector Store 로드 (Parent DB)
-vectorstore = Chroma(
+# VECTOR_BACKEND=numpy 이면 NumPy 색인 사용 (python -m patent_store.vector_index build ./chroma_db_parent patent_parent)
+# VECTOR_QUANTIZATION=int8|float16 이면 압축 색인으로 후보 검색 후 float32로 재계산
+vectorstore = load_vectorstore(
+    os.environ.get('VECTOR_BACKEND', 'chroma'),
     persist_directory="./chroma_db_parent",
+    collection_name="patent_parent",
     embedding_function=embeddings,
-    collection_name="patent_parent"
+    quantization=os.environ.get('VECTOR_QUANTIZATION') or None
 )
 
-# Parent Store 로드
-with open('parent_documents.pkl', 'rb') as f:
-    parent_store = pickle.load(f)
+# Parent Store 로드 (SQLite, 검색 결과 특허만 조회)
+parent_store = ParentStore('parent_store.sqlite')
+
+# 키워드 역색인 (Parent DB와 같은 본문, 없으면 Chroma $contains만 사용)
+keyword_index = KeywordIndex('keyword_index_parent.sqlite') if os.path.exists('keyword_index_parent.sqlite') else None
 
 print(f"✓ Vector Store (Parent DB) 로드 완료")
 print(f"✓ Parent Store 로드 완료: {len(parent_store)}개 특허")
@@ -90,17 +97,18 @@ query = "글리세린, 히알루론산, 우뭇가사리로 마스크 팩을 만
 
 # Step 1: 구성요소 추출
 print(f"{'='*80}")
-print("Step 1: 구성요소 추출 (Gemini 2.0 Flash)")
+print("Step 1: 구성요소 추출 + 성분/용도 분류 (Gemini 2.0 Flash, 1회 호출)")
 print(f"{'='*80}\n")
 
-components = extract_components(query, llm)
+structured_components = extract_structured_components(query, llm)
+components = structured_components['components']
 print("추출된 구성 요소:")
 print(components)
 print()
 
 # Step 2: 검색어 조합 생성
 print(f"{'='*80}")
-print("Step 2: 검색어 조합 생성 (Gemini 2.0 Flash)")
+print("Step 2: 검색어 조합 생성")
 print(f"{'='*80}\n")
 
 search_queries = create_search_queries_from_components(
@@ -108,7 +116,10 @@ search_queries = create_search_queries_from_components(
     min_combination_size=2,
     max_combination_size=None,  # 모든 조합
     include_single_ingredients=False,
-    verbose=True
+    verbose=True,
+    keyword_index=keyword_index,  # 있으면 실제 매칭 문서 수로 우선순위/가지치기
+    max_queries=300,
+    parsed_components=structured_components  # Step 1에서 분류까지 끝남 → LLM 재호출 없음
 )
 
 # Step 3: 다중 검색어로 특허 검색
@@ -121,7 +132,9 @@ patents_data = search_patents_with_multiple_queries(
     vectorstore=vectorstore,
     parent_store=parent_store,
     top_n=2,
-    k_per_query=50
+    k_per_query=50,
+    max_hits_per_query=1,  # Parent DB는 특허당 문서 1개 → 남은 검색어 수로 순위 확정 판정
+    keyword_index=keyword_index
 )
 
 # Step 4: 최종 결과 출력
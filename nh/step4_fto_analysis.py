@@ -9,13 +9,16 @@ Step4. FTO 침해 분석 (Gemini 2.0 Flash)
 연결: step3 (utils_v3) -> step4 (fto_analyzer)
 """
 
-import pickle
+from patent_store import ParentStore, KeywordIndex
+from patent_store.embedding_cache import CachedEmbeddings
+from patent_store.metadata_index import MetadataIndex
+from patent_store.result_cache import QuestionCache, index_version
+from patent_store.vector_index import chroma_sqlite_path, load_vectorstore
 import os
 import sys
 import time
 from datetime import datetime
 from langchain_openai import OpenAIEmbeddings
-from langchain_chroma import Chroma
 from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
 
@@ -46,7 +49,7 @@ sys.stdout = TeeLogger(log_filename)
 
 # step3와 동일한 유틸리티 함수 (utils_v3)
 from utils_v3 import (
-    extract_components,
+    extract_structured_components,
     create_search_queries_from_components,
     search_patents_with_multiple_queries
 )
@@ -70,22 +73,45 @@ if not google_api_key:
 # ============================================
 
 # 임베딩 (OpenAI - 벡터 DB 호환)
-embeddings = OpenAIEmbeddings(model="text-embedding-3-small", openai_api_key=openai_api_key)
+embeddings = CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-3-small", openai_api_key=openai_api_key))  # 반복 검색어는 캐시에서
 
 # Vector Store 로드 (Parent DB)
-vectorstore = Chroma(
+# VECTOR_BACKEND=numpy 이면 NumPy 색인 사용 (python -m patent_store.vector_index build ./chroma_db_parent patent_parent)
+# VECTOR_QUANTIZATION=int8|float16 이면 압축 색인으로 후보 검색 후 float32로 재계산
+vectorstore = load_vectorstore(
+    os.environ.get('VECTOR_BACKEND', 'chroma'),
     persist_directory="./chroma_db_parent",
+    collection_name="patent_parent",
     embedding_function=embeddings,
-    collection_name="patent_parent"
+    quantization=os.environ.get('VECTOR_QUANTIZATION') or None
 )
 
-# Parent Store 로드
-with open('parent_documents.pkl', 'rb') as f:
-    parent_store = pickle.load(f)
+# Parent Store 로드 (SQLite, 검색 결과 특허만 조회)
+parent_store = ParentStore('parent_store.sqlite')
 
-print(f"Vector Store (Parent DB) 로드 완료")
+# 키워드 역색인 (Parent DB와 같은 본문, 없으면 Chroma $contains만 사용)
+keyword_index = KeywordIndex('keyword_index_parent.sqlite') if os.path.exists('keyword_index_parent.sqlite') else None
+
+# 메타데이터 색인 (있으면 등록 특허만 검색 → LLM 분석 대상이 아닌 미등록 특허로 검색 결과를 채우지 않음)
+metadata_index = MetadataIndex('metadata_index.npz') if os.path.exists('metadata_index.npz') else None
+
+print(f"Vector Store (Parent DB) 로드 완료 ({type(vectorstore).__name__})")
 print(f"Parent Store 로드 완료: {len(parent_store)}개 특허")
 
+# 질문 단위 결과 캐시 (정규화한 질문이 같으면 전체 파이프라인을 다시 돌리지 않음)
+# 전처리/벡터 DB 반영 산출물(Chroma chroma.sqlite3 포함)이 바뀌면 색인 버전이 달라져 이전 결과는 무효화됨
+# QUESTION_CACHE_FUZZY=1 이면 임베딩 유사도로 근사 적중 허용 (구성요소/검색 조건이 같을 때만 재사용)
+question_cache = QuestionCache(
+    'question_cache.sqlite',
+    version=index_version(
+        'parent_store.sqlite', 'ingest_manifest.sqlite',
+        'keyword_index_parent.sqlite', 'metadata_index.npz', './chroma_db_parent_npy/index.json',
+        chroma_sqlite_path('./chroma_db_parent')
+    ),
+    embeddings=embeddings if os.environ.get('QUESTION_CACHE_FUZZY') == '1' else None
+)
+print(f"질문 캐시 로드 완료: {len(question_cache)}건")
+
 # LLM: Gemini 2.0 Flash (구성요소 추출 + 검색어 생성용)
 llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0)
 print(f"LLM: Gemini 2.0 Flash 준비 완료")
@@ -100,65 +126,118 @@ start_time = time.time()
 # 사용자 질문
 query = "글리세린, 히알루론산, 우뭇가사리로 마스크 팩을 만들려고 해. 침해될까?"
 
-# ── Step 1: 구성요소 추출 ──
-print(f"\n{'='*80}")
-print("Step 1: 구성요소 추출 (Gemini 2.0 Flash)")
-print(f"{'='*80}\n")
-
-components = extract_components(query, llm)
-print("추출된 구성 요소:")
-print(components)
-print()
-
-# ── Step 2: 검색어 조합 생성 ──
-print(f"{'='*80}")
-print("Step 2: 검색어 조합 생성 (Gemini 2.0 Flash)")
-print(f"{'='*80}\n")
-
-search_queries = create_search_queries_from_components(
-    components_text=components,
-    min_combination_size=2,
-    max_combination_size=None,
-    include_single_ingredients=False,
-    verbose=True
-)
-
-# ── Step 3: 다중 검색어로 특허 검색 ──
-print(f"{'='*80}")
-print("Step 3: 다중 검색어로 특허 검색")
-print(f"{'='*80}\n")
-
-patents_data = search_patents_with_multiple_queries(
-    search_queries=search_queries,
-    vectorstore=vectorstore,
-    parent_store=parent_store,
-    top_n=10,
-    k_per_query=50
-)
-
-# 검색 결과 요약
-print(f"{'='*80}")
-print(f"검색 완료: {len(patents_data)}건 특허 발견")
-print(f"{'='*80}\n")
-
-for patent in patents_data:
-    print(f"[{patent['rank']}] {patent['title']}")
-    print(f"    출원번호: {patent['application_number']}")
-    print(f"    등록번호: {patent['register_number']}")
-    print(f"    히트 횟수: {patent['hit_count']}")
-    print(f"    최고 유사도: {patent['best_similarity_score']:.4f}")
+# 검색 전 메타데이터 조건 (캐시 근사 적중 확인에도 사용)
+search_prefilter = {'registered_only': True} if metadata_index is not None else None
+
+structured_components = None
+cached = question_cache.get(query)
+
+if cached is not None and not cached['_exact_match']:
+    # 근사 적중: 질문 문장이 비슷해도 성분 하나만 달라지면 침해 판단이 달라지므로
+    # 구성요소를 다시 추출해 저장된 것과 같고 검색 조건도 같을 때만 재사용
+    structured_components = extract_structured_components(query, llm)
+    if (cached.get('structured_components') != structured_components
+            or cached.get('prefilter') != search_prefilter):
+        print(f"\n질문 캐시 근사 적중 '{cached['_cached_question']}' → 구성요소/검색 조건이 달라 재사용하지 않음")
+        cached = None
+
+if cached is not None and os.path.exists(cached['report_path']):
+    # 캐시 적중: 저장된 구성요소/검색 결과/보고서 재사용
+    components = cached['components']
+    patents_data = cached['patents_data']
+    report_path = cached['report_path']
+    print(f"\n질문 캐시 적중: '{cached['_cached_question']}' → 저장된 결과 재사용 ({len(patents_data)}건 특허)")
+
+elif cached is not None:
+    # 보고서 파일만 지워진 경우 저장된 HTML로 다시 기록
+    components = cached['components']
+    patents_data = cached['patents_data']
+    os.makedirs('reports', exist_ok=True)
+    report_path = f"reports/fto_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
+    with open(report_path, 'w', encoding='utf-8') as f:
+        f.write(cached['report_html'])
+    print(f"\n질문 캐시 적중: '{cached['_cached_question']}' → 저장된 보고서 복원: {report_path}")
+
+else:
+    # ── Step 1: 구성요소 추출 ──
+    print(f"\n{'='*80}")
+    print("Step 1: 구성요소 추출 + 성분/용도 분류 (Gemini 2.0 Flash, 1회 호출)")
+    print(f"{'='*80}\n")
+
+    if structured_components is None:
+        structured_components = extract_structured_components(query, llm)
+    components = structured_components['components']
+    print("추출된 구성 요소:")
+    print(components)
     print()
 
-# ── Step 4: FTO 침해 분석 ──
-print(f"{'='*80}")
-print("Step 4: FTO 침해 분석 시작")
-print(f"{'='*80}\n")
-
-report_path = run_fto_analysis(
-    user_query=query,
-    user_components=components,
-    patents_data=patents_data
-)
+    # ── Step 2: 검색어 조합 생성 ──
+    print(f"{'='*80}")
+    print("Step 2: 검색어 조합 생성")
+    print(f"{'='*80}\n")
+
+    search_queries = create_search_queries_from_components(
+        components_text=components,
+        min_combination_size=2,
+        max_combination_size=None,
+        include_single_ingredients=False,
+        verbose=True,
+        keyword_index=keyword_index,  # 있으면 실제 매칭 문서 수로 우선순위/가지치기
+        max_queries=300,
+        parsed_components=structured_components  # Step 1에서 분류까지 끝남 → LLM 재호출 없음
+    )
+
+    # ── Step 3: 다중 검색어로 특허 검색 ──
+    print(f"{'='*80}")
+    print("Step 3: 다중 검색어로 특허 검색")
+    print(f"{'='*80}\n")
+
+    patents_data = search_patents_with_multiple_queries(
+        search_queries=search_queries,
+        vectorstore=vectorstore,
+        parent_store=parent_store,
+        top_n=10,
+        k_per_query=50,
+        max_hits_per_query=1,  # Parent DB는 특허당 문서 1개 → 남은 검색어 수로 순위 확정 판정
+        keyword_index=keyword_index,
+        prefilter=search_prefilter,
+        metadata_index=metadata_index
+    )
+
+    # 검색 결과 요약
+    print(f"{'='*80}")
+    print(f"검색 완료: {len(patents_data)}건 특허 발견")
+    print(f"{'='*80}\n")
+
+    for patent in patents_data:
+        print(f"[{patent['rank']}] {patent['title']}")
+        print(f"    출원번호: {patent['application_number']}")
+        print(f"    등록번호: {patent['register_number']}")
+        print(f"    히트 횟수: {patent['hit_count']}")
+        print(f"    최고 유사도: {patent['best_similarity_score']:.4f}")
+        print()
+
+    # ── Step 4: FTO 침해 분석 ──
+    print(f"{'='*80}")
+    print("Step 4: FTO 침해 분석 시작")
+    print(f"{'='*80}\n")
+
+    report_path = run_fto_analysis(
+        user_query=query,
+        user_components=components,
+        patents_data=patents_data
+    )
+
+    with open(report_path, encoding='utf-8') as f:
+        report_html = f.read()
+    question_cache.put(query, {
+        'components': components,
+        'structured_components': structured_components,
+        'prefilter': search_prefilter,
+        'patents_data': patents_data,
+        'report_path': report_path,
+        'report_html': report_html,
+    })
 
 # ── 완료 ──
 elapsed = time.time() - start_time
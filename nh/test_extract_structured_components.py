@@ -0,0 +1,72 @@
+"""
+구성요소 추출 + 분류(extract_structured_components) 테스트
+
+LLM은 정해진 응답을 순서대로 돌려주는 FakeListChatModel로 대체 (API 호출 없음)
+
+    python -m pytest -q test_extract_structured_components.py
+"""
+
+import os
+
+import pytest
+
+pytest.importorskip("langchain_google_genai")
+os.environ.setdefault("GOOGLE_API_KEY", "test")   # utils_v3 import 조건 (LLM은 호출하지 않음)
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from utils_v3 import extract_components, extract_structured_components, parse_components
+
+QUERY = "글리세린, 히알루론산, 우뭇가사리로 마스크 팩을 만들려고 해. 침해될까?"
+
+JSON_RESPONSE = '{"ingredients": ["글리세린", "히알루론산", "우뭇가사리"], "purposes": ["마스크팩", "보습"]}'
+EXTRACT_RESPONSE = "글리세린, 히알루론산, 우뭇가사리, 마스크팩, 보습"
+CLASSIFY_RESPONSE = """성분:
+- 글리세린
+- 히알루론산
+- 우뭇가사리
+
+용도/효능:
+- 마스크팩
+- 보습"""
+UNUSED = "호출되면 안 되는 응답"   # FakeListChatModel은 응답을 다 쓰면 처음으로 돌아가므로 호출 수 확인용
+
+
+def test_json_response_uses_single_call():
+    llm = FakeListChatModel(responses=[JSON_RESPONSE, UNUSED])
+    result = extract_structured_components(QUERY, llm)
+
+    assert llm.i == 1
+    assert result == {
+        'components': EXTRACT_RESPONSE,
+        'ingredients': ["글리세린", "히알루론산", "우뭇가사리"],
+        'purposes': ["마스크팩", "보습"],
+    }
+
+
+@pytest.mark.parametrize("response", [
+    "성분은 글리세린, 히알루론산입니다.",                          # JSON 아님
+    '{"ingredients": "글리세린", "purposes": ["보습"]}',          # 목록이 아님
+    '{"ingredients": ["글리세린"], "purposes": ["보습"]',          # 닫히지 않은 JSON
+], ids=["plain_text", "not_list", "broken_json"])
+def test_invalid_json_falls_back_to_two_calls(response):
+    llm = FakeListChatModel(responses=[response, EXTRACT_RESPONSE, CLASSIFY_RESPONSE, UNUSED])
+    result = extract_structured_components(QUERY, llm)
+
+    assert llm.i == 3
+    assert result == {
+        'components': EXTRACT_RESPONSE,
+        'ingredients': ["글리세린", "히알루론산", "우뭇가사리"],
+        'purposes': ["마스크팩", "보습"],
+    }
+
+
+def test_json_path_matches_legacy_two_call_path():
+    # 같은 구성요소를 돌려주는 LLM이면 1회 호출 결과가 기존 extract_components → parse_components 결과와 같아야 함
+    structured = extract_structured_components(QUERY, FakeListChatModel(responses=[JSON_RESPONSE]))
+
+    legacy_llm = FakeListChatModel(responses=[EXTRACT_RESPONSE, CLASSIFY_RESPONSE])
+    components = extract_components(QUERY, legacy_llm)
+    legacy = {'components': components, **parse_components(components, legacy_llm)}
+
+    assert structured == legacy
@@ -0,0 +1,153 @@
+"""
+IngestManifest 변경 감지(plan) / pending 작업 테스트
+
+    python -m pytest -q test_ingest_manifest.py
+"""
+
+import json
+import os
+
+import pytest
+
+from patent_store.ingest import load_parent_documents, run_incremental_ingestion, run_ingestion
+from patent_store.manifest import (
+    CLAIMS_COLLECTION,
+    PARENT_COLLECTION,
+    IngestManifest,
+    dedupe_by_id,
+    file_fingerprint,
+)
+
+
+def _write(path, text: str) -> str:
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    with IngestManifest(str(tmp_path / 'manifest.sqlite')) as m:
+        yield m
+
+
+def test_plan_new_files_are_parsed(manifest, tmp_path):
+    a = _write(tmp_path / 'a.json', '{"a": 1}')
+    b = _write(tmp_path / 'b.json', '{"b": 1}')
+
+    to_parse, removed, unchanged = manifest.plan([a, b])
+
+    assert sorted(to_parse) == sorted([a, b])
+    assert removed == []
+    assert unchanged == 0
+
+
+def test_plan_unchanged_and_touched_files_are_skipped(manifest, tmp_path):
+    a = _write(tmp_path / 'a.json', '{"a": 1}')
+    manifest.record_patent('A1', a, file_fingerprint(a), ['A1_last_version_1'])
+
+    assert manifest.plan([a]) == ([], [], 1)
+
+    # 내용은 같고 mtime만 바뀐 파일 → sha1 비교 후 unchanged
+    st = os.stat(a)
+    os.utime(a, (st.st_atime, st.st_mtime + 10))
+    assert manifest.plan([a]) == ([], [], 1)
+
+
+def test_plan_changed_and_removed_files(manifest, tmp_path):
+    a = _write(tmp_path / 'a.json', '{"a": 1}')
+    b = _write(tmp_path / 'b.json', '{"b": 1}')
+    manifest.record_patent('A1', a, file_fingerprint(a), ['A1_last_version_1'])
+    manifest.record_patent('B1', b, file_fingerprint(b), ['B1_last_version_1'])
+
+    _write(tmp_path / 'a.json', '{"a": 2, "changed": true}')
+    to_parse, removed, unchanged = manifest.plan([a])
+
+    assert to_parse == [a]
+    assert removed == ['B1']
+    assert unchanged == 0
+
+
+def test_record_patent_queues_stale_chunks(manifest, tmp_path):
+    a = _write(tmp_path / 'a.json', '{"a": 1}')
+    manifest.record_patent('A1', a, file_fingerprint(a), ['A1_last_version_1', 'A1_last_version_2'])
+    manifest.clear_pending(CLAIMS_COLLECTION)
+    manifest.clear_pending(PARENT_COLLECTION)
+
+    manifest.record_patent('A1', a, file_fingerprint(a), ['A1_last_version_1'])
+
+    assert manifest.pending(CLAIMS_COLLECTION) == {
+        'upsert': {'A1_last_version_1'},
+        'delete': {'A1_last_version_2'},
+    }
+    assert manifest.pending(PARENT_COLLECTION) == {'upsert': {'A1'}, 'delete': set()}
+
+
+def test_remove_patent_queues_deletes(manifest, tmp_path):
+    a = _write(tmp_path / 'a.json', '{"a": 1}')
+    manifest.record_patent('A1', a, file_fingerprint(a), ['A1_last_version_1'])
+    manifest.remove_patent('A1')
+
+    assert manifest.pending(CLAIMS_COLLECTION)['delete'] == {'A1_last_version_1'}
+    assert manifest.pending(PARENT_COLLECTION)['delete'] == {'A1'}
+    assert len(manifest) == 0
+
+
+def test_forget_file_queues_previous_patent(manifest, tmp_path):
+    a = _write(tmp_path / 'a.json', '{"a": 1}')
+    manifest.record_patent('A1', a, file_fingerprint(a), ['A1_last_version_1'])
+
+    assert manifest.forget_file(a) == 'A1'
+    assert manifest.forget_file(a) is None
+    assert manifest.pending(CLAIMS_COLLECTION)['delete'] == {'A1_last_version_1'}
+    assert manifest.pending(PARENT_COLLECTION)['delete'] == {'A1'}
+
+
+def _patent_json(app_number: str, claims: list) -> str:
+    return json.dumps({
+        'biblioSummaryInfoArray': {'biblioSummaryInfo': {'applicationNumber': app_number}},
+        'claims': {'last_version': {'claims': [
+            {'claim_number': i, 'claim_type': 'independent', 'text': text} for i, text in enumerate(claims, 1)
+        ]}},
+    }, ensure_ascii=False)
+
+
+@pytest.mark.parametrize('new_content', [
+    _patent_json('', ['출원번호가 사라진 청구항']),   # 출원번호 없음
+    _patent_json('A1', []),                          # 청구항 없음
+    '{broken json',                                  # 파싱 오류
+], ids=['no_app_number', 'no_claims', 'parse_error'])
+def test_incremental_ingestion_drops_patent_when_changed_file_yields_nothing(tmp_path, new_content):
+    data = tmp_path / 'data'
+    data.mkdir()
+    _write(data / 'a.json', _patent_json('A1', ['글리세린을 포함하는 조성물', '나이아신아마이드']))
+    _write(data / 'b.json', _patent_json('B1', ['보습 조성물']))
+    paths = dict(
+        child_path=str(tmp_path / 'child.pkl'),
+        parent_path=str(tmp_path / 'parent.pkl'),
+        manifest_path=str(tmp_path / 'manifest.sqlite'),
+        workers=1,
+        report_every=100,
+    )
+    run_ingestion([str(data)], **paths)
+    with IngestManifest(paths['manifest_path']) as m:
+        m.clear_pending(CLAIMS_COLLECTION)
+        m.clear_pending(PARENT_COLLECTION)
+
+    _write(data / 'a.json', new_content)
+    run_incremental_ingestion([str(data)], **paths)
+
+    with IngestManifest(paths['manifest_path']) as m:
+        claims = m.pending(CLAIMS_COLLECTION)
+        parents = m.pending(PARENT_COLLECTION)
+    assert claims['delete'] == {'A1_last_version_1', 'A1_last_version_2'}
+    assert claims['upsert'] == set()
+    assert set(load_parent_documents(paths['parent_path'])) == (
+        {'A1', 'B1'} if 'A1' in parents['upsert'] else {'B1'}
+    )
+    # 청구항이 없는 특허는 Parent만 upsert되고(step2에서 이전 벡터 삭제) 나머지는 삭제
+    assert parents['delete'] | parents['upsert'] == {'A1'}
+
+
+def test_dedupe_by_id_keeps_last():
+    docs = [('a', 1), ('b', 2), ('a', 3)]
+    assert dedupe_by_id(docs, lambda d: d[0]) == [('b', 2), ('a', 3)]
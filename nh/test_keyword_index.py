@@ -0,0 +1,81 @@
+"""
+KeywordIndex 조회 테스트
+
+    python -m pytest -q test_keyword_index.py
+"""
+
+from array import array
+
+import pytest
+
+from patent_store.keyword_index import KeywordIndex
+
+
+@pytest.fixture
+def keyword_index(tmp_path):
+    index = KeywordIndex(str(tmp_path / 'keyword_index.sqlite'), readonly=False)
+    index.add('P1_last_version_1', 'P1', '글리세린 5중량% 를 포함하는 화장료 조성물')
+    index.add('P1_last_version_2', 'P1', '나이아신아마이드 를 포함하는 미백 화장품')
+    index.add('P2_last_version_1', 'P2', '글리세린 및 나이아신아마이드 를 함유하는 보습 조성물')
+    index.flush()
+    yield index
+    index.close()
+
+
+def test_lookup_is_substring_match(keyword_index):
+    # "화장"은 "화장료", "화장품" 모두에 걸림 (Chroma $contains와 동일)
+    assert keyword_index.doc_ids(keyword_index.lookup('화장')) == {'P1_last_version_1', 'P1_last_version_2'}
+    assert keyword_index.doc_freq('글리세린') == 2
+    assert keyword_index.doc_freq('없는키워드') == 0
+
+
+def test_match_all_is_and(keyword_index):
+    assert keyword_index.doc_ids(keyword_index.match_all(['글리세린', '나이아신'])) == {'P2_last_version_1'}
+    assert keyword_index.match_parent_ids(['조성물']) == {'P1', 'P2'}
+    assert keyword_index.count_matches('글리세린 화장료') == 1
+    assert keyword_index.match_all([]) == set()
+
+
+def test_remove_parent_hides_documents(keyword_index):
+    assert keyword_index.remove_parent('P1') == 2
+
+    assert keyword_index.match_parent_ids(['조성물']) == {'P2'}
+    assert keyword_index.doc_freq('화장') == 0
+    assert len(keyword_index) == 1
+
+    # 다시 색인하면 새 문서 번호로 보임
+    keyword_index.add('P1_last_version_1', 'P1', '글리세린 화장료')
+    keyword_index.flush()
+    assert keyword_index.match_parent_ids(['화장료']) == {'P1'}
+
+
+def test_reopen_after_remove_does_not_reuse_doc_numbers(tmp_path):
+    # 증분 처리: 세션마다 색인을 다시 여는 사이에 삭제와 추가가 일어남
+    path = str(tmp_path / 'keyword_index.sqlite')
+    with KeywordIndex(path, readonly=False) as index:
+        index.add('A_1', 'A', '글리세린 조성물')
+        index.add('B_1', 'B', '히알루론산 조성물')
+    with KeywordIndex(path, readonly=False) as index:
+        assert index.remove_parent('B') == 1
+    with KeywordIndex(path, readonly=False) as index:
+        index.add('C_1', 'C', '우뭇가사리 조성물')
+
+    with KeywordIndex(path) as index:
+        assert index.match_parent_ids(['우뭇가사리']) == {'C'}
+        assert index.match_parent_ids(['조성물']) == {'A', 'C'}
+        assert index.match_parent_ids(['히알루론산']) == set()
+
+
+def test_reused_doc_numbers_stay_visible(tmp_path):
+    # 이전 버전이 만든 파일: 삭제 표시된 번호가 새 문서에 다시 쓰인 상태
+    path = str(tmp_path / 'keyword_index.sqlite')
+    with KeywordIndex(path, readonly=False) as index:
+        index.add('A_1', 'A', '글리세린 조성물')
+        index.add('B_1', 'B', '히알루론산 조성물')
+        index.remove_parent('B')
+        index.conn.execute("INSERT INTO docs (doc_no, doc_id, parent_id) VALUES (2, 'C_1', 'C')")
+        index.conn.execute("INSERT OR REPLACE INTO terms (term, postings) VALUES ('우뭇가사리', ?)",
+                           (array('I', [2]).tobytes(),))
+
+    with KeywordIndex(path) as index:
+        assert index.match_parent_ids(['우뭇가사리']) == {'C'}
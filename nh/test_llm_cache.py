@@ -0,0 +1,49 @@
+"""
+LLM 응답 캐시(LLMCache) 테스트
+
+    python -m pytest -q test_llm_cache.py
+"""
+
+import sqlite3
+
+from patent_store.llm_cache import LLMCache, make_cache_key
+
+
+def _accessed(path, prompt):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(
+            "SELECT accessed FROM responses WHERE key = ?", (make_cache_key('m', prompt),)
+        ).fetchone()[0]
+
+
+def test_get_defers_accessed_until_put_or_close(tmp_path):
+    path = str(tmp_path / 'llm_cache.sqlite')
+    cache = LLMCache(path)
+    cache.put('m', 'a', 'A')
+    cache.put('m', 'b', 'B')
+    before = _accessed(path, 'a')
+
+    assert cache.get('m', 'a') == 'A'
+    assert _accessed(path, 'a') == before   # 적중마다 쓰기/커밋하지 않음
+
+    cache.put('m', 'c', 'C')
+    assert _accessed(path, 'a') > before
+
+    assert cache.get('m', 'b') == 'B'
+    cache.close()
+    assert _accessed(path, 'b') > before
+    assert cache.hits == 2
+
+
+def test_eviction_sees_pending_accesses(tmp_path):
+    path = str(tmp_path / 'llm_cache.sqlite')
+    with LLMCache(path) as cache:
+        for prompt in 'abc':
+            cache.put('m', prompt, prompt.upper())
+
+    # 4바이트 > 3바이트 → 90%(2바이트)까지 삭제. a는 방금 조회했으므로 b, c부터 삭제
+    with LLMCache(path, max_bytes=3) as cache:
+        assert cache.get('m', 'a') == 'A'
+        cache.put('m', 'd', 'D')
+        assert cache.get('m', 'a') == 'A'
+        assert cache.get('m', 'b') is None and cache.get('m', 'c') is None
@@ -0,0 +1,51 @@
+"""
+MetadataIndex 조회 테스트
+
+    python -m pytest -q test_metadata_index.py
+"""
+
+import pytest
+
+from patent_store.metadata_index import MetadataIndex, build_metadata_index, ipc_matches
+from patent_store.parent_store import ParentStore
+
+
+@pytest.fixture
+def metadata_index(tmp_path):
+    store_path = str(tmp_path / 'parent_store.sqlite')
+    with ParentStore(store_path, readonly=False) as store:
+        store.put('P1', {'register_number': '1012345', 'register_status': '등록',
+                         'ipc_codes': ['A61K 8/34', 'A61Q 19/00']})
+        store.put('P2', {'register_number': '', 'register_status': '공개',
+                         'ipc_codes': ['A61K 80/00']})
+        store.put('P3', {'register_number': '1099999', 'register_status': '소멸',
+                         'ipc_codes': ['A61K 8/97']})
+    index_path = str(tmp_path / 'metadata_index.npz')
+    assert build_metadata_index(store_path, index_path) == 3
+    return MetadataIndex(index_path)
+
+
+def test_metadata_registered_and_status(metadata_index):
+    assert metadata_index.eligible_parent_ids(registered_only=True) == {'P1'}
+    assert metadata_index.eligible_parent_ids(register_status=['공개', '소멸']) == {'P2', 'P3'}
+    assert metadata_index.eligible_parent_ids() is None
+
+
+def test_metadata_ipc_prefix(metadata_index):
+    # 'A61K 8'은 메인그룹 8만 (80은 제외)
+    assert metadata_index.eligible_parent_ids(ipc_prefixes='A61K 8') == {'P1', 'P3'}
+    assert metadata_index.eligible_parent_ids(ipc_prefixes=['A61Q', 'A61K 80']) == {'P1', 'P2'}
+    assert metadata_index.eligible_parent_ids(registered_only=True, ipc_prefixes='A61K 8/9') == set()
+
+
+def test_metadata_positions(metadata_index):
+    positions = metadata_index.positions(['P2', 'missing'])
+    assert positions[1] == -1
+    assert metadata_index.parent_ids[positions[0]] == 'P2'
+
+
+def test_ipc_matches():
+    assert ipc_matches('A61K 8/34', 'A61K')
+    assert ipc_matches('A61K 8/34', 'A61K 8')
+    assert not ipc_matches('A61K 80/00', 'A61K 8')
+    assert ipc_matches('A61K 8/34', 'A61K 8/3')
@@ -0,0 +1,161 @@
+"""
+다중 검색어 검색(search_patents_with_multiple_queries) 조기 종료 / 메타데이터 조건 테스트
+
+    python -m pytest -q test_multi_query_search.py
+"""
+
+import os
+
+import pytest
+
+pytest.importorskip("langchain_google_genai")
+os.environ.setdefault("GOOGLE_API_KEY", "test")   # utils_v3 import 조건 (LLM은 호출하지 않음)
+
+from langchain_core.documents import Document
+
+from patent_store.keyword_index import KeywordIndex
+from utils_v3 import search_patents_with_multiple_queries
+
+# Parent DB 문서 (특허당 문서 1개, doc_id = parent_id)
+TEXTS = {
+    'A': '글리세린 히알루론산 보습',
+    'B': '글리세린 히알루론산 크림',
+    **{f"R{n}": f"우뭇가사리 팩 r{n}" for n in range(10)},
+}
+
+
+class FakeVectorStore:
+    """parent_id $in 범위 안에서 (검색어, 특허)로 정해지는 점수 순 top-k를 돌려주는 Parent DB"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def similarity_search_with_score(self, query, k, filter=None, where_document=None):
+        self.calls += 1
+        scope = filter['parent_id']['$in'] if filter else list(TEXTS)
+        scored = sorted((sum(map(ord, query + p)) % 97 / 100, p) for p in scope)
+        return [(Document(page_content=TEXTS[p], metadata={'parent_id': p}, id=p), score) for score, p in scored[:k]]
+
+
+def _parent_store():
+    return {
+        p: {'application_number': p, 'register_number': '', 'title': p, 'abstract': '',
+            'register_status': '등록', 'all_claims': []}
+        for p in TEXTS
+    }
+
+
+@pytest.fixture
+def keyword_index(tmp_path):
+    path = str(tmp_path / 'keyword_index_parent.sqlite')
+    with KeywordIndex(path, readonly=False) as index:
+        for parent_id, text in TEXTS.items():
+            index.add(parent_id, parent_id, text)
+    index = KeywordIndex(path)
+    yield index
+    index.close()
+
+
+def _search(queries, early_stop, keyword_index=None):
+    vectorstore = FakeVectorStore()
+    results = search_patents_with_multiple_queries(
+        queries, vectorstore, _parent_store(), top_n=2, k_per_query=3, max_workers=1,
+        keyword_index=keyword_index, early_stop=early_stop, max_hits_per_query=1, check_every=5,
+    )
+    return results, vectorstore.calls
+
+
+def test_early_stop_returns_full_run_output(keyword_index):
+    # 앞 5개 검색어로 A(5회), B(3회) 확정 → 나머지는 A/B를 범위에 포함하지 않는 R 특허 검색어 (특허당 최대 2회)
+    queries = ["글리세린 히알루론산", "글리세린 보습", "히알루론산 보습", "글리세린", "히알루론산"]
+    queries += [f"{word} r{n}" for n in range(10) for word in ("우뭇가사리", "팩")]
+
+    early, early_calls = _search(queries, early_stop=True, keyword_index=keyword_index)
+    full, full_calls = _search(queries, early_stop=False, keyword_index=keyword_index)
+
+    assert early_calls == 5 and full_calls == len(queries)
+    assert [p['parent_id'] for p in full] == ['A', 'B']
+    assert early == full
+
+
+def test_open_queries_are_never_skipped():
+    # 범위 제한 없는 검색어는 상위 특허의 통계를 바꿀 수 있으므로 끝까지 실행
+    queries = [f"검색어 {i}" for i in range(30)]
+    early, early_calls = _search(queries, early_stop=True)
+    full, full_calls = _search(queries, early_stop=False)
+
+    assert early_calls == full_calls == len(queries)
+    assert early == full
+
+
+# ── 특허 단위 메타데이터 조건 (Chroma where) ──
+
+PARENTS = {
+    'P1': {'register_number': '1012345', 'register_status': '등록', 'ipc_codes': ['A61K 8/34']},
+    'P2': {'register_number': '', 'register_status': '공개', 'ipc_codes': ['A61K 8/97']},
+    'P3': {'register_number': '1099999', 'register_status': '소멸', 'ipc_codes': ['A61Q 19/00']},
+    'P4': {'register_number': '1077777', 'register_status': '등록', 'ipc_codes': ['A61Q 19/00']},
+}
+
+
+@pytest.fixture
+def parent_collection(tmp_path):
+    pytest.importorskip("langchain_chroma")
+    from langchain_chroma import Chroma
+    from patent_store.metadata_index import MetadataIndex, build_metadata_index
+    from patent_store.parent_store import ParentStore
+
+    store_path = str(tmp_path / 'parent_store.sqlite')
+    with ParentStore(store_path, readonly=False) as store:
+        store.put_many(PARENTS.items())
+    index_path = str(tmp_path / 'metadata_index.npz')
+    build_metadata_index(store_path, index_path)
+
+    class Embeddings:
+        def embed_documents(self, texts):
+            return [[1.0, float(i)] for i, _ in enumerate(texts)]
+
+        def embed_query(self, text):
+            return [1.0, 0.0]
+
+    chroma = Chroma(collection_name='parent_test', embedding_function=Embeddings(),
+                    persist_directory=str(tmp_path / 'chroma_db_parent'))
+    chroma.add_documents(
+        [Document(page_content=f"{p} 글리세린 조성물",
+                  metadata={'parent_id': p, 'register_number': v['register_number'],
+                            'register_status': v['register_status'], 'ipc_codes': ','.join(v['ipc_codes'])})
+         for p, v in PARENTS.items()],
+        ids=list(PARENTS),
+    )
+    return chroma, MetadataIndex(index_path)
+
+
+def test_registered_only_is_pushed_into_parent_where(parent_collection, capsys):
+    from utils_v3 import _stores_parent_metadata, apply_metadata_prefilter
+
+    chroma, metadata_index = parent_collection
+    assert _stores_parent_metadata(chroma)
+
+    # 대상 특허가 $in 한도보다 많아도 범위 없는 검색어에 등록 조건이 걸림
+    queries, filters, eligible = apply_metadata_prefilter(
+        ['글리세린'], [None], {'registered_only': True}, metadata_index,
+        max_id_filter_size=1, parent_metadata=True,
+    )
+    assert eligible == {'P1', 'P4'}
+    assert filters[0] is not None and 'parent_id' not in str(filters[0])
+    hits = chroma.similarity_search_with_score('글리세린', k=4, filter=filters[0])
+    assert {doc.metadata['parent_id'] for doc, _ in hits} == eligible
+    assert '⚠️' not in capsys.readouterr().out
+
+
+def test_unpushable_condition_warns(parent_collection, capsys):
+    from utils_v3 import apply_metadata_prefilter
+
+    _, metadata_index = parent_collection
+    _, filters, eligible = apply_metadata_prefilter(
+        ['글리세린'], [None], {'ipc_prefixes': 'A61Q'}, metadata_index,
+        max_id_filter_size=1, parent_metadata=True,
+    )
+    assert eligible == {'P3', 'P4'}
+    assert filters == [None]
+    assert "['ipc_prefixes']" in capsys.readouterr().out
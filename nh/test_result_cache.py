@@ -0,0 +1,52 @@
+"""
+질문 결과 캐시(QuestionCache) / 색인 버전 테스트
+
+    python -m pytest -q test_result_cache.py
+"""
+
+import os
+
+from patent_store.result_cache import QuestionCache, index_version
+
+
+class KeywordEmbeddings:
+    """'글리세린'/'히알루론산'만 구분하는 임베딩 → 성분이 달라도 유사도가 기준 이상"""
+
+    def embed_query(self, text):
+        return [1.0, 0.1 * ('글리세린' in text), 0.1 * ('히알루론산' in text)]
+
+
+def test_exact_match_without_embeddings(tmp_path):
+    with QuestionCache(str(tmp_path / 'cache.sqlite'), version='v1') as cache:
+        cache.put("글리세린으로 팩을 만들면 침해될까?", {'components': '글리세린'})
+
+        hit = cache.get("  글리세린으로  팩을 만들면 침해될까 ")
+        assert hit['components'] == '글리세린'
+        assert hit['_exact_match'] is True
+        assert cache.get("히알루론산으로 팩을 만들면 침해될까?") is None
+
+
+def test_fuzzy_hit_is_flagged(tmp_path):
+    with QuestionCache(str(tmp_path / 'cache.sqlite'), version='v1', embeddings=KeywordEmbeddings()) as cache:
+        cache.put("글리세린으로 팩을 만들면 침해될까?", {'components': '글리세린'})
+
+        hit = cache.get("히알루론산으로 팩을 만들면 침해될까?")
+        assert hit is not None
+        assert hit['_exact_match'] is False   # 호출하는 쪽에서 구성요소 비교 후 재사용
+
+
+def test_version_change_invalidates(tmp_path):
+    chroma_sqlite = tmp_path / 'chroma.sqlite3'
+    chroma_sqlite.write_bytes(b'a')
+    path = str(tmp_path / 'cache.sqlite')
+    version = index_version(str(chroma_sqlite))
+    with QuestionCache(path, version=version) as cache:
+        cache.put("질문", {'components': '글리세린'})
+
+    # 벡터 DB에 문서가 추가되면 chroma.sqlite3 크기/수정 시각이 바뀜
+    chroma_sqlite.write_bytes(b'ab')
+    os.utime(chroma_sqlite, ns=(0, 0))
+    new_version = index_version(str(chroma_sqlite))
+    assert new_version != version
+    with QuestionCache(path, version=new_version) as cache:
+        assert cache.get("질문") is None
@@ -0,0 +1,82 @@
+"""
+검색어 조합 생성(plan_search_queries) 테스트
+
+    python -m pytest -q test_search_query_planner.py
+"""
+
+import os
+from itertools import combinations
+
+import pytest
+
+pytest.importorskip("langchain_google_genai")
+os.environ.setdefault("GOOGLE_API_KEY", "test")   # utils_v3 import 조건 (LLM은 호출하지 않음)
+
+from utils_v3 import DEFAULT_COSMETIC_KEYWORDS, generate_search_queries
+
+INGREDIENTS = ["글리세린", "나이아신아마이드", "히알루론산", "세라마이드", "판테놀"]
+PURPOSES = ["보습", "미백"]
+
+
+def _all_queries(ingredients, purposes):
+    """가지치기/예산 없이 만들 수 있는 전체 검색어 (min_combination_size=2 기준)"""
+    all_purposes = list(dict.fromkeys(purposes + DEFAULT_COSMETIC_KEYWORDS))
+    queries = {f"{ing} {p}" for ing in ingredients for p in all_purposes}
+    for size in range(2, len(ingredients) + 1):
+        for combo in combinations(ingredients, size):
+            text = " ".join(combo)
+            queries.add(text)
+            queries.update(f"{text} {p}" for p in all_purposes)
+    queries.add(" ".join(ingredients + all_purposes))
+    return queries
+
+
+def test_without_statistics_generates_everything():
+    queries = generate_search_queries(INGREDIENTS, PURPOSES, max_queries=None, time_budget=None)
+    assert len(queries) == len(set(queries))
+    assert set(queries) == _all_queries(INGREDIENTS, PURPOSES)
+
+
+def test_doc_freq_estimate_only_reorders():
+    # 키워드마다 문서 1%만 매칭 → 독립 가정 추정치는 2개 이상 조합이 모두 1건 미만이지만
+    # 실제로는 같이 나오는 성분이 많으므로 추정치로는 검색어를 빼면 안 됨
+    queries = generate_search_queries(
+        INGREDIENTS, PURPOSES,
+        doc_freq=lambda keyword: 100, total_docs=10_000,
+        max_queries=None, time_budget=None,
+    )
+    assert set(queries) == _all_queries(INGREDIENTS, PURPOSES)
+
+
+def test_doc_freq_orders_selective_queries_first():
+    freq = {"글리세린": 5000, "나이아신아마이드": 10}
+    queries = generate_search_queries(
+        ["글리세린", "나이아신아마이드"], ["보습"],
+        doc_freq=lambda keyword: freq.get(keyword, 1000), total_docs=10_000,
+        max_queries=None, time_budget=None,
+    )
+    assert queries.index("나이아신아마이드 보습") < queries.index("글리세린 보습")
+
+
+def test_match_count_prunes_only_zero_match_combinations():
+    # 글리세린+판테놀은 같이 나오는 문서가 없음 → 그 조합을 포함하는 검색어만 빠짐
+    docs = [
+        "글리세린 나이아신아마이드 히알루론산 세라마이드 보습 미백 화장품 화장 화장료 미용",
+        "판테놀 나이아신아마이드 히알루론산 세라마이드 보습 미백 화장품 화장 화장료 미용",
+    ]
+
+    def match_count(query):
+        keywords = query.split()
+        return sum(all(k in doc for k in keywords) for doc in docs)
+
+    queries = generate_search_queries(
+        INGREDIENTS, PURPOSES, match_count=match_count, max_queries=None, time_budget=None,
+    )
+    expected = {q for q in _all_queries(INGREDIENTS, PURPOSES) if match_count(q) > 0}
+    assert set(queries) == expected
+    assert all("글리세린" not in q or "판테놀" not in q for q in queries)
+
+
+def test_max_queries_budget():
+    queries = generate_search_queries(INGREDIENTS, PURPOSES, max_queries=10, time_budget=None)
+    assert len(queries) == 10
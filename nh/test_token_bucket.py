@@ -0,0 +1,55 @@
+"""
+TokenBucket (분당 토큰 예산) 테스트
+
+    python -m pytest -q test_token_bucket.py
+"""
+
+import time
+
+from patent_store.embedding import TokenBucket
+
+
+def test_acquire_within_capacity_does_not_wait():
+    bucket = TokenBucket(tpm_limit=60_000)
+
+    start = time.monotonic()
+    bucket.acquire(30_000)
+    bucket.acquire(30_000)
+
+    assert time.monotonic() - start < 0.1
+
+
+def test_acquire_waits_for_refill():
+    bucket = TokenBucket(tpm_limit=6_000)   # 초당 100토큰
+    bucket.acquire(6_000)
+
+    start = time.monotonic()
+    bucket.acquire(30)
+
+    assert 0.2 <= time.monotonic() - start < 1.0
+
+
+def test_acquire_larger_than_capacity_is_clamped():
+    bucket = TokenBucket(tpm_limit=600)
+
+    start = time.monotonic()
+    bucket.acquire(10_000)
+
+    assert time.monotonic() - start < 0.1
+    assert bucket.tokens == 0
+
+
+def test_slow_down_and_speed_up():
+    bucket = TokenBucket(tpm_limit=6_000)
+
+    bucket.slow_down()
+    assert bucket.rate == bucket.max_rate * 0.75
+    assert bucket.tokens == 0
+
+    for _ in range(20):
+        bucket.slow_down()
+    assert bucket.rate == bucket.max_rate * 0.1
+
+    for _ in range(100):
+        bucket.speed_up()
+    assert bucket.rate == bucket.max_rate
@@ -0,0 +1,131 @@
+"""
+NumPy 벡터 색인 (Chroma 스냅샷) 테스트
+
+    python -m pytest -q test_vector_index.py
+"""
+
+import hashlib
+import warnings
+
+import numpy as np
+import pytest
+
+pytest.importorskip("langchain_chroma")
+
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+
+from patent_store import vector_index
+from patent_store.vector_index import (
+    NumpyVectorStore,
+    build_vector_index,
+    is_index_current,
+    load_vectorstore,
+    quantization_benchmark,
+    quantize_vector_index,
+    refresh_vector_index,
+)
+
+COLLECTION = 'test_parent'
+
+
+class HashEmbeddings:
+    """텍스트 해시 → 고정 벡터 (API 호출 없음)"""
+
+    dim = 32
+
+    def _embed(self, text: str):
+        seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little')
+        return np.random.default_rng(seed).normal(size=self.dim).astype(np.float32).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def _add(chroma, start: int, end: int) -> None:
+    chroma.add_documents(
+        [Document(page_content=f"특허 {i} 청구항", metadata={'parent_id': f"P{i}"}) for i in range(start, end)],
+        ids=[f"P{i}" for i in range(start, end)],
+    )
+
+
+@pytest.fixture
+def chroma_dir(tmp_path):
+    persist_directory = str(tmp_path / 'chroma_db_parent')
+    chroma = Chroma(persist_directory=persist_directory, embedding_function=HashEmbeddings(),
+                    collection_name=COLLECTION)
+    _add(chroma, 0, 50)
+    return persist_directory, chroma
+
+
+def test_snapshot_is_current_until_collection_changes(chroma_dir):
+    persist_directory, chroma = chroma_dir
+    index_dir = persist_directory + '_npy'
+    assert build_vector_index(persist_directory, COLLECTION) == 50
+
+    # 조회만 해서는 버전이 바뀌지 않음
+    chroma.similarity_search("특허", k=3)
+    assert is_index_current(index_dir, persist_directory)
+    assert isinstance(load_vectorstore('numpy', persist_directory, COLLECTION, HashEmbeddings()), NumpyVectorStore)
+
+    _add(chroma, 50, 60)
+    assert not is_index_current(index_dir, persist_directory)
+    with pytest.warns(UserWarning, match="오래됨"):
+        vectorstore = load_vectorstore('numpy', persist_directory, COLLECTION, HashEmbeddings())
+    assert isinstance(vectorstore, Chroma)
+
+
+def test_refresh_rebuilds_snapshot_and_quantized_matrix(chroma_dir):
+    persist_directory, chroma = chroma_dir
+    index_dir = persist_directory + '_npy'
+
+    # 색인 폴더가 없으면 아무것도 하지 않음
+    assert refresh_vector_index(persist_directory, COLLECTION) is None
+
+    build_vector_index(persist_directory, COLLECTION)
+    quantize_vector_index(index_dir, 'int8')
+    assert refresh_vector_index(persist_directory, COLLECTION) is None
+
+    chroma.delete(ids=['P0', 'P1'])
+    _add(chroma, 50, 70)
+    assert refresh_vector_index(persist_directory, COLLECTION) == 68
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        engine = load_vectorstore('numpy', persist_directory, COLLECTION, HashEmbeddings(), quantization='int8')
+    assert len(engine) == 68
+    assert engine.q_vectors.shape[0] == 68
+    ids = set(engine.get(include=[])['ids'])
+    assert 'P0' not in ids and 'P69' in ids
+
+
+def test_quantized_block_dots_cast_in_chunks(chroma_dir, monkeypatch):
+    persist_directory, _ = chroma_dir
+    index_dir = persist_directory + '_npy'
+    build_vector_index(persist_directory, COLLECTION)
+    quantize_vector_index(index_dir, 'int8')
+    engine = NumpyVectorStore(index_dir, quantization='int8')
+    queries = np.asarray(engine.vectors[:3], dtype=np.float32)
+
+    full = engine._block_dots(queries, 0, len(engine))
+    monkeypatch.setattr(vector_index, 'CAST_ROWS', 7)
+    assert np.allclose(engine._block_dots(queries, 0, len(engine)), full)
+    # int8 근사가 float32 내적과 크게 다르지 않음
+    assert np.allclose(full, queries @ np.asarray(engine.vectors).T, atol=0.1)
+
+
+def test_quantization_benchmark_reports_chroma_baseline(chroma_dir):
+    persist_directory, _ = chroma_dir
+    index_dir = persist_directory + '_npy'
+    build_vector_index(persist_directory, COLLECTION)
+    quantize_vector_index(index_dir, 'int8')
+
+    result = quantization_benchmark(index_dir, 'int8', n_queries=10, k=5,
+                                    persist_directory=persist_directory, collection_name=COLLECTION)
+    assert result['recall'] > 0.9
+    assert 0.0 <= result['chroma_recall'] <= 1.0
+    assert result['chroma_sec'] >= 0.0
+    assert 'chroma_recall' not in quantization_benchmark(index_dir, 'int8', n_queries=10, k=5)
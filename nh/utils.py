@@ -6,7 +6,8 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnablePassthrough
 from collections import defaultdict
 from typing import List, Dict, Tuple, Any
-import pickle
+from patent_store import ParentStore, join_parent_metadata
+from patent_store.embedding_cache import CachedEmbeddings
 import os
 from langchain_openai import OpenAIEmbeddings
 from langchain_chroma import Chroma
@@ -471,11 +472,12 @@ def search_patents_with_multiple_queries(
 
     for i, (parent_id, data) in enumerate(sorted_patents[:20], 1):
         avg_score = sum(data['scores']) / len(data['scores'])
-        doc = data['best_doc']
+        # 청구항 DB는 서지정보를 Parent Store에서 결합
+        metadata = join_parent_metadata(data['best_doc'].metadata, parent_store)
         print(f"[{i}] 히트 횟수: {data['hit_count']}회")
-        print(f"    특허명: {doc.metadata['title']}")
-        print(f"    출원번호: {doc.metadata['application_number']}")
-        print(f"    등록번호: {doc.metadata['register_number']}")
+        print(f"    특허명: {metadata['title']}")
+        print(f"    출원번호: {metadata['application_number']}")
+        print(f"    등록번호: {metadata['register_number']}")
         print(f"    최고 유사도: {data['best_score']:.4f}")
         print(f"    평균 유사도: {avg_score:.4f}")
         # 히트된 검색어 조합 출력 (유사도순 정렬)
@@ -534,7 +536,7 @@ def search_patents_with_multiple_queries(
 if __name__ == "__main__":
     # 임베딩 모델 
     # 벡터 DB 구축시 사용한 모델과 동일하게 설정해야 함! 
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small", openai_api_key=api_key)
+    embeddings = CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-3-small", openai_api_key=api_key))  # 반복 검색어는 캐시에서
 
     # Vector Store 로드
     vectorstore = Chroma(
@@ -543,9 +545,8 @@ if __name__ == "__main__":
         collection_name="patent_claims" #저장시 설정한 컬렉션명
     )
 
-    # Parent Store 로드
-    with open('parent_documents.pkl', 'rb') as f:
-        parent_store = pickle.load(f)
+    # Parent Store 로드 (SQLite, 검색 결과 특허만 조회)
+    parent_store = ParentStore('parent_store.sqlite')
 
     print(f"✓ Vector Store 로드 완료")
     print(f"✓ Parent Store 로드 완료: {len(parent_store)}개 특허")
@@ -7,6 +7,7 @@ from langchain_core.runnables import RunnablePassthrough
 from collections import defaultdict
 from typing import List, Dict, Tuple, Any
 import pickle
+from patent_store import join_parent_metadata
 import os
 from langchain_openai import OpenAIEmbeddings
 from langchain_chroma import Chroma
@@ -464,11 +465,12 @@ def search_patents_with_multiple_queries(
 
     for i, (parent_id, data) in enumerate(sorted_patents[:20], 1):
         avg_score = sum(data['scores']) / len(data['scores'])
-        doc = data['best_doc']
+        # 청구항 DB는 서지정보를 Parent Store에서 결합
+        metadata = join_parent_metadata(data['best_doc'].metadata, parent_store)
         print(f"[{i}] 히트 횟수: {data['hit_count']}회")
-        print(f"    특허명: {doc.metadata['title']}")
-        print(f"    출원번호: {doc.metadata['application_number']}")
-        print(f"    등록번호: {doc.metadata['register_number']}")
+        print(f"    특허명: {metadata['title']}")
+        print(f"    출원번호: {metadata['application_number']}")
+        print(f"    등록번호: {metadata['register_number']}")
         print(f"    최고 유사도: {data['best_score']:.4f}")
         print(f"    평균 유사도: {avg_score:.4f}")
         # 히트된 검색어 조합 출력 (유사도순 정렬)
@@ -8,11 +8,16 @@
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnablePassthrough
 from collections import defaultdict, Counter
-from typing import List, Dict, Tuple, Any, Set
-from itertools import combinations
+from typing import List, Dict, Tuple, Any, Set, Optional, Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+import heapq
+from array import array
 import pickle
+import json
+from patent_store import join_parent_metadata
 import os
 import re
+import time
 
 from langchain_google_genai import ChatGoogleGenerativeAI
 
@@ -91,7 +96,7 @@ def parse_components(components_text: str, llm) -> Dict[str, List[str]]:
 
     Args:
         components_text (str): extract_components()로 추출된 텍스트
-        llm: LLM 모델 인스턴스
+        llm: LLM 모델 인스턴스 (호출한 쪽의 인스턴스를 그대로 사용)
 
     Returns:
         Dict[str, List[str]]: {'ingredients': [...], 'purposes': [...]}
@@ -151,9 +156,6 @@ def parse_components(components_text: str, llm) -> Dict[str, List[str]]:
         ("user", "입력:\n{components}"),
     ])
 
-    # Gemini 2.0 Flash LLM
-    llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0)
-
     classify_chain = (
         {"components": RunnablePassthrough()}
         | classify_prompt
@@ -204,72 +206,277 @@ def parse_components(components_text: str, llm) -> Dict[str, List[str]]:
 
 
 # ============================================
-# 유틸리티 함수 3: 검색어 조합 생성
+# 유틸리티 함수 2-1: 구성요소 추출 + 분류 (LLM 1회, JSON)
 # ============================================
 
-def generate_search_queries(
-    ingredients: List[str],
-    purposes: List[str],
-    min_combination_size: int = 2,
-    max_combination_size: int = None,
-    include_single_ingredients: bool = False
-) -> List[str]:
+def _message_text(result) -> str:
+    # AIMessage 객체인 경우 content 추출
+    if hasattr(result, 'content'):
+        return result.content
+    return str(result)
+
+
+def _parse_components_json(text: str) -> Optional[Dict[str, List[str]]]:
+    """LLM 응답에서 {"ingredients": [...], "purposes": [...]} JSON을 꺼냄 (형식이 다르면 None)"""
+    match = re.search(r'\{.*\}', text, re.DOTALL)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get('ingredients'), list) \
+            or not isinstance(data.get('purposes'), list):
+        return None
+
+    def clean(items):
+        return [str(item).strip() for item in items if str(item).strip()]
+
+    return {'ingredients': clean(data['ingredients']), 'purposes': clean(data['purposes'])}
+
+
+def extract_structured_components(query: str, llm) -> Dict[str, Any]:
     """
-    성분과 용도를 조합하여 가능한 모든 검색어를 생성
+    사용자 질문에서 구성요소를 추출하면서 성분/용도로 바로 분류 (LLM 1회 호출)
+
+    extract_components() → parse_components() 두 번의 호출을 JSON 응답 한 번으로 합침.
+    응답이 JSON 형식이 아니면 기존 2회 호출 방식으로 대체함 (같은 llm 인스턴스 사용).
 
     Args:
-        ingredients (List[str]): 주요 성분 리스트
-        purposes (List[str]): 용도/효능 리스트 (기본 화장품 키워드와 자동 병합)
-        min_combination_size (int): 최소 조합 크기 (기본값: 2)
-        max_combination_size (int): 최대 조합 크기 (None이면 전체)
-        include_single_ingredients (bool): 단일 성분 포함 여부 (기본값: False)
+        query (str): 사용자의 질문
+        llm: LLM 모델 인스턴스
 
     Returns:
-        List[str]: 생성된 검색어 리스트
+        Dict: {'components': 구성요소 텍스트 (쉼표 구분), 'ingredients': [...], 'purposes': [...]}
     """
 
-    # 기본 화장품 관련 키워드 추가
-    default_cosmetic_keywords = ["화장품", "화장", "화장료", "미용"]
+    structured_prompt = ChatPromptTemplate([
+        ("system", """
+너는 특허 침해 분석을 잘하는 변리사야.
+사용자의 질문과 유사한 특허를 찾기 위해, 사용자의 질문으로 부터 제품의 구성 요소를 추출하고
+각 구성요소를 '성분'과 '용도/효능'으로 분류한다.
+
+<분류 기준>
+- 성분(ingredients): 물리적/화학적 물질, 원료, 재료, 추출물, 화합물 등
+- 용도/효능(purposes): 제품의 목적, 효과, 기능, 용도, 카테고리 등
+
+<example>
+질문: 화피 추출물, 석류피 추출물, 염부수백피 추출물을 포함하여 여드름이나 염증성 피부 질환을 완화하는 데 효과적인 화장품을 만들었습니다.
+이 제품을 시장에 출시해도 괜찮을까요?
 
-    # 기존 purposes에 기본 키워드들을 추가 (중복 제거)
-    all_purposes = list(set(purposes + default_cosmetic_keywords))
+출력:
+{{"ingredients": ["화피", "석류피", "염부수백피"], "purposes": ["여드름", "염증", "피부질환", "화장"]}}
+</example>
 
-    search_queries = set()
+<example>
+질문: 수분층 60중량%와 오일층 40 중량%로 구성된 마스크팩을 만들었습니다.
+수분층에는 다마스크장미의 꽃을 수증기 증류하여 얻은 다마스크장미꽃수 50 중량%, 천연 트레할로스 10 중량%, 트리에틸시트레이트 10 중량%가 포함되어 있으며,
+오일층에는 보검선인장씨오일, 기장씨추출물, 방패버섯추출물, 블랙커런트씨오일, 풍선덩굴꽃/잎/덩굴추출물, 해바라기씨오일불검화물, 블루탄지꽃오일이 각각 5 중량% 포함되어 있습니다.
+또한, 락토바실러스발효물을 포함하는 첨가제를 추가하여 아토피 피부염과 건조에 기인한 피부 가려움증을 완화하는 용도로 사용하고자 합니다. 이 제품을 판매해도 될까요?
 
+출력:
+{{"ingredients": ["수분층", "오일층", "수층", "유층", "다마스크장미", "장미", "트레할로스", "트리에틸시트레이트", "시트레이트", "시트르산", "보검선인장씨오일", "선인장", "선인장 오일", "기장씨", "방패버섯", "버섯", "블랙커런트씨", "블랙커런트시오일", "풍선덩굴꽃", "풍선덩굴", "덩굴", "덩굴추출물", "해바라기씨오일", "해바라기씨", "블루탄지꽃오일", "블루탄지", "블루탄지꽃", "락토바실러스발효물", "락토바실러스"],
+ "purposes": ["아토피", "가려움", "피부가려움", "피부 건조", "마스크팩", "마스크", "팩"]}}
+</example>
+
+반드시 위 형식의 JSON 객체 하나만 답변하라. (설명, 코드 블록 없이)
+        """),
+        ("user", "질문: {question}"),
+    ])
+
+    structured_chain = (
+        {"question": RunnablePassthrough()}
+        | structured_prompt
+        | llm
+    )
+
+    parsed = _parse_components_json(_message_text(structured_chain.invoke(query)))
+
+    if parsed is None:
+        print("⚠️ 구성요소 JSON 응답 파싱 실패 → 추출/분류 2회 호출로 대체")
+        components = extract_components(query, llm)
+        parsed = parse_components(components, llm)
+        return {'components': components, **parsed}
+
+    components = ', '.join(parsed['ingredients'] + parsed['purposes'])
+    return {'components': components, **parsed}
+
+
+
+# ============================================
+# 유틸리티 함수 3: 검색어 조합 생성 (우선순위 + 예산)
+# ============================================
+
+DEFAULT_COSMETIC_KEYWORDS = ["화장품", "화장", "화장료", "미용"]
+MAX_SEARCH_QUERIES = 300        # 질문 1개당 최대 검색어 수 (검색 비용 상한)
+QUERY_PLAN_TIME_BUDGET = 10.0   # 검색어 생성 시간 예산 (초, None이면 무제한)
+MIN_EXPECTED_MATCHES = 1     # 키워드 색인 기준 실제 매칭 문서 수가 이보다 적은 AND 조합은 건너뜀
+
+
+def plan_search_queries(
+    ingredients: List[str],
+    purposes: List[str],
+    min_combination_size: int = 2,
+    max_combination_size: int = None,
+    include_single_ingredients: bool = False,
+    doc_freq: Callable[[str], int] = None,
+    total_docs: int = None,
+    max_queries: Optional[int] = MAX_SEARCH_QUERIES,
+    time_budget: Optional[float] = QUERY_PLAN_TIME_BUDGET,
+    min_expected_matches: int = MIN_EXPECTED_MATCHES,
+    match_count: Callable[[str], int] = None
+) -> Iterator[str]:
+    """
+    성분/용도 조합 검색어를 우선순위 순서로 하나씩 생성 (전체 조합을 미리 만들지 않음)
+
+    - 조합 크기(성분 수) 단위로 진행: 1개 성분 + 용도 → 2개 조합 → 3개 조합 ...
+    - 같은 크기 안에서는 매칭 문서 수가 적은(= 선택도가 높은) 검색어부터
+      - match_count(키워드 역색인)가 있으면 실제 매칭 문서 수
+      - doc_freq만 있으면 추정치 = 전체 문서 수 × Π(키워드 문서 빈도 / 전체 문서 수)
+      - 둘 다 없으면 입력 순서
+    - 가지치기는 match_count의 실제 매칭 수로만 함: min_expected_matches 미만인 조합은
+      건너뛰고, 그 조합을 포함하는 더 큰 조합도 만들지 않음 (키워드가 늘면 매칭 수는 줄기만 하므로)
+      추정치는 키워드끼리 독립이라고 가정하므로 (화장품 성분은 같이 나오는 경우가 많음)
+      순서를 정하는 데만 쓰고 검색어를 빼지 않음
+    - max_queries개를 내보냈거나 time_budget이 지나면 중단
+
+    Args:
+        ingredients (List[str]): 주요 성분 리스트
+        purposes (List[str]): 용도/효능 리스트 (기본 화장품 키워드와 자동 병합)
+        min_combination_size (int): 성분끼리 조합할 최소 크기
+        max_combination_size (int): 성분끼리 조합할 최대 크기 (None이면 전체)
+        include_single_ingredients (bool): 단일 성분 검색어 포함 여부
+        doc_freq (Callable): 키워드 → 문서 빈도 (KeywordIndex.doc_freq 등, 정렬에만 사용)
+        total_docs (int): 전체 문서 수
+        max_queries (int): 최대 검색어 수 (None이면 무제한)
+        time_budget (float): 생성 시간 예산 (초, None이면 무제한)
+        min_expected_matches (int): match_count가 이보다 적은 조합은 건너뜀 (match_count가 있을 때만)
+        match_count (Callable): 검색어 → 실제 매칭 문서 수 (KeywordIndex.count_matches)
+
+    Yields:
+        str: 검색어
+    """
     if not ingredients:
-        return list(search_queries)
+        return
 
+    deadline = time.monotonic() + time_budget if time_budget is not None else None
+    all_purposes = list(dict.fromkeys(purposes + DEFAULT_COSMETIC_KEYWORDS))
     if max_combination_size is None:
         max_combination_size = len(ingredients)
 
-    # 1. 단일 성분 (옵션)
-    if include_single_ingredients:
-        for ingredient in ingredients:
-            search_queries.add(ingredient)
-
-    # 2. 성분 + 용도 조합
-    if all_purposes:
-        for ingredient in ingredients:
-            for purpose in all_purposes:
-                search_queries.add(f"{ingredient} {purpose}")
-
-    # 3. 성분들의 조합 (2개 이상)
-    for size in range(min_combination_size, max_combination_size + 1):
-        for combo in combinations(ingredients, size):
-            search_queries.add(" ".join(combo))
-            if all_purposes:
-                for purpose in all_purposes:
-                    search_queries.add(" ".join(combo) + f" {purpose}")
-
-    # 4. 모든 성분 + 모든 용도
-    if all_purposes and len(ingredients) >= min_combination_size:
+    # 키워드별 문서 비율 (where_document와 같이 공백 단위 키워드)
+    ratios = {}
+
+    def expected_matches(query: str) -> float:
+        """정렬 기준: 실제 매칭 수(match_count) 또는 독립 가정 추정치 (통계가 없으면 모두 같음)"""
+        if match_count is not None:
+            return match_count(query)
+        if doc_freq is None or not total_docs:
+            return 0.0
+        expected = float(total_docs)
+        for keyword in set(query.split()):
+            if keyword not in ratios:
+                ratios[keyword] = doc_freq(keyword) / total_docs
+            expected *= ratios[keyword]
+        return expected
+
+    def has_no_matches(query: str) -> bool:
+        """실제 매칭 수가 있을 때만 가지치기 (추정치로는 검색어를 빼지 않음)"""
+        return match_count is not None and match_count(query) < min_expected_matches
+
+    def out_of_budget() -> bool:
+        if max_queries is not None and emitted >= max_queries:
+            return True
+        return deadline is not None and time.monotonic() > deadline
+
+    emitted = 0
+    seen = set()
+
+    def level_queries(candidates: List[str]) -> List[str]:
+        """매칭이 없는 후보를 빼고 나머지를 선택도 순으로 정렬"""
+        scored = []
+        for order, query in enumerate(candidates):
+            if query in seen or (deadline is not None and time.monotonic() > deadline):
+                continue
+            if not has_no_matches(query):
+                scored.append((expected_matches(query), order, query))
+        scored.sort()
+        return [query for _, _, query in scored]
+
+    # 조합 크기별로 진행 (살아남은 조합만 한 성분씩 확장)
+    survivors = [(i,) for i in range(len(ingredients))]
+    size = 1
+    while survivors and size <= max_combination_size and not out_of_budget():
+        candidates = []
+        for combo in survivors:
+            text = " ".join(ingredients[i] for i in combo)
+            if size >= min_combination_size or (size == 1 and include_single_ingredients):
+                candidates.append(text)
+            if size == 1 or size >= min_combination_size:
+                candidates.extend(f"{text} {purpose}" for purpose in all_purposes)
+
+        for query in level_queries(candidates):
+            if out_of_budget():
+                return
+            seen.add(query)
+            emitted += 1
+            yield query
+
+        # 매칭 문서가 있는 조합만 다음 크기로 확장 (키워드 색인이 없으면 전부 확장)
+        next_survivors = []
+        for combo in survivors:
+            text = " ".join(ingredients[i] for i in combo)
+            if has_no_matches(text):
+                continue
+            next_survivors.extend(combo + (j,) for j in range(combo[-1] + 1, len(ingredients)))
+        survivors = next_survivors
+        size += 1
+
+    # 모든 성분 + 용도, 모든 성분 + 모든 용도
+    if len(ingredients) >= min_combination_size:
         all_ingredients = " ".join(ingredients)
-        for purpose in all_purposes:
-            search_queries.add(f"{all_ingredients} {purpose}")
-        all_components = " ".join(ingredients + all_purposes)
-        search_queries.add(all_components)
+        final = [f"{all_ingredients} {purpose}" for purpose in all_purposes]
+        final.append(" ".join(ingredients + all_purposes))
+        for query in level_queries(final):
+            if out_of_budget():
+                return
+            seen.add(query)
+            emitted += 1
+            yield query
+
+
+def generate_search_queries(
+    ingredients: List[str],
+    purposes: List[str],
+    min_combination_size: int = 2,
+    max_combination_size: int = None,
+    include_single_ingredients: bool = False,
+    doc_freq: Callable[[str], int] = None,
+    total_docs: int = None,
+    max_queries: Optional[int] = MAX_SEARCH_QUERIES,
+    time_budget: Optional[float] = QUERY_PLAN_TIME_BUDGET,
+    match_count: Callable[[str], int] = None
+) -> List[str]:
+    """
+    성분과 용도를 조합한 검색어를 우선순위 순서로 최대 max_queries개 생성
+
+    plan_search_queries 결과를 리스트로 모은 것 (인자 설명은 plan_search_queries 참고)
 
-    return sorted(list(search_queries))
+    Returns:
+        List[str]: 생성된 검색어 리스트 (우선순위 순)
+    """
+    return list(plan_search_queries(
+        ingredients=ingredients,
+        purposes=purposes,
+        min_combination_size=min_combination_size,
+        max_combination_size=max_combination_size,
+        include_single_ingredients=include_single_ingredients,
+        doc_freq=doc_freq,
+        total_docs=total_docs,
+        max_queries=max_queries,
+        time_budget=time_budget,
+        match_count=match_count
+    ))
 
 
 # ============================================
@@ -281,16 +488,32 @@ def create_search_queries_from_components(
     min_combination_size: int = 2,
     max_combination_size: int = None,
     include_single_ingredients: bool = False,
-    verbose: bool = True
+    verbose: bool = True,
+    max_queries: Optional[int] = MAX_SEARCH_QUERIES,
+    time_budget: Optional[float] = QUERY_PLAN_TIME_BUDGET,
+    keyword_index=None,
+    llm=None,
+    parsed_components: Optional[Dict[str, List[str]]] = None
 ) -> List[str]:
     """
-    구성요소 텍스트로부터 모든 가능한 검색어 조합을 생성하는 통합 함수
-    """
+    구성요소 텍스트로부터 검색어 조합을 우선순위 순으로 생성하는 통합 함수
+
+    keyword_index(KeywordIndex)를 넘기면 실제 매칭 문서 수로 우선순위/가지치기를 하고,
+    없으면 입력 순서대로 가지치기 없이 생성함 (Chroma $contains로 키워드마다 전체를 훑어
+    통계를 내면 아끼는 검색보다 비용이 커질 수 있어 키워드 색인이 있을 때만 통계 사용)
+    검색어 수는 max_queries, 생성 시간은 time_budget으로 제한함
 
-    # Gemini 2.0 Flash LLM
-    llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0)
+    parsed_components(extract_structured_components 결과)를 넘기면 분류용 LLM 호출을 생략하고,
+    아니면 llm(없으면 Gemini 2.0 Flash)으로 parse_components를 호출함
+    """
 
-    parsed = parse_components(components_text, llm)
+    if parsed_components is not None:
+        parsed = parsed_components
+    else:
+        # Gemini 2.0 Flash LLM
+        if llm is None:
+            llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0)
+        parsed = parse_components(components_text, llm)
     ingredients = parsed['ingredients']
     purposes = parsed['purposes']
 
@@ -307,12 +530,23 @@ def create_search_queries_from_components(
             print(f"  {i}. {pur}")
         print()
 
+    if keyword_index is not None:
+        doc_freq, total_docs = keyword_index.doc_freq, len(keyword_index)
+        match_count = keyword_index.count_matches
+    else:
+        doc_freq, total_docs, match_count = None, None, None
+
     search_queries = generate_search_queries(
         ingredients=ingredients,
         purposes=purposes,
         min_combination_size=min_combination_size,
         max_combination_size=max_combination_size,
-        include_single_ingredients=include_single_ingredients
+        include_single_ingredients=include_single_ingredients,
+        doc_freq=doc_freq,
+        total_docs=total_docs,
+        max_queries=max_queries,
+        time_budget=time_budget,
+        match_count=match_count
     )
 
     if verbose:
@@ -331,13 +565,368 @@ def create_search_queries_from_components(
 # 유틸리티 함수 5: 다중 검색어로 특허 검색
 # ============================================
 
+QUERY_EMBED_BATCH_SIZE = 1000  # 임베딩 요청 1회당 검색어 수 (OpenAI 입력 개수 한도 2048 이하)
+SEARCH_MAX_WORKERS = 8         # 동시에 실행할 벡터 검색 수
+MAX_ID_FILTER_SIZE = 1000      # 매칭 특허가 이보다 많으면 parent_id 범위 제한 없이 검색
+
+
+def embed_search_queries(
+    search_queries: List[str],
+    embeddings,
+    batch_size: int = QUERY_EMBED_BATCH_SIZE
+) -> Optional[List[List[float]]]:
+    """
+    검색어 전체를 batch_size개씩 묶어 임베딩 (검색어 수가 아니라 배치 수만큼만 API 호출)
+
+    Returns:
+        List[List[float]]: search_queries와 같은 순서의 벡터 리스트
+        (embeddings가 없거나 임베딩에 실패하면 None → 검색어별 임베딩으로 대체)
+    """
+    if embeddings is None or not search_queries:
+        return None
+
+    vectors = []
+    try:
+        for i in range(0, len(search_queries), batch_size):
+            vectors.extend(embeddings.embed_documents(search_queries[i:i + batch_size]))
+    except Exception as e:
+        print(f"⚠️ 검색어 일괄 임베딩 실패 → 검색어별 임베딩으로 진행: {e}")
+        return None
+
+    n_batches = (len(search_queries) + batch_size - 1) // batch_size
+    print(f"검색어 임베딩 완료: {len(vectors)}개 (요청 {n_batches}회)\n")
+    return vectors
+
+
+def _build_where_document(query: str) -> Optional[Dict[str, Any]]:
+    """검색어를 키워드로 분리하여 AND 조건 필터 생성"""
+    keywords = query.split()
+    if len(keywords) >= 2:
+        return {"$and": [{"$contains": kw} for kw in keywords]}
+    return {"$contains": keywords[0]} if keywords else None
+
+
+def prune_search_queries(
+    search_queries: List[str],
+    keyword_index,
+    max_id_filter_size: int = MAX_ID_FILTER_SIZE
+) -> Tuple[List[str], List[Optional[Dict[str, Any]]]]:
+    """
+    키워드 역색인으로 AND 교집합을 먼저 계산해 매칭 문서가 없는 검색어를 제외
+
+    Returns:
+        (남은 검색어 리스트, 검색어별 parent_id 범위 필터 리스트)
+        매칭 특허가 max_id_filter_size개보다 많으면 필터는 None (범위 제한 없음)
+    """
+    kept, id_filters = [], []
+    for query in search_queries:
+        parent_ids = keyword_index.match_parent_ids(query.split())
+        if not parent_ids:
+            continue
+        kept.append(query)
+        if len(parent_ids) <= max_id_filter_size:
+            id_filters.append({"parent_id": {"$in": sorted(parent_ids)}})
+        else:
+            id_filters.append(None)
+
+    print(f"키워드 색인 사전 필터: {len(search_queries)}개 중 {len(search_queries) - len(kept)}개 검색어 제외 "
+          f"(매칭 문서 없음), {sum(f is not None for f in id_filters)}개는 매칭 특허로 범위 제한\n")
+    return kept, id_filters
+
+
+PARENT_PREFILTER_KEYS = ('registered_only', 'register_status', 'ipc_prefixes')
+CHUNK_PREFILTER_KEYS = ('claim_type', 'source_type')
+
+
+def _and_filters(filters: List[Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """Chroma where 조건 여러 개를 $and로 결합 (None은 무시)"""
+    filters = [f for f in filters if f]
+    if not filters:
+        return None
+    return filters[0] if len(filters) == 1 else {"$and": filters}
+
+
+def _parent_metadata_where(conditions: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """
+    특허 단위 조건 → 서지정보를 메타데이터로 저장한 컬렉션(Parent DB)용 where 조건
+
+    Returns:
+        (where 조건, where로 표현하지 못한 조건 이름 리스트)
+        ipc_prefixes는 메인그룹 단위 접두어 매칭이라 Chroma where로 표현할 수 없음
+    """
+    clauses = []
+    if conditions.get('registered_only'):
+        # metadata_index.is_registered와 같은 기준 (등록번호 있음 + 등록 상태)
+        clauses += [{"register_status": "등록"}, {"register_number": {"$ne": ""}}]
+    statuses = conditions.get('register_status')
+    if statuses:
+        clauses.append({"register_status": statuses if isinstance(statuses, str) else {"$in": list(statuses)}})
+    unsupported = [key for key in ('ipc_prefixes',) if conditions.get(key)]
+    return _and_filters(clauses), unsupported
+
+
+def _stores_parent_metadata(vectorstore) -> bool:
+    """컬렉션 문서에 등록 서지정보(register_status / register_number) 메타데이터가 있는지 (Parent DB면 True)"""
+    if not hasattr(vectorstore, 'get'):
+        return False
+    try:
+        metadatas = vectorstore.get(limit=1, include=['metadatas']).get('metadatas') or []
+    except Exception:
+        return False
+    return bool(metadatas) and {'register_status', 'register_number'} <= set(metadatas[0] or {})
+
+
+def apply_metadata_prefilter(
+    search_queries: List[str],
+    id_filters: List[Optional[Dict[str, Any]]],
+    prefilter: Dict[str, Any],
+    metadata_index=None,
+    max_id_filter_size: int = MAX_ID_FILTER_SIZE,
+    parent_metadata: bool = False
+) -> Tuple[List[str], List[Optional[Dict[str, Any]]], Optional[Set[str]]]:
+    """
+    메타데이터 조건(독립항/출처/등록 여부/IPC)을 Chroma where 필터로 변환해 검색어별 필터에 결합
+
+    - claim_type / source_type: 청구항 메타데이터에 있으므로 where에 그대로 추가
+    - registered_only / register_status / ipc_prefixes: 메타데이터 색인으로 조건에 맞는 특허 집합을 구해서
+      키워드 색인 범위(parent_id $in)와 교집합 → 비면 검색어 제외.
+      범위가 없는 검색어는 집합이 max_id_filter_size 이하면 $in으로 추가하고, 더 크면
+      parent_metadata=True(컬렉션에 register_status / register_number 메타데이터가 있음)일 때
+      등록 조건을 where에 직접 넣음. 그래도 표현하지 못한 조건은 경고를 출력하고 결과 후처리로 거름
+
+    Returns:
+        (남은 검색어, 검색어별 where 필터, 조건에 맞는 parent_id 집합 (결과 후처리용, 조건이 없으면 None))
+    """
+    chunk_where = _and_filters([
+        {key: prefilter[key] if isinstance(prefilter[key], str) else {"$in": list(prefilter[key])}}
+        for key in CHUNK_PREFILTER_KEYS if prefilter.get(key) is not None
+    ])
+
+    parent_conditions = {key: prefilter[key] for key in PARENT_PREFILTER_KEYS if prefilter.get(key)}
+    eligible = None
+    if parent_conditions:
+        if metadata_index is None:
+            raise ValueError(f"메타데이터 색인 없이 특허 단위 조건을 쓸 수 없습니다: {parent_conditions}")
+        eligible = metadata_index.eligible_parent_ids(**parent_conditions)
+
+    # 범위 없는 검색어에 쓸 특허 단위 조건 (대상 특허가 많으면 $in 대신 메타데이터 where)
+    open_filter, unsupported = None, []
+    if eligible is not None:
+        if len(eligible) <= max_id_filter_size:
+            open_filter = {"parent_id": {"$in": sorted(eligible)}}
+        elif parent_metadata:
+            open_filter, unsupported = _parent_metadata_where(parent_conditions)
+        else:
+            unsupported = list(parent_conditions)
+
+    kept, filters = [], []
+    for query, id_filter in zip(search_queries, id_filters):
+        parent_filter = id_filter
+        if eligible is not None:
+            if id_filter is not None:
+                parent_ids = [p for p in id_filter["parent_id"]["$in"] if p in eligible]
+                if not parent_ids:
+                    continue
+                parent_filter = {"parent_id": {"$in": parent_ids}}
+            else:
+                parent_filter = open_filter
+        kept.append(query)
+        filters.append(_and_filters([chunk_where, parent_filter]))
+
+    if unsupported and any(f is None for f in id_filters):
+        print(f"⚠️ 메타데이터 사전 필터: 조건 {unsupported}은 벡터 검색 where로 넣을 수 없음 "
+              f"(대상 특허 {len(eligible)}건 > {max_id_filter_size}건) → 범위 없는 검색어는 결과를 받은 뒤 걸러냄 "
+              f"(k개 중 일부만 남을 수 있음)\n")
+
+    if eligible is not None:
+        print(f"메타데이터 사전 필터: 조건 {parent_conditions} → 대상 특허 {len(eligible)}건, "
+              f"검색어 {len(search_queries) - len(kept)}개 제외\n")
+    return kept, filters, eligible
+
+
+def _run_vector_query(vectorstore, query: str, vector: Optional[List[float]], k: int,
+                      id_filter: Optional[Dict[str, Any]] = None, **search_kwargs):
+    """검색어 1개 조회 → [(doc, score)] (워커 스레드에서 실행, search_kwargs는 NumPy 백엔드 base_mask용)"""
+    where_document = _build_where_document(query)
+
+    if vector is not None:
+        # 미리 계산한 벡터로 조회 (점수는 similarity_search_with_score와 같은 거리값)
+        return vectorstore.similarity_search_by_vector_with_relevance_scores(
+            embedding=vector,
+            k=k,
+            filter=id_filter,
+            where_document=where_document,
+            **search_kwargs,
+        )
+    return vectorstore.similarity_search_with_score(
+        query=query,
+        k=k,
+        filter=id_filter,
+        where_document=where_document,
+        **search_kwargs,
+    )
+
+
+EARLY_STOP_CHECK_EVERY = 32    # 조기 종료 판정 간격 (검색어 수)
+
+
+def _filter_parent_ids(where: Optional[Dict[str, Any]]) -> Optional[Set[str]]:
+    """where 필터의 parent_id 범위 ($in 또는 단일 값, 없으면 None = 전체)"""
+    if not where:
+        return None
+    if '$and' in where:
+        for condition in where['$and']:
+            parent_ids = _filter_parent_ids(condition)
+            if parent_ids is not None:
+                return parent_ids
+        return None
+    condition = where.get('parent_id')
+    if isinstance(condition, dict) and '$in' in condition:
+        return set(condition['$in'])
+    if isinstance(condition, str):
+        return {condition}
+    return None
+
+
+class PatentHits:
+    """특허 1건의 히트 통계 (검색어는 문자열 대신 번호, 점수는 float 배열로 보관)"""
+
+    __slots__ = ('hit_count', 'score_sum', 'best_score', 'best_doc_id', 'query_indices', 'scores')
+
+    def __init__(self):
+        self.hit_count = 0
+        self.score_sum = 0.0
+        self.best_score = float('inf')
+        self.best_doc_id = None  # 최고 유사도 문서는 ID만 보관 (최종 top_n만 다시 조회)
+        self.query_indices = array('I')
+        self.scores = array('d')
+
+    def add(self, query_idx: int, score: float, doc_id: Optional[str]) -> None:
+        self.hit_count += 1
+        self.score_sum += score
+        self.query_indices.append(query_idx)
+        self.scores.append(score)
+        if score < self.best_score:
+            self.best_score = score
+            self.best_doc_id = doc_id
+
+    @property
+    def avg_score(self) -> float:
+        return self.score_sum / self.hit_count
+
+    def hit_queries(self, search_queries: List[str]) -> List[Tuple[str, float]]:
+        """(검색어, 점수) 리스트, 점수 오름차순"""
+        return sorted(
+            ((search_queries[qi], score) for qi, score in zip(self.query_indices, self.scores)),
+            key=lambda x: x[1]
+        )
+
+
+def _fetch_metadatas(vectorstore, doc_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """문서 ID → 메타데이터 (벡터 DB에서 한 번에 조회, 실패하면 빈 dict)"""
+    doc_ids = [doc_id for doc_id in doc_ids if doc_id is not None]
+    if not doc_ids or not hasattr(vectorstore, 'get'):
+        return {}
+    try:
+        result = vectorstore.get(ids=doc_ids, include=['metadatas'])
+    except Exception as e:
+        print(f"⚠️ 최고 유사도 문서 조회 실패 → 특허 서지정보만 사용: {e}")
+        return {}
+    return dict(zip(result.get('ids', []), result.get('metadatas') or []))
+
+
+class HitAccumulator:
+    """
+    검색어별 결과를 순서대로 누적하면서 상위 top_n 순위가 확정됐는지 판정
+
+    순위 기준은 (-hit_count, best_score). 남은 검색어로 특허 p의 히트 수가 늘어날 수 있는 상한:
+    max_hits × (범위 제한 없는 남은 검색어 수 + p를 범위에 포함하는 남은 검색어 수)
+    반환하는 hit_count / best_score / avg_score / hit_queries까지 전체 실행과 같아야 하므로
+    - 상위 top_n 특허는 모두 상한 = 0 (남은 검색어 중 어느 것도 이 특허를 결과에 줄 수 없음 → 통계 확정)
+    - top_n 밖 특허(아직 안 나온 특허 포함)의 히트 수 상한 < top_n 마지막 특허의 히트 수
+      (같아지면 best_score로 뒤집힐 수 있으므로 엄격한 부등호)
+    일 때만 확정. 범위 제한 없는 검색어가 남아 있으면 모든 특허의 상한이 0보다 크므로 확정하지 않음
+
+    특허 단위 조건(등록 여부 등)은 검색어별 범위가 아니라 전체 대상 특허 집합으로만 반영함
+    (범위 없는 검색어마다 대상 특허 전체를 범위로 넣으면 검색어 수 × 대상 특허 수만큼 계산하게 됨)
+    """
+
+    def __init__(self, top_n: int, scopes: List[Optional[Set[str]]], max_hits: int):
+        self.top_n = top_n
+        self.max_hits = max_hits
+        self.patents = {}  # {parent_id: PatentHits}
+        self.processed = 0
+        self._scopes = scopes
+        self._open_remaining = sum(scope is None for scope in scopes)
+        self._scoped_remaining = Counter(p for scope in scopes if scope is not None for p in scope)
+
+    def add(self, idx: int, results: List[Tuple[Any, float]]) -> None:
+        for doc, score in results:
+            parent_id = doc.metadata['parent_id']
+            hits = self.patents.get(parent_id)
+            if hits is None:
+                hits = self.patents[parent_id] = PatentHits()
+            hits.add(idx, score, getattr(doc, 'id', None))
+
+        # 처리한 검색어는 상한 계산에서 제외
+        scope = self._scopes[idx]
+        if scope is None:
+            self._open_remaining -= 1
+        else:
+            self._scoped_remaining.subtract(scope)
+        self.processed += 1
+
+    def _max_gain(self, parent_id: str) -> int:
+        return self.max_hits * (self._open_remaining + max(0, self._scoped_remaining.get(parent_id, 0)))
+
+    def ranked(self) -> List[Tuple[str, PatentHits]]:
+        return sorted(self.patents.items(), key=lambda x: (-x[1].hit_count, x[1].best_score))
+
+    def best_metadatas(self, vectorstore, parent_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """지정한 특허만 최고 유사도 문서의 메타데이터를 조회 (없으면 parent_id만)"""
+        fetched = _fetch_metadatas(vectorstore, [self.patents[p].best_doc_id for p in parent_ids])
+        return {
+            p: fetched.get(self.patents[p].best_doc_id) or {'parent_id': p}
+            for p in parent_ids
+        }
+
+    def is_settled(self) -> bool:
+        if self.processed == len(self._scopes):
+            return True
+        if len(self.patents) < self.top_n or self._open_remaining:
+            return False
+
+        # 상위 top_n의 통계가 더 바뀌지 않아야 반환 값이 전체 실행과 같음
+        top = heapq.nsmallest(self.top_n, self.patents.items(),
+                              key=lambda x: (-x[1].hit_count, x[1].best_score))
+        if any(self._max_gain(parent_id) for parent_id, _ in top):
+            return False
+
+        # top_n 밖 특허의 히트 수 상한 (아직 안 나온 특허는 0 + 최대 증가량)
+        top_ids = {parent_id for parent_id, _ in top}
+        outside = max(
+            (hits.hit_count + self._max_gain(parent_id)
+             for parent_id, hits in self.patents.items() if parent_id not in top_ids),
+            default=0
+        )
+        unseen = self.max_hits * (self._open_remaining + max(self._scoped_remaining.values(), default=0))
+        return top[-1][1].hit_count > max(outside, unseen)
+
+
 def search_patents_with_multiple_queries(
     search_queries: List[str],
     vectorstore,
     parent_store,
     top_n: int = 10,
     k_per_query: int = 50,
-    filter_independent: bool = False
+    filter_independent: bool = False,
+    max_workers: int = SEARCH_MAX_WORKERS,
+    keyword_index=None,
+    prefilter: Optional[Dict[str, Any]] = None,
+    metadata_index=None,
+    early_stop: bool = True,
+    max_hits_per_query: Optional[int] = None,
+    check_every: int = EARLY_STOP_CHECK_EVERY
 ) -> List[Dict[str, Any]]:
     """
     여러 검색어를 사용하여 특허를 검색하고 결과를 통합
@@ -349,6 +938,18 @@ def search_patents_with_multiple_queries(
         top_n (int): 최종 반환할 특허 개수
         k_per_query (int): 각 검색어당 가져올 문서 개수
         filter_independent (bool): True면 독립항만 필터링 (child DB용), False면 전부 포함 (parent DB용)
+        max_workers (int): 동시에 실행할 벡터 검색 수 (1이면 순차 실행)
+        keyword_index: vectorstore와 같은 컬렉션의 KeywordIndex (있으면 매칭 문서가 없는
+                       검색어는 건너뛰고, 나머지는 매칭 특허로 범위를 좁혀 검색)
+        prefilter (Dict): 벡터 검색 전에 적용할 메타데이터 조건
+            - claim_type / source_type: 청구항 DB용 (filter_independent=True면 claim_type='independent')
+            - registered_only / register_status / ipc_prefixes: 특허 단위 조건 (metadata_index 필요)
+        metadata_index: MetadataIndex (특허 단위 조건을 검색 범위로 변환)
+        early_stop (bool): 남은 검색어로 상위 top_n개의 구성/순서/통계가 바뀔 수 없으면 나머지 검색어 생략
+            (반환 값은 전체 실행과 같음. 범위 제한 없는 검색어가 남아 있으면 생략하지 않음)
+        max_hits_per_query (int): 검색어 1개가 한 특허에 줄 수 있는 최대 히트 수
+            (None이면 k_per_query, 특허당 문서가 1개인 Parent DB는 1)
+        check_every (int): 조기 종료를 판정할 검색어 간격
 
     Returns:
         List[Dict]: 특허 정보 리스트
@@ -359,75 +960,121 @@ def search_patents_with_multiple_queries(
     print(f"{'='*80}\n")
 
 
-    all_patent_scores = {}  # {parent_id: [scores]}
-
-    for idx, query in enumerate(search_queries, 1):
-        if idx % 10 == 0 or idx == 1:
-            print(f"진행 상황: {idx}/{len(search_queries)} 검색어 처리 중...")
+    # 키워드 역색인으로 결과가 없을 검색어는 임베딩/벡터 검색 전에 제외
+    id_filters = [None] * len(search_queries)
+    if keyword_index is not None:
+        search_queries, id_filters = prune_search_queries(search_queries, keyword_index)
+
+    # 메타데이터 조건은 결과를 받은 뒤 버리지 않고 검색 범위로 밀어 넣음
+    # (NumPy 백엔드는 행 마스크, Chroma는 where 필터)
+    prefilter = dict(prefilter or {})
+    if filter_independent:
+        prefilter.setdefault('claim_type', 'independent')
+    search_kwargs = {}
+    eligible = None
+    if hasattr(vectorstore, 'prefilter_mask'):
+        base_mask = vectorstore.prefilter_mask(metadata_index, **prefilter)
+        if base_mask is not None:
+            search_kwargs['base_mask'] = base_mask
+    elif prefilter:
+        search_queries, id_filters, eligible = apply_metadata_prefilter(
+            search_queries, id_filters, prefilter, metadata_index,
+            parent_metadata=_stores_parent_metadata(vectorstore)
+        )
+
+    # 검색어 임베딩을 배치로 한 번에 계산 (검색어마다 API 왕복하지 않음)
+    query_vectors = embed_search_queries(search_queries, getattr(vectorstore, 'embeddings', None))
+
+    # 조기 종료 판정용 검색어별 특허 범위 (None = 범위 제한 없음)
+    scopes = [_filter_parent_ids(f) for f in id_filters]
+    if eligible is None and metadata_index is not None and any(prefilter.get(k) for k in PARENT_PREFILTER_KEYS):
+        eligible_scope = metadata_index.eligible_parent_ids(
+            **{k: prefilter[k] for k in PARENT_PREFILTER_KEYS if prefilter.get(k)}
+        )
+        # 범위 있는 검색어만 교집합 (범위 없는 검색어는 그대로 None → 계산량이 대상 특허 수에 비례하지 않음)
+        scopes = [None if scope is None else scope & eligible_scope for scope in scopes]
+    accumulator = HitAccumulator(
+        top_n,
+        scopes,
+        max_hits_per_query if max_hits_per_query is not None else k_per_query
+    )
 
+    def run_query(idx: int):
+        query = search_queries[idx]
+        vector = query_vectors[idx] if query_vectors is not None else None
         try:
-            # 검색어를 키워드로 분리하여 AND 조건 필터 생성
-            keywords = query.split()
-            if len(keywords) >= 2:
-                where_document = {"$and": [{"$contains": kw} for kw in keywords]}
-            else:
-                where_document = {"$contains": keywords[0]} if keywords else None
+            return _run_vector_query(vectorstore, query, vector, k_per_query, id_filters[idx], **search_kwargs), None
+        except Exception as e:
+            return None, e
 
-            results = vectorstore.similarity_search_with_score(
-                query=query,
-                k=k_per_query,
-                where_document=where_document,
-            )
+    def merge(start: int, outcomes):
+        for idx, (results, error) in enumerate(outcomes, start):
+            query = search_queries[idx]
+            if (idx + 1) % 10 == 0 or idx == 0:
+                print(f"진행 상황: {idx + 1}/{len(search_queries)} 검색어 처리 중...")
 
+            if error is not None:
+                print(f"⚠️ 검색어 '{query}' 처리 중 오류: {error}")
+                results = []
+
+            hits = []
             for doc, score in results:
                 # child DB일 때만 독립항 필터링
                 if filter_independent and doc.metadata.get('claim_type') != 'independent':
                     continue
+                # $in으로 밀어 넣지 못한 특허 단위 조건은 여기서 확인
+                if eligible is not None and doc.metadata['parent_id'] not in eligible:
+                    continue
+                hits.append((doc, score))
+
+            accumulator.add(idx, hits)
+
+    # 검색어를 check_every개씩 실행하며 누적, 남은 검색어로 top_n 순위가 바뀔 수 없으면 중단
+    # (검색어 순서대로 합치므로 순차 실행과 같은 결과)
+    batched = query_vectors is not None and hasattr(vectorstore, 'batch_similarity_search_by_vectors')
+    step = max(1, check_every) if early_stop else max(1, len(search_queries))
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        for start in range(0, len(search_queries), step):
+            end = min(start + step, len(search_queries))
+            if batched:
+                # NumPy 백엔드: 구간의 검색어를 행렬곱 한 번으로 조회
+                batch_results = vectorstore.batch_similarity_search_by_vectors(
+                    query_vectors[start:end],
+                    k=k_per_query,
+                    filters=id_filters[start:end],
+                    where_documents=[_build_where_document(query) for query in search_queries[start:end]],
+                    **search_kwargs,
+                )
+                merge(start, ((results, None) for results in batch_results))
+            else:
+                # 검색은 스레드 풀에서 동시에 실행하고, 결과는 검색어 순서대로 합침
+                merge(start, executor.map(run_query, range(start, end)))
 
-                parent_id = doc.metadata['parent_id']
-
-                if parent_id not in all_patent_scores:
-                    all_patent_scores[parent_id] = {
-                        'scores': [],
-                        'best_doc': doc,
-                        'best_score': score,
-                        'hit_count': 0,
-                        'hit_queries': []
-                    }
-
-                all_patent_scores[parent_id]['scores'].append(score)
-                all_patent_scores[parent_id]['hit_count'] += 1
-                all_patent_scores[parent_id]['hit_queries'].append((query, score))
+            if early_stop and end < len(search_queries) and accumulator.is_settled():
+                print(f"\n상위 {top_n}개 순위 확정 → 남은 검색어 {len(search_queries) - end}개 생략")
+                break
 
-                if score < all_patent_scores[parent_id]['best_score']:
-                    all_patent_scores[parent_id]['best_score'] = score
-                    all_patent_scores[parent_id]['best_doc'] = doc
+    print(f"\n검색 완료: 총 {len(accumulator.patents)}개 특허 발견\n")
 
-        except Exception as e:
-            print(f"⚠️ 검색어 '{query}' 처리 중 오류: {e}")
-            continue
-
-    print(f"\n검색 완료: 총 {len(all_patent_scores)}개 특허 발견\n")
-
-    sorted_patents = sorted(
-        all_patent_scores.items(),
-        key=lambda x: (-x[1]['hit_count'], x[1]['best_score'])
-    )
+    sorted_patents = accumulator.ranked()
 
     print(f"{'='*80}")
     print("특허별 히트 통계 (상위 20개)")
     print(f"{'='*80}\n")
 
+    # 최고 유사도 문서는 출력할 상위 특허만 벡터 DB에서 다시 조회
+    best_metadatas = accumulator.best_metadatas(vectorstore, [parent_id for parent_id, _ in sorted_patents[:20]])
+
     for i, (parent_id, data) in enumerate(sorted_patents[:20], 1):
-        avg_score = sum(data['scores']) / len(data['scores'])
-        doc = data['best_doc']
-        print(f"[{i}] 히트 횟수: {data['hit_count']}회")
-        print(f"    특허명: {doc.metadata['title']}")
-        print(f"    출원번호: {doc.metadata['application_number']}")
-        print(f"    등록번호: {doc.metadata['register_number']}")
-        print(f"    최고 유사도: {data['best_score']:.4f}")
-        print(f"    평균 유사도: {avg_score:.4f}")
-        sorted_hits = sorted(data['hit_queries'], key=lambda x: x[1])
+        # 청구항 DB는 서지정보를 Parent Store에서 결합
+        metadata = join_parent_metadata(best_metadatas[parent_id], parent_store)
+        print(f"[{i}] 히트 횟수: {data.hit_count}회")
+        print(f"    특허명: {metadata['title']}")
+        print(f"    출원번호: {metadata['application_number']}")
+        print(f"    등록번호: {metadata['register_number']}")
+        print(f"    최고 유사도: {data.best_score:.4f}")
+        print(f"    평균 유사도: {data.avg_score:.4f}")
+        sorted_hits = data.hit_queries(search_queries)
         print(f"    히트 검색어 ({len(sorted_hits)}개):")
         for qi, (q, s) in enumerate(sorted_hits, 1):
             print(f"      {qi}. [{s:.4f}] {q}")
@@ -444,14 +1091,13 @@ def search_patents_with_multiple_queries(
             continue
 
         all_claims = parent.get('all_claims', [])
-        avg_score = sum(data['scores']) / len(data['scores'])
 
         patent_info = {
             'rank': rank,
             'parent_id': parent_id,
-            'best_similarity_score': data['best_score'],
-            'avg_similarity_score': avg_score,
-            'hit_count': data['hit_count'],
+            'best_similarity_score': data.best_score,
+            'avg_similarity_score': data.avg_score,
+            'hit_count': data.hit_count,
             'application_number': parent['application_number'],
             'register_number': parent['register_number'],
             'open_number': parent.get('open_number', ''),
@@ -463,7 +1109,7 @@ def search_patents_with_multiple_queries(
             'register_date': parent.get('register_date', ''),
             'all_claims': all_claims,
             'claim_count': len(all_claims),
-            'hit_queries': sorted(data['hit_queries'], key=lambda x: x[1])
+            'hit_queries': data.hit_queries(search_queries)
         }
 
         patents_full_data.append(patent_info)